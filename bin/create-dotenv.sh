@@ -40,4 +40,5 @@ insert_if_not_exists "DYNAMODB_LIBRARY_PATH" '"./lib"'
 insert_if_not_exists "DYNAMODB_DATABASE_PATH" '"./var"'
 insert_if_not_exists "AWS_ACCESS_KEY_ID" '"enrollment"'
 insert_if_not_exists "AWS_SECRET_ACCESS_KEY" '"123456"'
-insert_if_not_exists "AWS_REGION_NAME" '"local"'
\ No newline at end of file
+insert_if_not_exists "AWS_REGION_NAME" '"local"'
+insert_if_not_exists "ENROLLMENT_SERVICE_MODE" '"sync"'
\ No newline at end of file
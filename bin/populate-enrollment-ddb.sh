@@ -1,3 +1,4 @@
 #!/bin/bash
 
-python ddb_enrollment_service/ddb_enrollment_sample_data.py
\ No newline at end of file
+python ddb_enrollment_service/ddb_enrollment_sample_data.py
+python -m ddb_enrollment_service.backfill_enrolled_count
\ No newline at end of file
@@ -0,0 +1,241 @@
+import contextlib
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Connection settings shared by the user and enrollment services
+POOL_SIZE = 8                  # Connections per worker process
+CHECKOUT_TIMEOUT = 5           # Seconds a request waits for a free connection
+BUSY_TIMEOUT_MS = 5000         # Milliseconds SQLite itself retries on a locked database
+BUSY_RETRIES = 3               # Extra attempts of a unit of work still failing with "database is locked"
+STATEMENT_CACHE_SIZE = 256     # Prepared statements kept per connection
+REPLICA_RETRY_AFTER = 30       # Seconds an unavailable replica is skipped
+
+PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",    # Durable with WAL, without an fsync per commit
+    "PRAGMA cache_size=-16000",     # 16 MiB page cache per connection
+    "PRAGMA mmap_size=268435456",   # Read pages through a 256 MiB memory map
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeout(Exception):
+    """No connection was returned to the pool within CHECKOUT_TIMEOUT."""
+
+
+def is_busy(error):
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+class SQLitePool:
+    """
+    Per-worker pool of SQLite connections.
+
+    Connections are opened lazily (so every forked worker gets its own), configured once
+    with PRAGMAS and reused, keeping their page cache, memory map and prepared statements.
+    Writable databases are switched to WAL so readers never block the writer. A
+    connection is rolled back before it goes back to the pool.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, readonly=False, checkout_timeout=CHECKOUT_TIMEOUT,
+                 busy_timeout_ms=BUSY_TIMEOUT_MS):
+        """
+        :param path: The database file.
+        :param size: The maximum number of open connections.
+        :param readonly: Open the database read-only (e.g. a LiteFS replica).
+        """
+        self.path = path
+        self.size = size
+        self.readonly = readonly
+        self.checkout_timeout = checkout_timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.busy_retries = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _connect(self):
+        if self.readonly:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=self.busy_timeout_ms / 1000,
+                                 check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                 check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            # Persistent in the database file, a no-op after the first connection
+            db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        db.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        for pragma in PRAGMAS:
+            db.execute(pragma)
+        return db
+
+    def _checkout(self):
+        started = time.perf_counter()
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            db = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    db = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    db = self._idle.get(timeout=self.checkout_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"No SQLite connection available after {self.checkout_timeout}s")
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return db
+
+    def _checkin(self, db):
+        try:
+            if db.in_transaction:
+                db.rollback()
+        except sqlite3.Error:
+            # Unusable, open a new one next time
+            db.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(db)
+
+    @contextlib.contextmanager
+    def connection(self):
+        db = self._checkout()
+        try:
+            yield db
+        finally:
+            self._checkin(db)
+
+    def get_db(self):
+        """FastAPI dependency yielding a pooled connection."""
+        with self.connection() as db:
+            yield db
+
+    def retry_busy(self, function, db, *args):
+        """
+        Runs `function(db, *args)`, retrying it (after a rollback) up to BUSY_RETRIES
+        times while the database stays locked longer than the busy timeout.
+        """
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return function(db, *args)
+            except sqlite3.OperationalError as e:
+                if not is_busy(e) or attempt == BUSY_RETRIES:
+                    raise
+                db.rollback()
+                with self._lock:
+                    self.busy_retries += 1
+                time.sleep(0.05 * 2 ** attempt)
+
+    def close(self):
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            db.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "busy_retries": self.busy_retries,
+                "avg_wait_ms": round(1000 * self.wait_seconds / self.checkouts, 3) if self.checkouts else 0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+            }
+
+
+class ReadRouter:
+    """
+    Sends reads round-robin to read-only replica pools (e.g. LiteFS replicas) and
+    writes to the primary pool.
+
+    A replica that cannot be opened or read (not mounted yet, or LiteFS down) is
+    skipped for `retry_after` seconds and its reads go to the primary meanwhile.
+    With no replicas every read goes to the primary.
+    """
+
+    def __init__(self, primary, replicas=(), retry_after=REPLICA_RETRY_AFTER):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.retry_after = retry_after
+        self._next = itertools.count()
+        self._down_until = {}  # replica pool -> monotonic time
+        self.failovers = 0
+
+    def _read_pool(self):
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            pool = self.replicas[next(self._next) % len(self.replicas)]
+            if self._down_until.get(pool, 0) <= now:
+                return pool
+        return self.primary
+
+    def run(self, pool, function, *args):
+        with pool.connection() as db:
+            return pool.retry_busy(function, db, *args)
+
+    def write(self, function, *args):
+        """Runs `function(db, *args)` on the primary. Blocking."""
+        return self.run(self.primary, function, *args)
+
+    def read(self, function, *args, primary=False):
+        """Runs `function(db, *args)` on the next replica, or on the primary if `primary`. Blocking."""
+        pool = self.primary if primary else self._read_pool()
+        if pool is self.primary:
+            return self.run(pool, function, *args)
+        try:
+            return self.run(pool, function, *args)
+        except sqlite3.DatabaseError as e:
+            if is_busy(e):
+                raise
+            logger.warning(f"Replica {pool.path} unavailable, reading from the primary: {e}")
+            self._down_until[pool] = time.monotonic() + self.retry_after
+            self.failovers += 1
+            return self.run(self.primary, function, *args)
+
+    def close(self):
+        for pool in [self.primary, *self.replicas]:
+            pool.close()
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "primary": self.primary.stats(),
+            "replicas": {pool.path: {**pool.stats(), "available": self._down_until.get(pool, 0) <= now}
+                         for pool in self.replicas},
+            "failovers": self.failovers,
+        }
@@ -1,12 +1,55 @@
+import contextlib
 from fastapi import FastAPI
-from .student_router import student_router
-from .instructor_router import instructor_router
-from .registrar_router import registrar_router
+from .db_connection import settings
+from .class_cache import class_cache
+
+# Pick the request path at startup (ENROLLMENT_SERVICE_MODE in .env) so both can be
+# compared under the same load: "sync" handlers run on the threadpool with boto3/redis,
+# "async" handlers run on the event loop with aioboto3/redis.asyncio.
+if settings.ENROLLMENT_SERVICE_MODE == "async":
+    from .async_student_router import student_router
+    from .async_instructor_router import instructor_router
+    from .async_registrar_router import registrar_router
+    from .async_db_connection import async_registry as registry
+else:
+    from .student_router import student_router
+    from .instructor_router import instructor_router
+    from .registrar_router import registrar_router
+    from .db_connection import registry
+
+# Waitlist position streams are served on the event loop in both modes
+from .waitlist_stream import stream_router, waitlist_event_hub
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if settings.ENROLLMENT_SERVICE_MODE == "async":
+        await registry.open()
+    await waitlist_event_hub.start()
+    yield
+    await waitlist_event_hub.stop()
+    if settings.ENROLLMENT_SERVICE_MODE == "async":
+        await registry.close()
 
 # Create the main FastAPI application instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Attach the routers to the main application
 app.include_router(student_router)
 app.include_router(instructor_router)
 app.include_router(registrar_router)
+app.include_router(stream_router)
+
+@app.get("/stats/pools/", tags=["Internal"])
+def get_pool_stats():
+    """
+    Connection pool usage of the shared DynamoDB and Redis clients of this worker.
+    """
+    return {"mode": settings.ENROLLMENT_SERVICE_MODE, **registry.stats(),
+            "waitlist_streams": waitlist_event_hub.stats()}
+
+@app.get("/stats/class-cache/", tags=["Internal"])
+def get_class_cache_stats():
+    """
+    Size, hit and miss counters of this worker's class cache.
+    """
+    return class_cache.stats()
@@ -0,0 +1,87 @@
+import contextlib
+import aioboto3
+import redis.asyncio
+from botocore.config import Config
+from .db_connection import settings
+
+
+class AsyncClientRegistry:
+    """
+    Process-wide async DynamoDB (aioboto3) and Redis (redis.asyncio) clients.
+
+    aioboto3 resources are async context managers, so the registry is opened
+    once on application startup and closed on shutdown.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._exit_stack = None
+        self.dynamodb = None
+        self.redis = None
+        self._redis_pool = None
+        self._tables = {}
+
+    async def open(self):
+        self._exit_stack = contextlib.AsyncExitStack()
+        session = aioboto3.Session()
+        self.dynamodb = await self._exit_stack.enter_async_context(session.resource(
+            'dynamodb',
+            region_name=self.settings.AWS_REGION_NAME,
+            aws_access_key_id=self.settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=self.settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=self.settings.DYNAMODB_ENDPOINT_URL,
+            config=Config(
+                max_pool_connections=self.settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                retries={"max_attempts": 3, "mode": "standard"},
+            ),
+        ))
+        self._redis_pool = redis.asyncio.ConnectionPool(
+            host=self.settings.REDIS_HOST,
+            port=self.settings.REDIS_PORT,
+            max_connections=self.settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+        )
+        self.redis = redis.asyncio.Redis(connection_pool=self._redis_pool)
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+            await self._redis_pool.disconnect()
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self.dynamodb = self.redis = self._redis_pool = self._exit_stack = None
+        self._tables = {}
+
+    async def table(self, table_name):
+        """Returns a cached `Table` handle for `table_name`."""
+        table = self._tables.get(table_name)
+        if table is None:
+            table = self._tables[table_name] = await self.dynamodb.Table(table_name)
+        return table
+
+    def stats(self):
+        redis_stats = {"max_connections": self.settings.REDIS_MAX_CONNECTIONS}
+        if self._redis_pool is not None:
+            redis_stats.update({
+                "created_connections": self._redis_pool._created_connections,
+                "available_connections": len(self._redis_pool._available_connections),
+                "in_use_connections": len(self._redis_pool._in_use_connections),
+            })
+        return {
+            "dynamodb": {
+                "max_pool_connections": self.settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+                "cached_tables": sorted(self._tables),
+            },
+            "redis": redis_stats,
+        }
+
+
+# One registry per worker process, opened by the application lifespan
+async_registry = AsyncClientRegistry(settings)
+
+def get_async_db():
+    return async_registry.dynamodb
+
+def get_async_redis_db():
+    return async_registry.redis
@@ -0,0 +1,272 @@
+import asyncio
+import botocore
+from boto3.dynamodb.conditions import Key
+from fastapi import HTTPException, status
+
+from .availability_index import AsyncAvailabilityIndex, queue_adjust_open_seats
+from .class_cache import class_cache
+from .conditional import queue_touch_class
+from .ddb_enrollment_helper import (enroll_transact_items, drop_transact_items, is_class_full, is_not_enrolled,
+                                    promotion_transact_items, PROMOTION_CHUNK_SIZE, build_schedule,
+                                    schedule_class_ids, drop_count_query, build_instructor_classes)
+from .ddb_enrollment_schema import STUDENT_ID_INDEX, INSTRUCTOR_ID_INDEX
+from .pagination import async_query_all
+from .redis_keys import waitlist_key, student_waitlists_key
+from .waitlist_scripts import (ADMIT_TO_WAITLIST, admit_to_waitlist_params, POP_WAITLIST, pop_waitlist_params,
+                               parse_popped, queue_restore_waitlist)
+
+
+class AsyncDynamoDBRedisHelper:
+    """
+    `DynamoDBRedisHelper` for the async request path. Independent reads are
+    issued concurrently instead of one after the other.
+    """
+
+    def __init__(self, registry):
+        """
+        :param registry: The opened `AsyncClientRegistry` of the worker.
+        """
+        self.registry = registry
+        self._scripts = {}
+
+    @property
+    def dynamodb_resource(self):
+        return self.registry.dynamodb
+
+    @property
+    def redis_conn(self):
+        return self.registry.redis
+
+    @property
+    def availability_index(self):
+        return AsyncAvailabilityIndex(self.registry.dynamodb, self.registry.redis)
+
+    async def is_auto_enroll_enabled(self):
+        configs_table = await self.registry.table("configs_table")
+        response = await configs_table.get_item(Key={"variable_name": "automatic_enrollment"})
+
+        if "Item" in response:
+            return response["Item"]["value"] is True  # Check for boolean True
+        else:
+            return False
+
+    async def enroll_student(self, class_id, student_id, notify=False):
+        """
+        Reserves a seat and writes the enrollment record (and with `notify` its outbox
+        notification) in a single transaction.
+
+        Returns:
+        - True if the student was enrolled, False if the class is full.
+        """
+        if not await self._take_seat(class_id, student_id, notify):
+            return False
+        await self._record_seat_change(class_id, -1)
+        return True
+
+    async def _take_seat(self, class_id, student_id, notify):
+        transact_items = enroll_transact_items(class_id, student_id, notify)
+
+        try:
+            await self.dynamodb_resource.meta.client.transact_write_items(TransactItems=transact_items)
+        except botocore.exceptions.ClientError as e:
+            if is_class_full(e):
+                return False
+            raise
+        return True
+
+    async def drop_student(self, class_id, student_id, administrative=False):
+        """
+        Deletes the enrollment record, adds it to the droplist and releases the seat
+        in a single transaction.
+
+        Returns:
+        - True if the student was dropped, False if no enrollment record exists.
+        """
+        transact_items = drop_transact_items(class_id, student_id, administrative)
+
+        try:
+            await self.dynamodb_resource.meta.client.transact_write_items(TransactItems=transact_items)
+        except botocore.exceptions.ClientError as e:
+            if is_not_enrolled(e):
+                return False
+            raise
+
+        await self._record_seat_change(class_id, 1)
+        return True
+
+    def _script(self, source):
+        # The client only exists once the registry is opened, register scripts on first use
+        script = self._scripts.get(source)
+        if script is None or script.registered_client is not self.redis_conn:
+            script = self._scripts[source] = self.redis_conn.register_script(source)
+        return script
+
+    async def _record_seat_change(self, class_id, delta):
+        pipe = self.redis_conn.pipeline()
+        queue_adjust_open_seats(pipe, class_id, delta)
+        queue_touch_class(pipe, class_id)
+        await pipe.execute()
+
+    async def add_to_waitlist(self, class_id, student_id, waitlist_capacity, max_waitlists_per_student):
+        keys, args = admit_to_waitlist_params(class_id, student_id, waitlist_capacity, max_waitlists_per_student)
+        return await self._script(ADMIT_TO_WAITLIST)(keys=keys, args=args)
+
+    async def remove_from_waitlist(self, class_id, student_id):
+        pipe = self.redis_conn.pipeline()
+        pipe.zrem(waitlist_key(class_id), str(student_id))
+        pipe.srem(student_waitlists_key(student_id), str(class_id))
+        removed, _ = await pipe.execute()
+        if removed:
+            queue_touch_class(pipe, class_id)
+            await pipe.execute()
+        return bool(removed)
+
+    async def count_student_waitlists(self, student_id):
+        return await self.redis_conn.scard(student_waitlists_key(student_id))
+
+    async def get_student_waitlists(self, student_id):
+        class_ids = sorted(await self.redis_conn.smembers(student_waitlists_key(student_id)))
+        if not class_ids:
+            return []
+
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for class_id in class_ids:
+            pipe.zrank(waitlist_key(class_id), str(student_id))
+        ranks = await pipe.execute()
+
+        return [
+            {"class_id": class_id, "waitlist_position": rank + 1}
+            for class_id, rank in zip(class_ids, ranks)
+            if rank is not None
+        ]
+
+    async def _query_student_rows(self, table_name, student_id):
+        table = await self.registry.table(table_name)
+        return await async_query_all(table, IndexName=STUDENT_ID_INDEX,
+                                     KeyConditionExpression=Key("student_id").eq(str(student_id)))
+
+    async def get_student_schedule(self, student_id):
+        # Both GSI queries and the Redis lookups run concurrently
+        enrollments, drops, waitlists = await asyncio.gather(
+            self._query_student_rows("enrollment_table", student_id),
+            self._query_student_rows("droplist_table", student_id),
+            self.get_student_waitlists(student_id),
+        )
+        generation = class_cache.generation
+        cached, missing = class_cache.lookup(schedule_class_ids(enrollments, waitlists, drops))
+        classes = list(cached.values())
+        classes += [class_cache.put(item, generation)
+                    for item in await self.availability_index.batch_get_classes(missing)]
+        return build_schedule(student_id, enrollments, waitlists, drops, classes)
+
+    async def count_drops(self, class_id):
+        kwargs = drop_count_query(class_id)
+        count = 0
+        while True:
+            response = await self.dynamodb_resource.meta.client.query(**kwargs)
+            count += response["Count"]
+            if "LastEvaluatedKey" not in response:
+                return count
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    async def get_waitlist_lengths(self, class_ids):
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for class_id in class_ids:
+            pipe.zcard(waitlist_key(class_id))
+        return await pipe.execute()
+
+    async def get_instructor_classes(self, instructor_id):
+        class_table = await self.registry.table("class_table")
+        classes = await async_query_all(class_table, IndexName=INSTRUCTOR_ID_INDEX,
+                                        KeyConditionExpression=Key("instructor_id").eq(int(instructor_id)))
+        class_ids = [item["id"] for item in classes]
+
+        # One pipeline for the waitlists, one COUNT query per section, all at once
+        waitlist_lengths, *drop_counts = await asyncio.gather(
+            self.get_waitlist_lengths(class_ids),
+            *(self.count_drops(class_id) for class_id in class_ids),
+        )
+        return build_instructor_classes(instructor_id, classes, waitlist_lengths, drop_counts)
+
+    async def _get_class(self, class_id):
+        class_table = await self.registry.table("class_table")
+        response = await class_table.get_item(Key={"id": str(class_id)}, ConsistentRead=True)
+        return response.get("Item", {})
+
+    async def pop_waitlist(self, class_id, count):
+        keys, args = pop_waitlist_params(class_id, count)
+        return parse_popped(await self._script(POP_WAITLIST)(keys=keys, args=args))
+
+    async def restore_waitlist(self, class_id, members):
+        if not members:
+            return
+        pipe = self.redis_conn.pipeline()
+        queue_restore_waitlist(pipe, class_id, members)
+        await pipe.execute()
+
+    async def _enroll_one_by_one(self, class_id, members, placed):
+        enrolled, rejected = [], []
+        for student_id, score in members:
+            if rejected:
+                rejected.append((student_id, score))
+                continue
+            try:
+                if not await self._take_seat(class_id, student_id, notify=True):
+                    rejected.append((student_id, score))
+                    continue
+            except HTTPException as e:
+                if e.status_code != status.HTTP_409_CONFLICT:
+                    raise
+                placed.add(student_id)
+                continue
+            placed.add(student_id)
+            enrolled.append(student_id)
+            await self._record_seat_change(class_id, -1)
+        return enrolled, rejected
+
+    async def _enroll_chunk(self, class_id, members, room_capacity, placed):
+        student_ids = [student_id for student_id, _ in members]
+        try:
+            await self.dynamodb_resource.meta.client.transact_write_items(
+                TransactItems=promotion_transact_items(class_id, student_ids, room_capacity))
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            return await self._enroll_one_by_one(class_id, members, placed)
+
+        placed.update(student_ids)
+        await self._record_seat_change(class_id, -len(student_ids))
+        return student_ids, []
+
+    async def enroll_students_from_waitlist(self, class_id_list):
+        total_enrolled_from_waitlist = 0
+
+        for class_id in class_id_list:
+            class_id = str(class_id)
+            class_info = await self._get_class(class_id)
+            room_capacity = int(class_info.get("room_capacity", 0))
+            available_spots = room_capacity - int(class_info.get("enrolled_count", 0))
+            if available_spots <= 0:
+                continue
+
+            popped = await self.pop_waitlist(class_id, available_spots)
+            enrolled, rejected = [], []
+            placed = set()
+            try:
+                for i in range(0, len(popped), PROMOTION_CHUNK_SIZE):
+                    members = popped[i:i + PROMOTION_CHUNK_SIZE]
+                    if rejected:
+                        rejected.extend(members)
+                        continue
+                    chunk_enrolled, chunk_rejected = await self._enroll_chunk(class_id, members, room_capacity, placed)
+                    enrolled.extend(chunk_enrolled)
+                    rejected.extend(chunk_rejected)
+            except Exception:
+                await self.restore_waitlist(class_id, [member for member in popped if member[0] not in placed])
+                raise
+
+            if rejected:
+                await self.restore_waitlist(class_id, rejected)
+            total_enrolled_from_waitlist += len(enrolled)
+
+        return total_enrolled_from_waitlist
@@ -0,0 +1,162 @@
+from typing import Optional
+from fastapi import HTTPException, Header, Query, status, APIRouter, Request, Response
+from boto3.dynamodb.conditions import Key
+
+from .async_db_connection import async_registry
+from .async_ddb_enrollment_helper import AsyncDynamoDBRedisHelper
+from .redis_keys import waitlist_key
+from .conditional import async_read_validators, class_state_keys, request_variant, is_not_modified, not_modified_response
+from .pagination import async_query_page, waitlist_page_args, waitlist_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+ddb_helper_instance = AsyncDynamoDBRedisHelper(async_registry)
+
+instructor_router = APIRouter()
+
+@instructor_router.get("/instructors/me/classes/")
+async def get_my_classes(
+    instructor_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retreive every section taught by the instructor.
+
+    Parameters:
+    - instructor_id (int, In the header): A unique ID for students, instructors, and registrars.
+
+    Returns:
+    - dict: A dictionary containing the instructor's classes, each with its enrolled count,
+      waitlist length and drop count
+    """
+    try:
+        return await ddb_helper_instance.get_instructor_classes(instructor_id)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving classes: {str(e)}")
+
+@instructor_router.get("/classes/{class_id}/students")
+async def get_current_enrollment(class_id: str,
+                                 request: Request, response: Response,
+                                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                 cursor: Optional[str] = None):
+    """
+    Retreive current enrollment for the classes, one page at a time.
+
+    Parameters:
+    - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of enrollments to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
+
+    Returns:
+    - dict: A dictionary containing the enrollments and the cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try:
+        validators = await async_read_validators(
+            async_registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
+        enrollment_table_instance = await async_registry.table("enrollment_table")
+        items, next_cursor = await async_query_page(enrollment_table_instance, limit, cursor,
+                                                    KeyConditionExpression=Key('class_id').eq(str(class_id)))
+        return {'Items': items, 'next_cursor': next_cursor}
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving enrollment: {str(e)}")
+
+@instructor_router.get("/classes/{class_id}/waitlist/")
+async def get_waitlist(class_id: str,
+                       request: Request, response: Response,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: Optional[str] = None):
+    """
+    Retreive current waiting list for the class, one page at a time.
+
+    Parameters:
+    - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of students to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
+
+    Returns:
+    - dict: A dictionary containing the waitlisted students in order and the cursor of the next page
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try:
+        validators = await async_read_validators(
+            async_registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
+        members = await async_registry.redis.zrangebyscore(waitlist_key(class_id), **waitlist_page_args(limit, cursor))
+        waitlist, next_cursor = waitlist_page(members, limit)
+        return {"waitlist": waitlist, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving waitlist: {str(e)}")
+
+@instructor_router.get("/classes/{class_id}/droplist/")
+async def get_droplist(class_id: str,
+                       request: Request, response: Response,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: Optional[str] = None):
+    """
+    Retreive students who have dropped the class, one page at a time.
+
+    Parameters:
+    - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of drops to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
+
+    Returns:
+    - dict: A dictionary containing the drops and the cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try:
+        validators = await async_read_validators(
+            async_registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
+        droplist_table_instance = await async_registry.table("droplist_table")
+        items, next_cursor = await async_query_page(droplist_table_instance, limit, cursor,
+                                                    KeyConditionExpression=Key('class_id').eq(str(class_id)))
+        return {'Items': items, 'next_cursor': next_cursor}
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving drop list: {str(e)}")
+
+@instructor_router.delete("/enrollment/{class_id}/{student_id}/administratively/", status_code=status.HTTP_200_OK)
+async def drop_class(class_id: str, student_id: str):
+    """
+    Handles a DELETE request to administratively drop a student from a specific class.
+
+    Parameters:
+    - class_id (int): The ID of the class from which the student is being administratively dropped.
+    - student_id (int): The ID of the student being administratively dropped.
+
+    Returns:
+    - dict: A dictionary with the detail message indicating the success of the administrative drop.
+
+    Raises:
+    - HTTPException (404): If the student is not enrolled in the class.
+    """
+    try:
+        if not await ddb_helper_instance.drop_student(class_id, student_id, administrative=True):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found"
+            )
+
+        return {"detail": "Student successfully dropped from class."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error dropping student: {str(e)}")
@@ -0,0 +1,152 @@
+from typing import Annotated
+import botocore
+from fastapi import HTTPException, Body, status, APIRouter
+
+from .async_db_connection import async_registry
+from .availability_index import AsyncAvailabilityIndex
+from .class_cache import publish_class_invalidation
+from .conditional import queue_touch_class
+from .models import Course, ClassCreate, ClassPatch
+
+registrar_router = APIRouter()
+
+@registrar_router.put("/auto-enrollment/")
+async def set_auto_enrollment(enabled: Annotated[bool, Body(embed=True)]):
+    """
+    Endpoint for enabling/disabling automatic enrollment.
+
+    Parameters:
+    - enabled (bool): A boolean indicating whether automatic enrollment should be enabled or disabled.
+
+    Returns:
+        dict: A dictionary containing a detail message confirming the status of auto enrollment.
+    """
+    try:
+        table = await async_registry.table('configs_table')
+        await table.put_item(Item={'variable_name': 'automatic_enrollment', 'value': enabled})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating auto enrollment: {str(e)}")
+
+    return {"detail": f"Auto enrollment: {enabled}"}
+
+@registrar_router.post("/classes/", status_code=status.HTTP_201_CREATED)
+async def create_class(body_data: ClassCreate):
+    """
+    Creates a new class.
+
+    Parameters:
+    - `class` (ClassCreate): The JSON object representing the class.
+
+    Returns:
+    - dict: A dictionary containing the details of the created item.
+    """
+    try:
+        class_table_instance = await async_registry.table("class_table")
+
+        item_to_add = {**body_data.model_dump(), "enrolled_count": 0}
+        await class_table_instance.put_item(Item=item_to_add)
+        await AsyncAvailabilityIndex(async_registry.dynamodb, async_registry.redis).add_class(item_to_add)
+        await publish_class_invalidation(async_registry.redis, item_to_add["id"])
+
+        return {"added to class table": item_to_add}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating class: {str(e)}")
+
+@registrar_router.post("/courses/", status_code=status.HTTP_201_CREATED)
+async def create_course(course: Course):
+    """
+    Creates a new course with the provided details.
+
+    Parameters:
+    - `course` (CourseInput): JSON body input for the course.
+
+    Returns:
+    - dict: A dictionary containing the details of the created item.
+    """
+    try:
+        table = await async_registry.table('course_table')
+        await table.put_item(
+            Item={
+                'department_code': course.department_code,
+                'course_no': course.course_no,
+                'course_name': course.title
+            }
+        )
+
+        return {"Course created"}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating course: {str(e)}")
+
+@registrar_router.delete("/classes/{id}", status_code=status.HTTP_200_OK)
+async def delete_class(id: int):
+    """
+    Deletes a specific class.
+
+    Parameters:
+    - `id` (int): The ID of the class to delete.
+
+    Raises:
+    - HTTPException (404): If the class with the specified ID is not found.
+    """
+    try:
+        table = await async_registry.table('class_table')
+        response = await table.delete_item(Key={'id': str(id)}, ReturnValues='ALL_OLD')
+
+        if 'Attributes' not in response:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Class not found")
+
+        await AsyncAvailabilityIndex(async_registry.dynamodb, async_registry.redis).remove_class(response['Attributes'])
+        pipe = async_registry.redis.pipeline()
+        queue_touch_class(pipe, id)
+        publish_class_invalidation(pipe, id)
+        await pipe.execute()
+
+        return {"message": "Item deleted successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting class: {str(e)}")
+
+@registrar_router.patch("/classes/{id}", status_code=status.HTTP_200_OK)
+async def update_class(id: int, body_data: ClassPatch):
+    """
+    Updates specific details of a class.
+
+    Parameters:
+    - `class` (ClassPatch): The JSON object with the fields to update.
+
+    Raises:
+    - HTTPException (404): If the class with the specified ID is not found.
+    """
+    updates = body_data.model_dump(exclude_none=True)
+    if not updates:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+
+    try:
+        table = await async_registry.table('class_table')
+        response = await table.update_item(
+            Key={'id': str(id)},
+            UpdateExpression='SET ' + ', '.join(f'#{field} = :{field}' for field in updates),
+            ConditionExpression='attribute_exists(id)',
+            ExpressionAttributeNames={f'#{field}': field for field in updates},
+            ExpressionAttributeValues={f':{field}': value for field, value in updates.items()},
+            ReturnValues='ALL_NEW'
+        )
+
+        await AsyncAvailabilityIndex(async_registry.dynamodb, async_registry.redis).add_class(response['Attributes'])
+        pipe = async_registry.redis.pipeline()
+        queue_touch_class(pipe, id)
+        publish_class_invalidation(pipe, id)
+        await pipe.execute()
+
+        return {"message": "Item updated successfully"}
+
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Class not found")
+        raise HTTPException(status_code=500, detail=f"Error updating item: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating item: {str(e)}")
@@ -0,0 +1,248 @@
+import asyncio
+from typing import Annotated, Optional
+import botocore
+import redis
+from fastapi import HTTPException, Header, Body, Query, status, APIRouter, Request, Response
+from fastapi.responses import JSONResponse
+
+from .async_db_connection import async_registry
+from .async_ddb_enrollment_helper import AsyncDynamoDBRedisHelper
+from .availability_index import class_id_sort_key
+from .pagination import page_after, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .conditional import (async_read_validators, class_state_keys, availability_state_keys, request_variant,
+                          is_not_modified, not_modified_response)
+from .redis_keys import waitlist_key
+from .waitlist_scripts import WAITLIST_FULL, WAITLIST_LIMIT_REACHED
+
+WAITLIST_CAPACITY = 15
+MAX_NUMBER_OF_WAITLISTS_PER_STUDENT = 3
+
+ddb_helper_instance = AsyncDynamoDBRedisHelper(async_registry)
+
+student_router = APIRouter()
+
+@student_router.get("/classes/available/")
+async def get_available_classes(request: Request, response: Response,
+                                semester: Optional[str] = None, dept_code: Optional[str] = None,
+                                limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                cursor: Optional[str] = None):
+    """
+    Retreive classes with open seats, one page at a time.
+
+    Parameters:
+    - semester (str, optional): Only return classes offered in this semester (SP, SU, FA, WI).
+    - dept_code (str, optional): Only return classes offered by this department.
+    - limit (int, optional): The maximum number of classes to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
+
+    Returns:
+    - dict: A dictionary containing the details of the available classes and the
+      cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try:
+        validators = await async_read_validators(
+            async_registry.redis, availability_state_keys(), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
+        availability_index = ddb_helper_instance.availability_index
+        class_ids = await availability_index.get_available_class_ids(semester, dept_code)
+        class_ids, next_cursor = page_after(class_ids, limit, cursor, class_id_sort_key)
+        available_classes = await availability_index.batch_get_classes(class_ids)
+
+        return {"available_classes": available_classes, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving classes: {str(e)}")
+
+@student_router.post("/enrollment/")
+async def enroll(class_id: Annotated[int, Body(embed=True)],
+                 student_id: int = Header(
+                     alias="x-cwid", description="A unique ID for students, instructors, and registrars"),
+                 first_name: str = Header(alias="x-first-name"),
+                 last_name: str = Header(alias="x-last-name")):
+    """
+    Student enrolls in a class
+
+    Parameters:
+    - class_id (int, in the request body): The unique identifier of the class where students will be enrolled.
+    - student_id (int, in the request header): The unique identifier of the student who is enrolling.
+
+    Returns:
+    - HTTP_200_OK on success
+
+    Raises:
+    - HTTPException (400): If there are no available seats.
+    - HTTPException (404): If the specified class does not exist.
+    - HTTPException (409): If a conflict occurs (e.g., The student has already enrolled into the class).
+    - HTTPException (500): If there is an internal server error.
+    """
+    try:
+        class_id = str(class_id)
+        student_id = str(student_id)
+
+        # Reserve a seat with a conditional update on the class' seat counter
+        if await ddb_helper_instance.enroll_student(class_id, student_id):
+            return {"message": "Enrollment successful"}
+
+        # Class is full: admit to the waitlist with one server-side script
+        waitlist_position = await ddb_helper_instance.add_to_waitlist(
+            class_id, student_id, WAITLIST_CAPACITY, MAX_NUMBER_OF_WAITLISTS_PER_STUDENT)
+
+        if waitlist_position == WAITLIST_FULL:
+            raise HTTPException(status_code=400, detail="Class and waitlist are full.")
+        if waitlist_position == WAITLIST_LIMIT_REACHED:
+            raise HTTPException(status_code=400, detail="Maximum waitlist limit reached.")
+
+        return {"message": "Added to waitlist", "waitlist_position": waitlist_position}
+
+    except HTTPException:
+        raise
+
+    except botocore.exceptions.ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Botocore Client Error: {e}")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error during enrollment process: {str(e)}")
+
+@student_router.delete("/enrollment/{class_id}", status_code=status.HTTP_200_OK)
+async def drop_class(
+    class_id: int,
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")
+):
+    """
+    Handles a DELETE request to drop a student (himself/herself) from a specific class.
+
+    Parameters:
+    - class_id (int): The ID of the class from which the student wants to drop.
+    - student_id (int, in the header): A unique ID for students, instructors, and registrars.
+
+    Returns:
+    - dict: A dictionary with the detail message indicating the success of the operation.
+
+    Raises:
+    - HTTPException (404): If the specified enrollment record is not found.
+    - HTTPException (409): If a conflict occurs.
+    """
+    try:
+        class_id = str(class_id)
+        student_id = str(student_id)
+
+        # The auto enrollment flag does not depend on the drop, read it concurrently
+        dropped, auto_enroll_enabled = await asyncio.gather(
+            ddb_helper_instance.drop_student(class_id, student_id),
+            ddb_helper_instance.is_auto_enroll_enabled(),
+        )
+        if not dropped:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found"
+            )
+
+        if auto_enroll_enabled:
+            await ddb_helper_instance.enroll_students_from_waitlist([class_id])
+
+    except botocore.exceptions.ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"type": type(e).__name__, "msg": str(e)},
+        )
+
+    return {"detail": "Item deleted successfully"}
+
+@student_router.get("/waitlist/")
+async def get_my_waitlists(
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retrieve every waitlist the student is on with the current position in each
+
+    Returns:
+    - dict: A dictionary containing the student's waitlists and positions
+    """
+    try:
+        return {"waitlists": await ddb_helper_instance.get_student_waitlists(student_id)}
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving waitlists: {str(e)}")
+
+@student_router.get("/students/me/schedule/")
+async def get_my_schedule(
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retrieve the student's schedule: enrollments, waitlists with the current position
+    in each, and drops, each with the details of the class
+
+    Returns:
+    - dict: A dictionary containing the student's enrollments, waitlists and drops
+    """
+    try:
+        return await ddb_helper_instance.get_student_schedule(student_id)
+
+    except botocore.exceptions.ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Botocore Client Error: {e}")
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving schedule: {str(e)}")
+
+@student_router.get("/waitlist/{class_id}/position/")
+async def get_current_waitlist_position(
+    class_id: int,
+    request: Request,
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retrieve waitlist position
+
+    Returns:
+    - dict: A dictionary containing the user's waitlist position info
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try:
+        validators = await async_read_validators(
+            async_registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+
+        waitlist_position = await async_registry.redis.zrank(waitlist_key(class_id), str(student_id))
+
+        if waitlist_position is not None:
+            return JSONResponse(content={"class_id": class_id, "waitlist_position": waitlist_position + 1},
+                                headers=validators)
+
+        message = f"You are not in the waitlist for class {class_id}"
+        return JSONResponse(content={"class_id": class_id, "message": message}, headers=validators)
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving waitlist position: {str(e)}")
+
+@student_router.delete("/waitlist/{class_id}/")
+async def remove_from_waitlist(
+    class_id: int,
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Remove a student from the waitlist
+
+    Returns:
+    - dict: A message indicating successful removal
+
+    Raises:
+    - HTTPException: If student is not found on the waitlist
+    """
+    try:
+        if not await ddb_helper_instance.remove_from_waitlist(class_id, student_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found in Redis"
+            )
+
+        return {"detail": "Item deleted successfully"}
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error removing from waitlist: {str(e)}")
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from email.utils import formatdate
+
+try:
+    from .parallel_scan import parallel_scan, DEFAULT_SCAN_SEGMENTS
+except ImportError:  # Imported as a top-level module by ddb_enrollment_sample_data.py
+    from parallel_scan import parallel_scan, DEFAULT_SCAN_SEGMENTS
+
+logger = logging.getLogger(__name__)
+
+# Redis keys of the availability index
+OPEN_SEATS_KEY = "available_seats"                      # Sorted set: class_id -> open seats
+SEMESTER_INDEX_KEY = "class_index_semester_{semester}"  # Set of class_ids offered in a semester
+DEPARTMENT_INDEX_KEY = "class_index_dept_{dept_code}"   # Set of class_ids offered by a department
+AVAILABILITY_VERSION_KEY = "available_seats_version"            # Counter bumped by every change to the index
+AVAILABILITY_LAST_MODIFIED_KEY = "last-modified_available_seats"  # HTTP date of the last change to the index
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+
+
+def open_seats(class_item):
+    return int(class_item.get("room_capacity", 0)) - int(class_item.get("enrolled_count", 0))
+
+def queue_touch_availability(pipe):
+    """Queues the commands that record a change for conditional GETs of the available classes."""
+    pipe.incr(AVAILABILITY_VERSION_KEY)
+    pipe.set(AVAILABILITY_LAST_MODIFIED_KEY, formatdate(usegmt=True))
+
+def queue_add_class(pipe, class_item):
+    class_id = str(class_item["id"])
+    pipe.zadd(OPEN_SEATS_KEY, {class_id: open_seats(class_item)})
+    if class_item.get("semester") is not None:
+        pipe.sadd(SEMESTER_INDEX_KEY.format(semester=class_item["semester"]), class_id)
+    if class_item.get("dept_code") is not None:
+        pipe.sadd(DEPARTMENT_INDEX_KEY.format(dept_code=class_item["dept_code"]), class_id)
+    queue_touch_availability(pipe)
+
+def queue_remove_class(pipe, class_item):
+    class_id = str(class_item["id"])
+    pipe.zrem(OPEN_SEATS_KEY, class_id)
+    if class_item.get("semester") is not None:
+        pipe.srem(SEMESTER_INDEX_KEY.format(semester=class_item["semester"]), class_id)
+    if class_item.get("dept_code") is not None:
+        pipe.srem(DEPARTMENT_INDEX_KEY.format(dept_code=class_item["dept_code"]), class_id)
+    queue_touch_availability(pipe)
+
+def queue_adjust_open_seats(pipe, class_id, delta):
+    pipe.zincrby(OPEN_SEATS_KEY, delta, str(class_id))
+    queue_touch_availability(pipe)
+
+def queue_available_class_ids(pipe, semester=None, dept_code=None):
+    pipe.zrangebyscore(OPEN_SEATS_KEY, "(0", "+inf")
+    if semester is not None:
+        pipe.smembers(SEMESTER_INDEX_KEY.format(semester=semester))
+    if dept_code is not None:
+        pipe.smembers(DEPARTMENT_INDEX_KEY.format(dept_code=dept_code))
+
+def class_id_sort_key(class_id):
+    """Sorts numeric class IDs (stored as strings) numerically."""
+    return len(class_id), class_id
+
+def intersect_class_ids(results):
+    """Intersects the results of `queue_available_class_ids` and sorts them by ID."""
+    class_ids = set(results[0])
+    for members in results[1:]:
+        class_ids &= set(members)
+    return sorted(class_ids, key=class_id_sort_key)
+
+def batch_get_requests(class_ids):
+    """Splits `class_ids` into BatchGetItem request bodies of at most 100 keys."""
+    return [
+        {"class_table": {"Keys": [{"id": str(class_id)} for class_id in class_ids[i:i + BATCH_GET_LIMIT]]}}
+        for i in range(0, len(class_ids), BATCH_GET_LIMIT)
+    ]
+
+
+class AvailabilityIndex:
+    """
+    Maintains a Redis index of open seats per class so that available classes
+    can be listed without querying every class' enrollments.
+
+    The index is updated after each successful write to DynamoDB (enroll, drop,
+    waitlist promotion, class create/update/delete). `rebuild` recomputes it
+    from `class_table` in case it ever drifts.
+    """
+
+    def __init__(self, dynamodb_resource, redis_conn):
+        """
+        :param dynamodb_resource: A Boto3 DynamoDB resource.
+        :param redis_conn: A Redis connection created with decode_responses=True.
+        """
+        self.dynamodb_resource = dynamodb_resource
+        self.redis_conn = redis_conn
+
+    def add_class(self, class_item, pipe=None):
+        """
+        Adds (or re-adds) a class with its current number of open seats.
+
+        :param class_item: The class item as stored in `class_table`.
+        :param pipe: An optional Redis pipeline to queue the commands on.
+        """
+        if pipe is not None:
+            queue_add_class(pipe, class_item)
+            return
+        pipe = self.redis_conn.pipeline()
+        queue_add_class(pipe, class_item)
+        pipe.execute()
+
+    def remove_class(self, class_item):
+        """
+        Removes a class from the index.
+
+        :param class_item: The class item as it was stored in `class_table`.
+        """
+        pipe = self.redis_conn.pipeline()
+        queue_remove_class(pipe, class_item)
+        pipe.execute()
+
+    def adjust_open_seats(self, class_id, delta):
+        """
+        Adds `delta` to the number of open seats of a class.
+        A negative delta takes seats (enrollment), a positive one releases them (drop).
+        """
+        pipe = self.redis_conn.pipeline()
+        queue_adjust_open_seats(pipe, class_id, delta)
+        pipe.execute()
+
+    def get_available_class_ids(self, semester=None, dept_code=None):
+        """
+        Returns the IDs of the classes with at least one open seat, sorted by ID,
+        optionally restricted to a semester and/or a department. Uses one round trip.
+        """
+        pipe = self.redis_conn.pipeline(transaction=False)
+        queue_available_class_ids(pipe, semester, dept_code)
+        return intersect_class_ids(pipe.execute())
+
+    def batch_get_classes(self, class_ids):
+        """
+        Fetches class items with BatchGetItem, preserving the order of `class_ids`.
+        """
+        items_by_id = {}
+        for request_items in batch_get_requests(class_ids):
+            while request_items:
+                response = self.dynamodb_resource.batch_get_item(RequestItems=request_items)
+                for item in response.get("Responses", {}).get("class_table", []):
+                    items_by_id[item["id"]] = item
+                request_items = response.get("UnprocessedKeys")
+
+        return [items_by_id[str(class_id)] for class_id in class_ids if str(class_id) in items_by_id]
+
+    def rebuild(self, segments=DEFAULT_SCAN_SEGMENTS):
+        """
+        Recomputes the whole index from `class_table`, read with a parallel scan.
+
+        :param segments: The number of scan segments read concurrently.
+        :return: The number of indexed classes.
+        """
+        class_table = self.dynamodb_resource.Table("class_table")
+        pipe = self.redis_conn.pipeline()
+        pipe.delete(OPEN_SEATS_KEY)
+        for key in self.redis_conn.scan_iter(match="class_index_*"):
+            pipe.delete(key)
+
+        items = parallel_scan(class_table, segments)
+        for item in items:
+            self.add_class(item, pipe)
+
+        pipe.execute()
+        logger.info(f"Availability index rebuilt with {len(items)} classes")
+        return len(items)
+
+
+class AsyncAvailabilityIndex:
+    """
+    `AvailabilityIndex` for the async request path (aioboto3 resource, redis.asyncio client).
+    BatchGetItem chunks are fetched concurrently.
+    """
+
+    def __init__(self, dynamodb_resource, redis_conn):
+        self.dynamodb_resource = dynamodb_resource
+        self.redis_conn = redis_conn
+
+    async def add_class(self, class_item):
+        pipe = self.redis_conn.pipeline()
+        queue_add_class(pipe, class_item)
+        await pipe.execute()
+
+    async def remove_class(self, class_item):
+        pipe = self.redis_conn.pipeline()
+        queue_remove_class(pipe, class_item)
+        await pipe.execute()
+
+    async def adjust_open_seats(self, class_id, delta):
+        pipe = self.redis_conn.pipeline()
+        queue_adjust_open_seats(pipe, class_id, delta)
+        await pipe.execute()
+
+    async def get_available_class_ids(self, semester=None, dept_code=None):
+        pipe = self.redis_conn.pipeline(transaction=False)
+        queue_available_class_ids(pipe, semester, dept_code)
+        return intersect_class_ids(await pipe.execute())
+
+    async def _batch_get(self, request_items):
+        items = []
+        while request_items:
+            response = await self.dynamodb_resource.batch_get_item(RequestItems=request_items)
+            items.extend(response.get("Responses", {}).get("class_table", []))
+            request_items = response.get("UnprocessedKeys")
+        return items
+
+    async def batch_get_classes(self, class_ids):
+        chunks = await asyncio.gather(*(self._batch_get(request) for request in batch_get_requests(class_ids)))
+        items_by_id = {item["id"]: item for chunk in chunks for item in chunk}
+        return [items_by_id[str(class_id)] for class_id in class_ids if str(class_id) in items_by_id]
@@ -0,0 +1,70 @@
+"""
+One-shot backfill of the `enrolled_count` seat counter of class_table:
+
+    python -m ddb_enrollment_service.backfill_enrolled_count
+    python -m ddb_enrollment_service.backfill_enrolled_count --recount
+
+Enrollments only take a seat while enrolled_count < room_capacity, and a class
+without the attribute starts at 0, so a class created before the counter existed
+would accept a full room of new students on top of its current ones. The script
+counts each class' rows in enrollment_table and sets the counter of the classes
+that have none (every class with --recount), then rebuilds the Redis index of
+open seats from the new counts.
+
+Run it before the enrollment service takes traffic: an enrollment between the
+count and the update would not be included.
+"""
+import argparse
+import collections
+from botocore.exceptions import ClientError
+
+from .availability_index import AvailabilityIndex
+from .db_connection import registry
+from .parallel_scan import parallel_scan
+
+
+def count_enrollments(enrollment_table):
+    """Returns {class_id: number of enrollment rows}."""
+    items = parallel_scan(enrollment_table, ProjectionExpression="class_id")
+    return collections.Counter(str(item["class_id"]) for item in items)
+
+
+def backfill(class_table, enrollment_table, recount=False):
+    """
+    Returns:
+    - The number of classes whose counter was set.
+    """
+    counts = count_enrollments(enrollment_table)
+    updated = 0
+    for class_item in parallel_scan(class_table, ProjectionExpression="id, enrolled_count"):
+        class_id = str(class_item["id"])
+        if "enrolled_count" in class_item and (not recount or int(class_item["enrolled_count"]) == counts[class_id]):
+            continue
+        kwargs = {} if recount else {"ConditionExpression": "attribute_not_exists(enrolled_count)"}
+        try:
+            class_table.update_item(
+                Key={"id": class_id},
+                UpdateExpression="SET enrolled_count = :count",
+                ExpressionAttributeValues={":count": counts[class_id]},
+                **kwargs,
+            )
+            updated += 1
+        except ClientError as e:
+            # Set by an enrollment in the meantime
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Set enrolled_count of the classes from enrollment_table.")
+    parser.add_argument("--recount", action="store_true", help="Also correct classes that have a counter")
+    args = parser.parse_args()
+
+    updated = backfill(registry.table("class_table"), registry.table("enrollment_table"), args.recount)
+    print(f"Set enrolled_count of {updated} classes")
+    AvailabilityIndex(registry.dynamodb, registry.redis).rebuild()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import redis
+
+from .db_connection import registry, settings
+
+logger = logging.getLogger(__name__)
+
+# Redis channel the registrar endpoints publish changed class IDs on ("*" clears every cache)
+CLASS_INVALIDATION_CHANNEL = "class_invalidations"
+
+# Attributes that change on every enrollment and must be read from DynamoDB, not from the cache
+VOLATILE_ATTRIBUTES = ("enrolled_count",)
+
+
+def publish_class_invalidation(redis_conn, class_id="*"):
+    """
+    Tells every worker to evict a class from its `ClassCache`. `redis_conn` may be a
+    pipeline; with a redis.asyncio client the returned coroutine must be awaited.
+    """
+    return redis_conn.publish(CLASS_INVALIDATION_CHANNEL, str(class_id))
+
+
+class ClassCache:
+    """
+    In-process LRU cache of `class_table` items with a TTL, one per worker.
+
+    Class metadata (capacity, dates, instructor, ...) only changes when a registrar
+    creates, updates or deletes a class. Those endpoints publish the class ID on
+    CLASS_INVALIDATION_CHANNEL and a listener thread in every worker evicts it, so
+    the TTL only bounds staleness if an invalidation is lost. The listener clears the
+    whole cache whenever it (re)connects, since messages may have been missed.
+
+    Volatile attributes (the seat counter) are not cached.
+
+    Every invalidation bumps `generation`. A reader takes it before reading DynamoDB
+    and passes it to `put`, which does not cache the item if an invalidation arrived
+    meanwhile, since the item may predate it.
+    """
+
+    def __init__(self, registry, maxsize, ttl):
+        """
+        :param registry: The `ClientRegistry` to read classes and subscribe with.
+        :param maxsize: The maximum number of cached classes.
+        :param ttl: Seconds after which a cached class is read again.
+        """
+        self.registry = registry
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()  # class_id -> (expires_at, item)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _start_listener(self):
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="class-cache-invalidation", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self.registry.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CLASS_INVALIDATION_CHANNEL)
+                self.clear()
+                for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    if message["data"] == "*":
+                        self.clear()
+                    else:
+                        self.invalidate(message["data"])
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Class cache invalidation listener disconnected: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def lookup(self, class_ids):
+        """
+        Looks classes up in the cache only.
+
+        Returns:
+        - A tuple (cached items by class_id, IDs of the classes that must be read).
+        """
+        self._start_listener()
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for class_id in map(str, class_ids):
+                entry = self._items.get(class_id)
+                if entry is not None and entry[0] > now:
+                    self._items.move_to_end(class_id)
+                    found[class_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(class_id)
+                    self.misses += 1
+        return found, missing
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, item, generation):
+        """
+        Caches a `class_table` item (without its volatile attributes) and returns that copy.
+
+        :param generation: `generation` taken before the item was read; the item is
+            returned but not cached if an invalidation arrived since.
+        """
+        item = {key: value for key, value in item.items() if key not in VOLATILE_ATTRIBUTES}
+        with self._lock:
+            if generation != self._generation:
+                return item
+            self._items[str(item["id"])] = (time.monotonic() + self.ttl, item)
+            self._items.move_to_end(str(item["id"]))
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return item
+
+    def invalidate(self, class_id):
+        with self._lock:
+            self._items.pop(str(class_id), None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+class_cache = ClassCache(registry, settings.CLASS_CACHE_MAXSIZE, settings.CLASS_CACHE_TTL)
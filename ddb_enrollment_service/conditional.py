@@ -0,0 +1,106 @@
+import hashlib
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response, status
+
+from .availability_index import AVAILABILITY_VERSION_KEY, AVAILABILITY_LAST_MODIFIED_KEY
+from .redis_keys import class_version_key, last_modified_key, CLASS_CHANGES_CHANNEL
+
+# Conditional GET support for the read endpoints.
+#
+# Every resource scope (a class, or the availability index) has a version counter that
+# each mutation INCRs and the HTTP date of the last mutation. Both are read with one
+# MGET; the ETag is derived from them and from the request (path, query, caller), so a
+# 304 can be answered without touching DynamoDB.
+
+
+def http_date():
+    """The current time as an HTTP date (IMF-fixdate, always GMT)."""
+    return formatdate(usegmt=True)
+
+def queue_touch_class(pipe, class_id):
+    """
+    Queues the commands that record a change to a class (roster, droplist or waitlist)
+    and announce it to the waitlist position streams.
+    """
+    pipe.incr(class_version_key(class_id))
+    pipe.set(last_modified_key(class_id), http_date())
+    pipe.publish(CLASS_CHANGES_CHANNEL, str(class_id))
+
+def class_state_keys(class_id):
+    return [class_version_key(class_id), last_modified_key(class_id)]
+
+def availability_state_keys():
+    return [AVAILABILITY_VERSION_KEY, AVAILABILITY_LAST_MODIFIED_KEY]
+
+def request_variant(request: Request):
+    """What, besides the version, the representation depends on: the URL and the caller."""
+    return f"{request.url.path}?{request.url.query}|{request.headers.get('x-cwid', '')}"
+
+def validator_headers(version, last_modified, variant):
+    """
+    Response headers for a representation. The last-modified date is part of the ETag
+    so a version counter that restarts (e.g. after Redis lost its data) can't reproduce
+    an old tag.
+    """
+    digest = hashlib.sha1(f"{version}|{last_modified}|{variant}".encode()).hexdigest()[:24]
+    return {
+        "ETag": f'"{digest}"',
+        "Last-Modified": last_modified,
+        "Cache-Control": "private, no-cache",
+    }
+
+def _queue_seed(pipe, keys):
+    # A scope that was never modified starts at version 0, modified now
+    pipe.set(keys[0], 0, nx=True)
+    pipe.set(keys[1], http_date(), nx=True)
+    pipe.mget(keys)
+
+def read_validators(redis_conn, keys, variant):
+    """
+    Reads the state of a scope (`class_state_keys` or `availability_state_keys`) and
+    returns the validator headers. Read them before the data they describe: a change in
+    between then only costs the client one more full response.
+    """
+    version, last_modified = redis_conn.mget(keys)
+    if version is None or last_modified is None:
+        pipe = redis_conn.pipeline()
+        _queue_seed(pipe, keys)
+        version, last_modified = pipe.execute()[-1]
+    return validator_headers(version, last_modified, variant)
+
+async def async_read_validators(redis_conn, keys, variant):
+    """`read_validators` for a redis.asyncio client."""
+    version, last_modified = await redis_conn.mget(keys)
+    if version is None or last_modified is None:
+        pipe = redis_conn.pipeline()
+        _queue_seed(pipe, keys)
+        version, last_modified = (await pipe.execute())[-1]
+    return validator_headers(version, last_modified, variant)
+
+def _parse_http_date(value):
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+def is_not_modified(request: Request, headers):
+    """
+    Evaluates If-None-Match, or If-Modified-Since when there is no If-None-Match
+    (RFC 9110, section 13.2.2), against the validator headers.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses the weak comparison
+        return "*" in tags or any(tag.removeprefix("W/") == headers["ETag"] for tag in tags)
+
+    if_modified_since = _parse_http_date(request.headers.get("if-modified-since"))
+    last_modified = _parse_http_date(headers["Last-Modified"])
+    if if_modified_since is None or last_modified is None:
+        return False
+    return last_modified <= if_modified_since
+
+def not_modified_response(headers):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -1,15 +1,135 @@
+import threading
 import boto3
 import redis
+from botocore.config import Config
+from pydantic_settings import BaseSettings
 
-def get_db():
+class Settings(BaseSettings, env_file=".env", extra="ignore"):
+    DYNAMODB_ENDPOINT_URL: str = "http://localhost:8000"
+    AWS_REGION_NAME: str = "local"
+    AWS_ACCESS_KEY_ID: str = "enrollment"
+    AWS_SECRET_ACCESS_KEY: str = "123456"
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = 64
+    REDIS_HOST: str = "localhost"
+    REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 64
+    ENROLLMENT_SERVICE_MODE: str = "sync"  # "sync" or "async" request path
+    CLASS_CACHE_MAXSIZE: int = 1024        # Classes kept in each worker's class cache
+    CLASS_CACHE_TTL: float = 300           # Seconds before a cached class is read again
+    WAITLIST_STREAM_HEARTBEAT: float = 15  # Seconds between keep-alives on idle waitlist position streams
+    KNOWN_IDS_REFRESH_INTERVAL: float = 300  # Seconds between reloads of the notification service's ID sets
+    KNOWN_IDS_NEGATIVE_TTL: float = 30     # Seconds a nonexistent class/student ID is rejected without a lookup
+
+settings = Settings()
+
+
+class ClientRegistry:
+    """
+    Process-wide DynamoDB and Redis clients.
+
+    Everything is created lazily, once per worker, and shared by all request
+    threads: one DynamoDB resource backed by a pooled botocore client, cached
+    `Table` handles (no DescribeTable round trip), and one Redis ConnectionPool.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._dynamodb_resource = None
+        self._redis_pool = None
+        self._redis = None
+        self._tables = {}
+        self._dynamodb_stats = {"calls": 0, "in_flight": 0, "peak_in_flight": 0, "errors": 0}
+
+    @property
+    def dynamodb(self):
+        if self._dynamodb_resource is None:
+            with self._lock:
+                if self._dynamodb_resource is None:
+                    resource = boto3.resource(
+                        'dynamodb',
+                        region_name=self.settings.AWS_REGION_NAME,
+                        aws_access_key_id=self.settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key=self.settings.AWS_SECRET_ACCESS_KEY,
+                        endpoint_url=self.settings.DYNAMODB_ENDPOINT_URL,
+                        config=Config(
+                            max_pool_connections=self.settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+                            tcp_keepalive=True,
+                            retries={"max_attempts": 3, "mode": "standard"},
+                        ),
+                    )
+                    events = resource.meta.client.meta.events
+                    events.register('before-call.dynamodb', self._on_before_call)
+                    events.register('after-call.dynamodb', self._on_after_call)
+                    events.register('after-call-error.dynamodb', self._on_after_call_error)
+                    self._dynamodb_resource = resource
+        return self._dynamodb_resource
+
+    def table(self, table_name):
+        """Returns a cached `Table` handle for `table_name`."""
+        table = self._tables.get(table_name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(table_name)
+                if table is None:
+                    table = self._tables[table_name] = self.dynamodb.Table(table_name)
+        return table
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            with self._lock:
+                if self._redis is None:
+                    self._redis_pool = redis.ConnectionPool(
+                        host=self.settings.REDIS_HOST,
+                        port=self.settings.REDIS_PORT,
+                        max_connections=self.settings.REDIS_MAX_CONNECTIONS,
+                        decode_responses=True,
+                    )
+                    self._redis = redis.Redis(connection_pool=self._redis_pool)
+        return self._redis
 
-    dynamodb_resource = boto3.resource(
-    'dynamodb',
-    #aws_access_key_id='fakeMyKeyId',
-    #aws_secret_access_key='fakeSecretAccessKey',
-    endpoint_url='http://localhost:8000'
-)
-    return dynamodb_resource
+    def _on_before_call(self, **kwargs):
+        with self._lock:
+            stats = self._dynamodb_stats
+            stats["calls"] += 1
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+
+    def _on_after_call(self, http_response=None, **kwargs):
+        with self._lock:
+            self._dynamodb_stats["in_flight"] -= 1
+            if http_response is not None and http_response.status_code >= 400:
+                self._dynamodb_stats["errors"] += 1
+
+    def _on_after_call_error(self, **kwargs):
+        with self._lock:
+            self._dynamodb_stats["in_flight"] -= 1
+            self._dynamodb_stats["errors"] += 1
+
+    def stats(self):
+        """Returns pool usage of the DynamoDB client and the Redis connection pool."""
+        with self._lock:
+            dynamodb_stats = dict(self._dynamodb_stats)
+        dynamodb_stats["max_pool_connections"] = self.settings.DYNAMODB_MAX_POOL_CONNECTIONS
+        dynamodb_stats["cached_tables"] = sorted(self._tables)
+
+        redis_stats = {"max_connections": self.settings.REDIS_MAX_CONNECTIONS}
+        if self._redis_pool is not None:
+            redis_stats.update({
+                "created_connections": self._redis_pool._created_connections,
+                "available_connections": len(self._redis_pool._available_connections),
+                "in_use_connections": len(self._redis_pool._in_use_connections),
+            })
+
+        return {"dynamodb": dynamodb_stats, "redis": redis_stats}
+
+
+# One registry per worker process
+registry = ClientRegistry(settings)
+
+def get_db():
+    return registry.dynamodb
 
 def get_redis_db():
-    return redis.Redis()
\ No newline at end of file
+    return registry.redis
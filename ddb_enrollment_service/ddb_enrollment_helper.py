@@ -1,26 +1,227 @@
-import boto3
-import redis
-from datetime import datetime, timedelta
-from fastapi import HTTPException, status, Header
+import botocore
+from datetime import datetime
+from fastapi import HTTPException, status
 from boto3.dynamodb.conditions import Key
-from starlette.responses import Response
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
-from notification_service.email_notification import emit_log
+from .availability_index import AvailabilityIndex, class_id_sort_key, queue_adjust_open_seats
+from .class_cache import class_cache
+from .conditional import queue_touch_class
+from .db_connection import registry
+from .ddb_enrollment_schema import STUDENT_ID_INDEX, INSTRUCTOR_ID_INDEX
+from .pagination import query_all
+from .outbox import OUTBOX_TABLE, outbox_item
+from .redis_keys import waitlist_key, student_waitlists_key
+from .waitlist_scripts import (ADMIT_TO_WAITLIST, admit_to_waitlist_params, POP_WAITLIST, pop_waitlist_params,
+                               parse_popped, queue_restore_waitlist)
 
-# Create Boto3 DynamoDB resource
-dynamodb_resource = boto3.resource(
-    'dynamodb',
-    endpoint_url='http://localhost:5300'
-)
+# TransactWriteItems accepts at most 100 items; one of them is the class' seat counter
+# and every promoted student takes two (the enrollment and the outbox record)
+PROMOTION_CHUNK_SIZE = 49
 
-# Create Redis connection
-redis_conn = redis.Redis(decode_responses=True)
+# The builders below are sent through the resource's client (dynamodb_resource.meta.client),
+# which serializes plain Python values itself, like Table calls do
+
+def outbox_put(class_id, student_id):
+    return {
+        'Put': {
+            'TableName': OUTBOX_TABLE,
+            'Item': outbox_item(class_id, student_id)
+        }
+    }
+
+def enroll_transact_items(class_id, student_id, notify=False):
+    """
+    TransactWriteItems that take a seat (only while enrolled_count < room_capacity)
+    and write the enrollment record, plus its outbox notification if `notify` is set.
+    """
+    class_id = str(class_id)
+    student_id = str(student_id)
+    transact_items = [
+        {
+            'Update': {
+                'TableName': 'class_table',
+                'Key': {'id': class_id},
+                'UpdateExpression': 'SET enrolled_count = if_not_exists(enrolled_count, :zero) + :one',
+                'ConditionExpression': 'attribute_exists(id) AND '
+                                       '(attribute_not_exists(enrolled_count) OR enrolled_count < room_capacity)',
+                'ExpressionAttributeValues': {':zero': 0, ':one': 1},
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }
+        },
+        {
+            'Put': {
+                'TableName': 'enrollment_table',
+                'Item': {
+                    'class_id': class_id,
+                    'student_id': student_id,
+                    'enrollment_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                },
+                'ConditionExpression': 'attribute_not_exists(student_id)'
+            }
+        }
+    ]
+    if notify:
+        transact_items.append(outbox_put(class_id, student_id))
+    return transact_items
+
+def is_class_full(error):
+    """
+    Interprets a cancelled `enroll_transact_items` transaction.
+
+    Returns True if the class is full, raises HTTPException (404/409) if the class does not
+    exist or the student is already enrolled, and returns False for any other cause.
+    """
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return False
+    class_reason, enrollment_reason = error.response.get('CancellationReasons', [{}, {}])[:2]
+    if enrollment_reason.get('Code') == 'ConditionalCheckFailed':
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already enrolled in this class")
+    if class_reason.get('Code') == 'ConditionalCheckFailed':
+        if 'Item' not in class_reason:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Class not found")
+        return True
+    return False
+
+def drop_transact_items(class_id, student_id, administrative=False):
+    """
+    TransactWriteItems that delete the enrollment record, add it to the droplist
+    and release the seat.
+    """
+    class_id = str(class_id)
+    student_id = str(student_id)
+    transact_items = [
+        {
+            'Delete': {
+                'TableName': 'enrollment_table',
+                'Key': {'class_id': class_id, 'student_id': student_id},
+                'ConditionExpression': 'attribute_exists(student_id)'
+            }
+        },
+        {
+            'Put': {
+                'TableName': 'droplist_table',
+                'Item': {
+                    'class_id': class_id,
+                    'student_id': student_id,
+                    'drop_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'administrative': administrative
+                }
+            }
+        },
+        {
+            'Update': {
+                'TableName': 'class_table',
+                'Key': {'id': class_id},
+                'UpdateExpression': 'SET enrolled_count = if_not_exists(enrolled_count, :one) - :one',
+                'ConditionExpression': 'attribute_exists(id)',
+                'ExpressionAttributeValues': {':one': 1}
+            }
+        }
+    ]
+    return transact_items
+
+def promotion_transact_items(class_id, student_ids, room_capacity):
+    """
+    TransactWriteItems that take len(student_ids) seats at once (only if they all fit
+    into `room_capacity`) and write one enrollment record and one outbox notification
+    per student.
+    """
+    class_id = str(class_id)
+    enrollment_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    transact_items = [
+        {
+            'Update': {
+                'TableName': 'class_table',
+                'Key': {'id': class_id},
+                'UpdateExpression': 'SET enrolled_count = if_not_exists(enrolled_count, :zero) + :count',
+                'ConditionExpression': 'attribute_exists(id) AND room_capacity = :capacity AND '
+                                       '(attribute_not_exists(enrolled_count) OR enrolled_count <= :max_before)',
+                'ExpressionAttributeValues': {
+                    ':zero': 0,
+                    ':count': len(student_ids),
+                    ':capacity': room_capacity,
+                    ':max_before': room_capacity - len(student_ids)
+                }
+            }
+        }
+    ]
+    for student_id in student_ids:
+        transact_items.append({
+            'Put': {
+                'TableName': 'enrollment_table',
+                'Item': {
+                    'class_id': class_id,
+                    'student_id': str(student_id),
+                    'enrollment_date': enrollment_date
+                },
+                'ConditionExpression': 'attribute_not_exists(student_id)'
+            }
+        })
+        transact_items.append(outbox_put(class_id, student_id))
+    return transact_items
+
+def is_not_enrolled(error):
+    """Returns True if a `drop_transact_items` transaction was cancelled because there was no enrollment."""
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return False
+    enrollment_reason = error.response.get('CancellationReasons', [{}])[0]
+    return enrollment_reason.get('Code') == 'ConditionalCheckFailed'
+
+def build_schedule(student_id, enrollments, waitlists, drops, classes):
+    """
+    Assembles the response of the student schedule endpoint.
+
+    :param enrollments: The student's enrollment_table items.
+    :param waitlists: The result of `get_student_waitlists`.
+    :param drops: The student's droplist_table items.
+    :param classes: The class_table items of every class referenced above.
+    """
+    classes_by_id = {item["id"]: item for item in classes}
+    hydrate = lambda row: dict(row, **{"class": classes_by_id.get(str(row["class_id"]))})
+    return {
+        "student_id": str(student_id),
+        "enrollments": [hydrate(item) for item in enrollments],
+        "waitlists": [hydrate(item) for item in waitlists],
+        "drops": [hydrate(item) for item in drops],
+    }
+
+def schedule_class_ids(enrollments, waitlists, drops):
+    class_ids = {str(row["class_id"]) for rows in (enrollments, waitlists, drops) for row in rows}
+    return sorted(class_ids, key=class_id_sort_key)
+
+def drop_count_query(class_id):
+    """Low-level Query that counts the drops of a class without returning them."""
+    return {
+        'TableName': 'droplist_table',
+        'KeyConditionExpression': 'class_id = :class_id',
+        'ExpressionAttributeValues': {':class_id': str(class_id)},
+        'Select': 'COUNT'
+    }
+
+def build_instructor_classes(instructor_id, classes, waitlist_lengths, drop_counts):
+    """Assembles the response of the instructor dashboard endpoint."""
+    return {
+        "instructor_id": int(instructor_id),
+        "classes": [
+            dict(item,
+                 enrolled_count=int(item.get("enrolled_count", 0)),
+                 waitlist_length=waitlist_length,
+                 drop_count=drop_count)
+            for item, waitlist_length, drop_count in zip(classes, waitlist_lengths, drop_counts)
+        ],
+    }
+
+# Upper bound on the concurrent droplist COUNT queries of one request
+MAX_CONCURRENT_QUERIES = 8
 
 class DynamoDBRedisHelper:
     def __init__(self, dynamodb_resource, redis_conn):
         self.dynamodb_resource = dynamodb_resource
         self.redis_conn = redis_conn
+        self.availability_index = AvailabilityIndex(dynamodb_resource, redis_conn)
+        self.admit_to_waitlist_script = redis_conn.register_script(ADMIT_TO_WAITLIST)
+        self.pop_waitlist_script = redis_conn.register_script(POP_WAITLIST)
 
     def is_auto_enroll_enabled(self):
         configs_table = self.dynamodb_resource.Table("configs_table")
@@ -31,103 +232,301 @@ class DynamoDBRedisHelper:
         else:
             return False
 
-    
+
+
+    def _record_seat_change(self, class_id, delta):
+        """
+        Records that seats of a class were taken (negative delta) or released in the
+        availability index and in the class' version for conditional GETs.
+        """
+        pipe = self.redis_conn.pipeline()
+        queue_adjust_open_seats(pipe, class_id, delta)
+        queue_touch_class(pipe, class_id)
+        pipe.execute()
+
+    def enroll_student(self, class_id, student_id, notify=False):
+        """
+        Reserves a seat and writes the enrollment record in a single transaction.
+        With `notify` the transaction also writes an outbox notification for the student.
+
+        The seat counter (`enrolled_count`) on the class item is only incremented while
+        it is below `room_capacity`, so concurrent requests can never oversubscribe a class.
+
+        Returns:
+        - True if the student was enrolled, False if the class is full.
+
+        Raises:
+        - HTTPException (404): If the class does not exist.
+        - HTTPException (409): If the student is already enrolled in the class.
+        """
+        if not self._take_seat(class_id, student_id, notify):
+            return False
+        self._record_seat_change(class_id, -1)
+        return True
+
+    def _take_seat(self, class_id, student_id, notify):
+        """The transaction of `enroll_student`, without the Redis bookkeeping."""
+        transact_items = enroll_transact_items(class_id, student_id, notify)
+
+        try:
+            self.dynamodb_resource.meta.client.transact_write_items(TransactItems=transact_items)
+        except botocore.exceptions.ClientError as e:
+            if is_class_full(e):
+                return False
+            raise
+        return True
+
+    def drop_student(self, class_id, student_id, administrative=False):
+        """
+        Deletes the enrollment record, adds it to the droplist and releases the seat
+        in a single transaction.
+
+        Returns:
+        - True if the student was dropped, False if no enrollment record exists.
+        """
+        transact_items = drop_transact_items(class_id, student_id, administrative)
+
+        try:
+            self.dynamodb_resource.meta.client.transact_write_items(TransactItems=transact_items)
+        except botocore.exceptions.ClientError as e:
+            if is_not_enrolled(e):
+                return False
+            raise
+
+        self._record_seat_change(class_id, 1)
+        return True
+
+    def add_to_waitlist(self, class_id, student_id, waitlist_capacity, max_waitlists_per_student):
+        """
+        Adds a student to the end of a class' waitlist and to the student's waitlist index,
+        enforcing the waitlist capacity and the per-student limit, with one server-side script.
+
+        Returns:
+        - The student's waitlist position, or WAITLIST_FULL / WAITLIST_LIMIT_REACHED.
+        """
+        keys, args = admit_to_waitlist_params(class_id, student_id, waitlist_capacity, max_waitlists_per_student)
+        return self.admit_to_waitlist_script(keys=keys, args=args)
+
+    def remove_from_waitlist(self, class_id, student_id):
+        """
+        Removes a student from a class' waitlist and from the student's waitlist index
+        in one MULTI/EXEC transaction.
+
+        Returns:
+        - True if the student was on the waitlist, False otherwise.
+        """
+        pipe = self.redis_conn.pipeline()
+        pipe.zrem(waitlist_key(class_id), str(student_id))
+        pipe.srem(student_waitlists_key(student_id), str(class_id))
+        removed, _ = pipe.execute()
+        if removed:
+            queue_touch_class(pipe, class_id)
+            pipe.execute()
+        return bool(removed)
+
+    def count_student_waitlists(self, student_id):
+        return self.redis_conn.scard(student_waitlists_key(student_id))
+
+    def get_student_waitlists(self, student_id):
+        """
+        Returns the classes a student is waitlisted for with the (1-based) position in each,
+        fetching every position in one pipelined round trip.
+        """
+        class_ids = sorted(self.redis_conn.smembers(student_waitlists_key(student_id)))
+        if not class_ids:
+            return []
+
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for class_id in class_ids:
+            pipe.zrank(waitlist_key(class_id), str(student_id))
+        ranks = pipe.execute()
+
+        return [
+            {"class_id": class_id, "waitlist_position": rank + 1}
+            for class_id, rank in zip(class_ids, ranks)
+            if rank is not None
+        ]
+
+    def get_student_schedule(self, student_id):
+        """
+        Returns a student's enrollments, waitlists (with positions) and drops, each with
+        the details of the class. The enrollments and drops are read from the student_id
+        GSIs and the classes missing from the class cache are fetched with one BatchGetItem.
+        """
+        student_id = str(student_id)
+        key_condition = Key("student_id").eq(student_id)
+        enrollments = query_all(self.dynamodb_resource.Table("enrollment_table"),
+                                IndexName=STUDENT_ID_INDEX, KeyConditionExpression=key_condition)
+        drops = query_all(self.dynamodb_resource.Table("droplist_table"),
+                          IndexName=STUDENT_ID_INDEX, KeyConditionExpression=key_condition)
+        waitlists = self.get_student_waitlists(student_id)
+
+        # Class details come from the class cache, only misses go to DynamoDB
+        generation = class_cache.generation
+        cached, missing = class_cache.lookup(schedule_class_ids(enrollments, waitlists, drops))
+        classes = list(cached.values())
+        classes += [class_cache.put(item, generation)
+                    for item in self.availability_index.batch_get_classes(missing)]
+        return build_schedule(student_id, enrollments, waitlists, drops, classes)
+
+    def count_drops(self, class_id):
+        # The low-level client is thread-safe, unlike resources
+        client = self.dynamodb_resource.meta.client
+        kwargs = drop_count_query(class_id)
+        count = 0
+        while True:
+            response = client.query(**kwargs)
+            count += response["Count"]
+            if "LastEvaluatedKey" not in response:
+                return count
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def get_waitlist_lengths(self, class_ids):
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for class_id in class_ids:
+            pipe.zcard(waitlist_key(class_id))
+        return pipe.execute()
+
+    def get_instructor_classes(self, instructor_id):
+        """
+        Returns every section taught by an instructor with its enrolled count, waitlist
+        length and drop count.
+
+        The sections come from the instructor_id GSI of class_table (enrolled_count is
+        kept on the class item). The waitlist lengths are read with one pipelined ZCARD
+        per section while the drops are counted with concurrent COUNT queries.
+        """
+        classes = query_all(self.dynamodb_resource.Table("class_table"), IndexName=INSTRUCTOR_ID_INDEX,
+                            KeyConditionExpression=Key("instructor_id").eq(int(instructor_id)))
+        if not classes:
+            return build_instructor_classes(instructor_id, [], [], [])
+
+        class_ids = [item["id"] for item in classes]
+        with ThreadPoolExecutor(max_workers=min(len(class_ids), MAX_CONCURRENT_QUERIES)) as executor:
+            drop_counts = executor.map(self.count_drops, class_ids)
+            waitlist_lengths = self.get_waitlist_lengths(class_ids)
+            drop_counts = list(drop_counts)
+
+        return build_instructor_classes(instructor_id, classes, waitlist_lengths, drop_counts)
+
+    def pop_waitlist(self, class_id, count):
+        """
+        Atomically pops the first `count` students of a class' waitlist (and removes the
+        class from their waitlist indexes).
+
+        Returns:
+        - A list of (student_id, score) tuples in waitlist order.
+        """
+        keys, args = pop_waitlist_params(class_id, count)
+        return parse_popped(self.pop_waitlist_script(keys=keys, args=args))
+
+    def restore_waitlist(self, class_id, members):
+        """Puts popped (student_id, score) members back on the waitlist at their original place."""
+        if not members:
+            return
+        pipe = self.redis_conn.pipeline()
+        queue_restore_waitlist(pipe, class_id, members)
+        pipe.execute()
+
+    def _enroll_one_by_one(self, class_id, members, placed):
+        """
+        Fallback for a cancelled promotion transaction (a student is already enrolled, or
+        seats were taken meanwhile).
+
+        :param placed: Set the student_ids that hold a seat are added to as soon as they
+            do, so they are known even if a later student raises.
+
+        Returns:
+        - The enrolled student_ids and the members that did not fit into the class.
+        """
+        enrolled, rejected = [], []
+        for student_id, score in members:
+            if rejected:
+                rejected.append((student_id, score))
+                continue
+            try:
+                if not self._take_seat(class_id, student_id, notify=True):
+                    rejected.append((student_id, score))
+                    continue
+            except HTTPException as e:
+                if e.status_code != status.HTTP_409_CONFLICT:
+                    raise
+                # Already enrolled, so not back on the waitlist either
+                placed.add(student_id)
+                continue
+            placed.add(student_id)
+            enrolled.append(student_id)
+            self._record_seat_change(class_id, -1)
+        return enrolled, rejected
+
+    def _enroll_chunk(self, class_id, members, room_capacity, placed):
+        student_ids = [student_id for student_id, _ in members]
+        try:
+            self.dynamodb_resource.meta.client.transact_write_items(
+                TransactItems=promotion_transact_items(class_id, student_ids, room_capacity))
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            return self._enroll_one_by_one(class_id, members, placed)
+
+        placed.update(student_ids)
+        self._record_seat_change(class_id, -len(student_ids))
+        return student_ids, []
+
     def enroll_students_from_waitlist(self, class_id_list):
+        """
+        Fills the open seats of each class from the head of its waitlist.
+
+        Per class this costs one read of the seat counter, one script call that pops the
+        promoted students and one TransactWriteItems per 49 students. The notifications are
+        written to the outbox in the same transactions and published by the outbox relay,
+        so the broker is never on the request path. Students who no longer fit (seats
+        taken meanwhile) are put back on the waitlist at their original place.
+
+        Returns:
+        - The number of students enrolled from the waitlists.
+        """
         total_enrolled_from_waitlist = 0  # Tracks total enrollments from the waitlist across all classes
+        class_table = self.dynamodb_resource.Table("class_table")
 
         for class_id in class_id_list:
-            # Retrieve class information
-            class_table = self.dynamodb_resource.Table("class_table")
-            class_info = class_table.get_item(Key={"id": class_id}).get("Item", {})
-            room_capacity = int(class_info.get("room_capacity", 0))
+            class_id = str(class_id)
 
-            # Fetch current enrollment count for this class
-            enrollment_table = self.dynamodb_resource.Table("enrollment_table")
-            current_enrollments = enrollment_table.query(
-                KeyConditionExpression=Key('class_id').eq(class_id)
-            )
-            enrollment_count = len(current_enrollments.get('Items', []))
-
-            # Calculate available spots
-            available_spots = room_capacity - enrollment_count
+            # Retrieve the seat counter for this class
+            class_info = class_table.get_item(Key={"id": class_id}, ConsistentRead=True).get("Item", {})
+            room_capacity = int(class_info.get("room_capacity", 0))
+            available_spots = room_capacity - int(class_info.get("enrolled_count", 0))
 
             # Proceed only if there are available spots
-            if available_spots > 0:
-                waitlist_key = f"waitlist_{class_id}"
-                waitlist_members = self.redis_conn.zrange(waitlist_key, 0, available_spots - 1)
-
-                for waitlist_member in waitlist_members:
-                    # Enroll student from waitlist
-                    student_id = waitlist_member
-                    enrollment_table.put_item(
-                        Item={"class_id": class_id, "student_id": student_id, "enrollment_date": datetime.now().isoformat()}
-                    )
-
-                    # Remove student from waitlist
-                    self.redis_conn.zrem(waitlist_key, student_id)
-                    total_enrolled_from_waitlist += 1
-                    email_key = f'notification_{class_id}_{student_id}_email'
-                    student_email = self.redis_conn.get(email_key)
-                    print(f" [x] {student_email}")
-                    redis_conn.set(f"last-modified_{class_id}", datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT"))
-                    if student_email is not None:
-                        print(f" [x] {student_email}")
-                        emit_log(student_email, class_id)
-
+            if available_spots <= 0:
+                continue
 
-        return total_enrolled_from_waitlist
+            popped = self.pop_waitlist(class_id, available_spots)
+            enrolled, rejected = [], []
+            placed = set()  # Students holding a seat, updated as they are enrolled
+            try:
+                for i in range(0, len(popped), PROMOTION_CHUNK_SIZE):
+                    members = popped[i:i + PROMOTION_CHUNK_SIZE]
+                    if rejected:
+                        # The class is full, the rest goes back to the waitlist
+                        rejected.extend(members)
+                        continue
+                    chunk_enrolled, chunk_rejected = self._enroll_chunk(class_id, members, room_capacity, placed)
+                    enrolled.extend(chunk_enrolled)
+                    rejected.extend(chunk_rejected)
+            except Exception:
+                # Don't lose the students that were popped but not enrolled
+                self.restore_waitlist(class_id, [member for member in popped if member[0] not in placed])
+                raise
 
-    '''def check_last_modified(class_id: int, if_modified_since: str = None):
-        """
-    Checks if the content has been modified since the date provided in the If-Modified-Since header.
-    Updates the last modified timestamp in Redis if not present.
+            if rejected:
+                self.restore_waitlist(class_id, rejected)
+            total_enrolled_from_waitlist += len(enrolled)
 
-    Args:
-        class_id (int): The ID of the class.
-        if_modified_since (str): The date string from the If-Modified-Since header.
+        return total_enrolled_from_waitlist
 
-    Returns:
-        Tuple[bool, str]: A tuple containing a boolean indicating whether the content is modified
-                          and the last modified date string.
-    """
-        last_modified_key = f"last-modified_{class_id}"
-        last_modified = redis_conn.get(last_modified_key)
-
-        # If not present in Redis, set to current time
-        if not last_modified:
-            last_modified = datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
-            redis_conn.set(last_modified_key, last_modified)
-
-        # Compare with the If-Modified-Since header
-        if if_modified_since and last_modified <= if_modified_since:
-            # Content not modified
-            return False, last_modified
-
-        # Content modified
-        return True, last_modified'''
-    
-    
     def process_waitlist(self, class_id):
-        class_table = self.dynamodb_resource.Table("class_table")
-        class_info = class_table.get_item(Key={"id": class_id}).get("Item", {})
-        available_spots = class_info.get("room_capacity", 0) - class_info.get("enrollment_count", 0)
-
-        if available_spots > 0:
-            waitlist_key = f"waitlist_{class_id}"
-            waitlist_members = self.redis_conn.zrange(waitlist_key, 0, available_spots - 1)
-
-            for student_id in waitlist_members:
-                # Enroll student
-                enrollment_table = self.dynamodb_resource.Table("enrollment_table")
-                enrollment_table.put_item(
-                    Item={
-                        "class_id": class_id,
-                        "student_id": student_id,
-                        "enrollment_date": datetime.now().isoformat()
-                    }
-                )
-                # Remove from waitlist
-                self.redis_conn.zrem(waitlist_key, student_id)
-
-# Instantiate DynamoDBRedisHelper
-helper = DynamoDBRedisHelper(dynamodb_resource, redis_conn)
+        return self.enroll_students_from_waitlist([class_id])
+
+# Instantiate DynamoDBRedisHelper with the shared clients
+helper = DynamoDBRedisHelper(registry.dynamodb, registry.redis)
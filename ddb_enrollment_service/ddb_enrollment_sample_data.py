@@ -1,5 +1,7 @@
 import boto3
+import redis
 from ddb_enrollment_schema import *
+from availability_index import AvailabilityIndex
 
 
 class_table_instance = create_table_instance(Class, "class_table")
@@ -14,6 +16,7 @@ items_to_insert = [
         "instructor_id": 1,
         "room_num": 101,
         "room_capacity": 30,
+        "enrolled_count": 1,
         "course_start_date": "2023-06-12",
         "enrollment_start": "2023-06-01 09:00:00",
         "enrollment_end": "2023-06-15 17:00:00",
@@ -28,6 +31,7 @@ items_to_insert = [
         "instructor_id": 2,
         "room_num": 201,
         "room_capacity": 30,
+        "enrolled_count": 1,
         "course_start_date": "2023-06-12",
         "enrollment_start": "2023-06-01 09:00:00",
         "enrollment_end": "2023-06-15 17:00:00",
@@ -150,4 +154,13 @@ items_to_insert = [
     },
 ]
 for item in items_to_insert:
-    student_table_instance.put_item(Item=item)                             
\ No newline at end of file
+    student_table_instance.put_item(Item=item)
+
+#####################################################################################################################
+# Build the Redis index of open seats from the classes inserted above
+dynamodb_resource = boto3.resource(
+    'dynamodb',
+    region_name='local',
+    endpoint_url='http://localhost:8000'
+)
+AvailabilityIndex(dynamodb_resource, redis.Redis(decode_responses=True)).rebuild()
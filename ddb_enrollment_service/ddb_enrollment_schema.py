@@ -4,6 +4,25 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Global secondary index of enrollment_table and droplist_table to look up a student's rows
+STUDENT_ID_INDEX = "student_id_index"
+# Global secondary index of class_table to look up an instructor's sections
+INSTRUCTOR_ID_INDEX = "instructor_id_index"
+
+def student_id_index():
+    return {
+        "IndexName": STUDENT_ID_INDEX,
+        "KeySchema": [
+            {"AttributeName": "student_id", "KeyType": "HASH"},
+            {"AttributeName": "class_id", "KeyType": "RANGE"}
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+        "ProvisionedThroughput": {
+            "ReadCapacityUnits": 5,
+            "WriteCapacityUnits": 5,
+        },
+    }
+
 class Class:
     """Encapsulates an Amazon DynamoDB table for configurations."""
 
@@ -38,6 +57,21 @@ class Class:
                 ],
                 AttributeDefinitions=[
                     {"AttributeName": "id", "AttributeType": "S"},
+                    {"AttributeName": "instructor_id", "AttributeType": "N"},
+                ],
+                GlobalSecondaryIndexes=[
+                    {
+                        "IndexName": INSTRUCTOR_ID_INDEX,
+                        "KeySchema": [
+                            {"AttributeName": "instructor_id", "KeyType": "HASH"},
+                            {"AttributeName": "id", "KeyType": "RANGE"}
+                        ],
+                        "Projection": {"ProjectionType": "ALL"},
+                        "ProvisionedThroughput": {
+                            "ReadCapacityUnits": 5,
+                            "WriteCapacityUnits": 5,
+                        },
+                    }
                 ],
                 ProvisionedThroughput={
                     "ReadCapacityUnits": 5,
@@ -225,6 +259,7 @@ class Enrollment:
                     {"AttributeName": "class_id", "AttributeType": "S"},
                     {"AttributeName": "student_id", "AttributeType": "S"}
                 ],
+                GlobalSecondaryIndexes=[student_id_index()],
                 ProvisionedThroughput={
                     "ReadCapacityUnits": 5,
                     "WriteCapacityUnits": 5,
@@ -280,6 +315,7 @@ class Droplist:
                     #{"AttributeName": "drop_date", "AttributeType": "S"},
                     #{"AttributeName": "administrative", "AttributeType": "BOOL"}
                 ],
+                GlobalSecondaryIndexes=[student_id_index()],
                 ProvisionedThroughput={
                     "ReadCapacityUnits": 5,
                     "WriteCapacityUnits": 5,
@@ -389,26 +425,73 @@ class Student:
         else:
             return self.table                
         
-def create_table_instance(class_type, table_name):
-    logging.info(f"Creating table instance for: {table_name}")
-    dynamodb_resource = boto3.resource(
-        'dynamodb',
-        region_name='local',
-        aws_access_key_id='65r0k8',
-        aws_secret_access_key='mgumzh',
-        endpoint_url='http://localhost:8000'
-    )
-    try:
-        table_manager = class_type(dynamodb_resource)
-        table_manager.table = table_manager.dyn_resource.Table(table_name)
+class NotificationOutbox:
+    """Encapsulates an Amazon DynamoDB table for pending notifications (transactional outbox)."""
+
+    def __init__(self, dyn_resource):
+        """
+        :param dyn_resource: A Boto3 DynamoDB resource.
+        """
+        self.dyn_resource = dyn_resource
+        self.table = None
 
-        # Log table status
-        status = table_manager.table.table_status
-        logging.info(f"Table '{table_name}' status: {status}")
+    def create_table(self, table_name):
+        """
+        Creates an Amazon DynamoDB table for pending notifications. Entries are
+        partitioned by `shard` and sorted by `id`, which starts with the creation time.
 
-    except Exception as e:
-        logging.error(f"Error in creating table instance for '{table_name}': {e}")
-        raise
+        :param table_name: The name of the table to create.
+        :return: The newly created table.
+        """
+        try:
+            self.table = self.dyn_resource.create_table(
+                TableName=table_name,
+                KeySchema=[
+                    {"AttributeName": "shard", "KeyType": "HASH"},  # Partition key
+                    {"AttributeName": "id", "KeyType": "RANGE"},  # Sort key
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "shard", "AttributeType": "N"},
+                    {"AttributeName": "id", "AttributeType": "S"},
+                ],
+                ProvisionedThroughput={
+                    "ReadCapacityUnits": 5,
+                    "WriteCapacityUnits": 5,
+                },
+            )
+            self.table.wait_until_exists()
+        except ClientError as err:
+            logger.error(
+                "Couldn't create table %s. Here's why: %s: %s",
+                table_name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            raise
+        else:
+            return self.table
+
+# Shared by every create_table_instance call so scripts reuse one connection pool
+_dynamodb_resource = None
+
+def create_table_instance(class_type, table_name):
+    """
+    Returns a handle for an existing table. No DescribeTable call is made;
+    a missing table surfaces as a ResourceNotFoundException on first use.
+
+    The services use `db_connection.registry.table` instead.
+    """
+    global _dynamodb_resource
+    if _dynamodb_resource is None:
+        _dynamodb_resource = boto3.resource(
+            'dynamodb',
+            region_name='local',
+            aws_access_key_id='65r0k8',
+            aws_secret_access_key='mgumzh',
+            endpoint_url='http://localhost:8000'
+        )
+    table_manager = class_type(_dynamodb_resource)
+    table_manager.table = table_manager.dyn_resource.Table(table_name)
 
     return table_manager.table
     
@@ -437,7 +520,7 @@ if __name__ == "__main__":
     )
 
     # Define a list of table names to delete
-    table_names = ["class_table", "configs_table", "enrollment_table", "course_table", "department_table", "droplist_table", "instructor_table", "student_table"]
+    table_names = ["class_table", "configs_table", "enrollment_table", "course_table", "department_table", "droplist_table", "instructor_table", "student_table", "notification_outbox"]
 
     # Loop through the table names and delete each table
     for table_name in table_names:
@@ -456,4 +539,5 @@ if __name__ == "__main__":
     create_table(Department, "department_table")
     create_table(Droplist, "droplist_table")
     create_table(Instructor, "instructor_table")
-    create_table(Student, "student_table")
\ No newline at end of file
+    create_table(Student, "student_table")
+    create_table(NotificationOutbox, "notification_outbox")
\ No newline at end of file
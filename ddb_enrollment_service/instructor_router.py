@@ -1,88 +1,146 @@
-from typing import Annotated
-import boto3
+from typing import Optional
 from redis import Redis
-from datetime import datetime
-from fastapi import Depends, HTTPException, Header, Body, status, APIRouter
-from .db_connection import get_db, get_redis_db
-from .ddb_enrollment_schema import *
+from fastapi import Depends, HTTPException, Header, Query, status, APIRouter, Request, Response
+from .db_connection import get_redis_db, registry
 from boto3.dynamodb.conditions import Key
+from .ddb_enrollment_helper import DynamoDBRedisHelper
+from .redis_keys import waitlist_key
+from .conditional import read_validators, class_state_keys, request_variant, is_not_modified, not_modified_response
+from .pagination import query_page, waitlist_page_args, waitlist_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 WAITLIST_CAPACITY = 15
 MAX_NUMBER_OF_WAITLISTS_PER_STUDENT = 3
 
+ddb_helper_instance = DynamoDBRedisHelper(registry.dynamodb, registry.redis)
+
 instructor_router = APIRouter()
 
+@instructor_router.get("/instructors/me/classes/")
+def get_my_classes(
+    instructor_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retreive every section taught by the instructor.
+
+    Parameters:
+    - instructor_id (int, In the header): A unique ID for students, instructors, and registrars.
+
+    Returns:
+    - dict: A dictionary containing the instructor's classes, each with its enrolled count,
+      waitlist length and drop count
+    """
+    try:
+        return ddb_helper_instance.get_instructor_classes(instructor_id)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving classes: {str(e)}")
+
 @instructor_router.get("/classes/{class_id}/students")
 def get_current_enrollment(class_id: str,
-              db: boto3.resource = Depends(get_db)):
+              request: Request, response: Response,
+              limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+              cursor: Optional[str] = None):
     """
-    Retreive current enrollment for the classes.
+    Retreive current enrollment for the classes, one page at a time.
 
     Parameters:
     - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of enrollments to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
 
     Returns:
-    - dict: A dictionary containing the details of the classes
+    - dict: A dictionary containing the enrollments and the cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
     """
     try:
+        validators = read_validators(registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
        
-        enrollment_table_instance = create_table_instance(Enrollment, "enrollment_table")
+        enrollment_table_instance = registry.table("enrollment_table")
              
-        response = enrollment_table_instance.query(KeyConditionExpression=Key('class_id').eq(str(class_id)))
-        items = {'Items': response['Items']}
-        #return response['Items']
-        if items:
-            return items
-        else:
-            return "none"
-        
+        items, next_cursor = query_page(enrollment_table_instance, limit, cursor,
+                                        KeyConditionExpression=Key('class_id').eq(str(class_id)))
+        return {'Items': items, 'next_cursor': next_cursor}
+
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving drop list: {str(e)}")
     
 @instructor_router.get("/classes/{class_id}/waitlist/")
-def get_waitlist(class_id: str, db: Redis = Depends(get_redis_db)):
+def get_waitlist(class_id: str,
+                 request: Request, response: Response,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 cursor: Optional[str] = None,
+                 db: Redis = Depends(get_redis_db)):
     """
-    Retreive current waiting list for the class.
+    Retreive current waiting list for the class, one page at a time.
 
     Parameters:
     - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of students to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
 
     Returns:
-    - dict: A dictionary containing the details of the classes
+    - dict: A dictionary containing the waitlisted students in order and the cursor of the next page
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
     """
     try:
-        return {"waitlist" : db.zrange(class_id,0,-1)}
+        validators = read_validators(registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
+        members = db.zrangebyscore(waitlist_key(class_id), **waitlist_page_args(limit, cursor))
+        waitlist, next_cursor = waitlist_page(members, limit)
+        return {"waitlist" : waitlist, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving waitlist: {str(e)}")
     
 @instructor_router.get("/classes/{class_id}/droplist/")
-def get_droplist(class_id: str, db: boto3.resource = Depends(get_db)):
+def get_droplist(class_id: str,
+                 request: Request, response: Response,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 cursor: Optional[str] = None):
     """
-    Retreive students who have dropped the class.
+    Retreive students who have dropped the class, one page at a time.
 
     Parameters:
     - class_id (int): The ID of the class.
+    - limit (int, optional): The maximum number of drops to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
     - instructor_id (int, In the header): A unique ID for students, instructors, and registrars.
     
     Returns:
-    - dict: A dictionary containing the details of the classes
+    - dict: A dictionary containing the drops and the cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
     """
     try:
+        validators = read_validators(registry.redis, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
+
        
-        droplist_table_instance = create_table_instance(Droplist, "droplist_table")
+        droplist_table_instance = registry.table("droplist_table")
              
-        response = droplist_table_instance.query(KeyConditionExpression=Key('class_id').eq(str(class_id)))
-        items = {'Items': response['Items']}
-        #return response['Items']
-        if items:
-            return items
-        else:
-            return "none"
-        
+        items, next_cursor = query_page(droplist_table_instance, limit, cursor,
+                                        KeyConditionExpression=Key('class_id').eq(str(class_id)))
+        return {'Items': items, 'next_cursor': next_cursor}
+
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving drop list: {str(e)}")
 
 @instructor_router.delete("/enrollment/{class_id}/{student_id}/administratively/", status_code=status.HTTP_200_OK) 
-def drop_class(class_id: str, student_id: str, db: boto3.resource = Depends(get_db)):
+def drop_class(class_id: str, student_id: str):
     """
     Handles a DELETE request to administratively drop a student from a specific class.
 
@@ -95,40 +153,19 @@ def drop_class(class_id: str, student_id: str, db: boto3.resource = Depends(get_
     - dict: A dictionary with the detail message indicating the success of the administrative drop.
 
     Raises:
+    - HTTPException (404): If the student is not enrolled in the class.
     - HTTPException (409): If there is a conflict in the delete operation.
     """
     
-    try:        
-        delete_key = {
-            'class_id': class_id,
-            'student_id':student_id
-        }
-
-        put_item = {
-            'class_id': class_id,
-            'student_id': student_id,
-            'drop_date': "2023-06-01 09:00:00",
-            'administrative': True  
-   
-        }
-        transact_items=[
-                        {
-                            'Delete': {
-                                'TableName': 'enrollment_table',
-                                'Key': delete_key
-                            }
-                        },
-                        {
-                            'Put': {
-                                'TableName': 'droplist_table',
-                                'Item': put_item
-                            }
-                        }
-                    ] 
-              
-        response = db.meta.client.transact_write_items(TransactItems = transact_items)
-        
-        print("TransactWriteItems succeeded:", response)
+    try:
+        # Delete the enrollment record, insert into Droplist and release the seat
+        if not ddb_helper_instance.drop_student(class_id, student_id, administrative=True):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found"
+            )
+
         return {"detail": "Student successfully dropped from class."}
+    except HTTPException:
+        raise
     except Exception as e:  
-        raise HTTPException(status_code=500, detail=f"Error dropping student: {str(e)}")    
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error dropping student: {str(e)}")    
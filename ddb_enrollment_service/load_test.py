@@ -0,0 +1,59 @@
+"""
+Small load generator to compare the sync and async request paths.
+
+Start the enrollment service with ENROLLMENT_SERVICE_MODE=sync (or async), then run e.g.
+
+    python -m ddb_enrollment_service.load_test --url http://localhost:5100/classes/available/ \
+        --concurrency 200 --duration 30
+
+and repeat with the other mode. Requests go straight to one enrollment worker,
+so the x-cwid header the gateway would add is sent explicitly.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def worker(client, url, deadline, latencies, errors, student_id):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, headers={"x-cwid": str(student_id)})
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            worker(client, url, deadline, latencies, errors, student_id)
+            for student_id in range(1, concurrency + 1)
+        ))
+
+    if not latencies:
+        print("No requests completed")
+        return
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f"requests:   {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput: {len(latencies) / duration:.1f} req/s")
+    print(f"latency:    mean {statistics.mean(latencies) * 1000:.1f} ms, "
+          f"p50 {percentile(0.50):.1f} ms, p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5100/classes/available/")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration))
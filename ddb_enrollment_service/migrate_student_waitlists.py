@@ -0,0 +1,63 @@
+"""
+One-shot migration that indexes the waitlists created before the per-student
+index (student_waitlists:{student_id}) existed:
+
+    python -m ddb_enrollment_service.migrate_student_waitlists
+
+Every waitlist_{class_id} sorted set is read and its students get the class added
+to their index, so their waitlists, schedules and waitlist limit include it.
+SADD is idempotent, so the script can be interrupted and run again.
+"""
+import argparse
+
+from .db_connection import registry
+from .redis_keys import WAITLIST_KEY, student_waitlists_key
+
+WAITLIST_KEY_PATTERN = WAITLIST_KEY.format(class_id="*")
+WAITLIST_KEY_PREFIX = WAITLIST_KEY.format(class_id="")
+BATCH_SIZE = 500
+
+
+def migrate_batch(redis_conn, keys):
+    """Returns the number of waitlist entries indexed."""
+    pipe = redis_conn.pipeline(transaction=False)
+    for key in keys:
+        pipe.zrange(key, 0, -1)
+    members = pipe.execute()
+
+    pipe = redis_conn.pipeline(transaction=False)
+    indexed = 0
+    for key, student_ids in zip(keys, members):
+        class_id = key[len(WAITLIST_KEY_PREFIX):]
+        for student_id in student_ids:
+            pipe.sadd(student_waitlists_key(student_id), class_id)
+            indexed += 1
+    pipe.execute()
+    return indexed
+
+
+def migrate(redis_conn, batch_size=BATCH_SIZE):
+    indexed = 0
+    batch = []
+    # Only the sorted sets, not e.g. the waitlist_sequence counter
+    for key in redis_conn.scan_iter(match=WAITLIST_KEY_PATTERN, count=batch_size, _type="zset"):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            indexed += migrate_batch(redis_conn, batch)
+            batch = []
+    if batch:
+        indexed += migrate_batch(redis_conn, batch)
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index existing waitlists per student.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    indexed = migrate(registry.redis, args.batch_size)
+    print(f"Indexed {indexed} waitlist entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import time
+import zlib
+
+# Notifications written in the same transaction as the enrollments they announce and
+# drained to RabbitMQ by notification_service/outbox_relay.py
+OUTBOX_TABLE = "notification_outbox"
+
+# Partitions of the outbox; the relay queries each one, oldest entry first
+OUTBOX_SHARDS = 4
+
+
+def outbox_shard(student_id):
+    return zlib.crc32(str(student_id).encode()) % OUTBOX_SHARDS
+
+
+def outbox_entry_id(class_id, student_id):
+    # Sorts by creation time within a shard
+    return f"{time.time_ns():020d}#{class_id}#{student_id}"
+
+
+def outbox_item(class_id, student_id):
+    """The outbox record announcing that a student was enrolled from the waitlist."""
+    return {
+        'shard': outbox_shard(student_id),
+        'id': outbox_entry_id(class_id, student_id),
+        'event': 'enrolled',
+        'class_id': str(class_id),
+        'student_id': str(student_id),
+    }
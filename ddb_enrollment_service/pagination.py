@@ -0,0 +1,118 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+from fastapi import HTTPException, status
+
+# Page size of the list endpoints (`?limit=`)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def _json_default(value):
+    # Numeric key attributes come back from DynamoDB as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+def encode_cursor(position):
+    """
+    Encodes where the next page starts (e.g. DynamoDB's LastEvaluatedKey) as an
+    opaque, URL-safe string. Returns None if there is no next page.
+    """
+    if position is None:
+        return None
+    data = json.dumps(position, separators=(",", ":"), default=_json_default).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by `encode_cursor`. Returns None for a missing cursor.
+
+    Raises:
+    - HTTPException (400): If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return position
+
+def query_kwargs(limit, cursor, **kwargs):
+    """Adds `Limit` and `ExclusiveStartKey` (from the cursor) to the arguments of a DynamoDB query."""
+    kwargs["Limit"] = limit
+    exclusive_start_key = decode_cursor(cursor)
+    if exclusive_start_key is not None:
+        kwargs["ExclusiveStartKey"] = exclusive_start_key
+    return kwargs
+
+def query_page(table, limit, cursor, **kwargs):
+    """
+    Runs one page of a DynamoDB query.
+
+    Returns:
+    - A tuple (items, next_cursor); next_cursor is None on the last page.
+    """
+    response = table.query(**query_kwargs(limit, cursor, **kwargs))
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"))
+
+async def async_query_page(table, limit, cursor, **kwargs):
+    """`query_page` for an aioboto3 table."""
+    response = await table.query(**query_kwargs(limit, cursor, **kwargs))
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"))
+
+def query_all(table, **kwargs):
+    """Runs a DynamoDB query to the end, following LastEvaluatedKey, and returns every item."""
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+async def async_query_all(table, **kwargs):
+    """`query_all` for an aioboto3 table."""
+    items = []
+    while True:
+        response = await table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def page_after(ids, limit, cursor, sort_key):
+    """
+    Pages through an already sorted list of IDs. The cursor stores the last ID
+    returned, so the page boundaries don't shift when IDs are added or removed.
+
+    Returns:
+    - A tuple (page, next_cursor).
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        after = sort_key(str(position.get("id")))
+        ids = [id_ for id_ in ids if sort_key(id_) > after]
+    page = ids[:limit]
+    next_cursor = encode_cursor({"id": page[-1]}) if len(ids) > limit else None
+    return page, next_cursor
+
+def waitlist_page_args(limit, cursor):
+    """
+    Arguments of ZRANGEBYSCORE ... WITHSCORES for one page of a waitlist. Waitlist
+    scores are unique, so the cursor stores the score of the last member returned.
+    """
+    position = decode_cursor(cursor)
+    min_score = f"({position['score']}" if position is not None and "score" in position else "-inf"
+    # One extra member tells whether there is a next page
+    return {"min": min_score, "max": "+inf", "start": 0, "num": limit + 1, "withscores": True}
+
+def waitlist_page(members, limit):
+    """Turns the reply of `waitlist_page_args` into a tuple (student_ids, next_cursor)."""
+    page = members[:limit]
+    next_cursor = encode_cursor({"score": page[-1][1]}) if len(members) > limit else None
+    return [student_id for student_id, _ in page], next_cursor
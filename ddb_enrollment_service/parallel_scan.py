@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of segments (and worker threads) of a parallel scan
+DEFAULT_SCAN_SEGMENTS = 4
+
+
+def _scan_segment(client, table_name, segment, total_segments, scan_kwargs):
+    items = []
+    kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total_segments)
+    while True:
+        response = client.scan(**kwargs)
+        # The client of a resource already converts Items (and takes Python values)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def parallel_scan(table, segments=DEFAULT_SCAN_SEGMENTS, **scan_kwargs):
+    """
+    Reads a whole table with a parallel scan: the table is split into `segments`
+    segments (Segment/TotalSegments) that are paged through concurrently, one thread
+    each, following LastEvaluatedKey until every segment is exhausted.
+
+    Meant for internal full-table jobs (e.g. rebuilding an index), not for requests.
+
+    :param table: A Boto3 DynamoDB `Table`.
+    :param segments: The degree of parallelism.
+    :param scan_kwargs: Extra Scan parameters (e.g. ProjectionExpression), in Python values.
+    :return: A list of all items, as returned by the resource API.
+    """
+    # Resources are not thread-safe, their client is (and converts values like the resource)
+    client = table.meta.client
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = executor.map(
+            lambda segment: _scan_segment(client, table.name, segment, segments, scan_kwargs),
+            range(segments),
+        )
+        return [item for items in results for item in items]
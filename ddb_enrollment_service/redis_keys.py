@@ -0,0 +1,25 @@
+# Redis key templates shared by the enrollment and notification services
+WAITLIST_KEY = "waitlist_{class_id}"                   # Sorted set: student_id -> waitlist score
+STUDENT_WAITLISTS_KEY = "student_waitlists:{student_id}"  # Set of class_ids the student is waitlisted for
+LAST_MODIFIED_KEY = "last-modified_{class_id}"          # HTTP date of the last change to the class
+CLASS_VERSION_KEY = "class_version_{class_id}"          # Counter bumped by every change to the class
+WAITLIST_SEQUENCE_KEY = "waitlist_sequence"             # Counter used as the FIFO score of new waitlist members
+CLASS_CHANGES_CHANNEL = "class_changes"                # Pub/sub channel: class_id of every roster/waitlist change
+SUBSCRIPTIONS_KEY = "subscriptions:{student_id}"       # Hash: "{class_id}:email" / "{class_id}:webhook" -> address
+WEBHOOK_DEAD_LETTERS_KEY = "webhook_dead_letters"      # List of webhook deliveries that exhausted their retries
+
+
+def waitlist_key(class_id):
+    return WAITLIST_KEY.format(class_id=class_id)
+
+def student_waitlists_key(student_id):
+    return STUDENT_WAITLISTS_KEY.format(student_id=student_id)
+
+def last_modified_key(class_id):
+    return LAST_MODIFIED_KEY.format(class_id=class_id)
+
+def class_version_key(class_id):
+    return CLASS_VERSION_KEY.format(class_id=class_id)
+
+def subscriptions_key(student_id):
+    return SUBSCRIPTIONS_KEY.format(student_id=student_id)
@@ -1,17 +1,21 @@
 from typing import Annotated
 import boto3
-from fastapi import Depends, Response, HTTPException, Body, status, APIRouter
-from .db_connection import get_db
-from .ddb_enrollment_schema import *
-from boto3.dynamodb.conditions import Key
+import botocore
+from fastapi import Depends, HTTPException, Body, status, APIRouter
+from .db_connection import get_db, registry
 from .models import Course, ClassCreate, ClassPatch
+from .availability_index import AvailabilityIndex
+from .class_cache import publish_class_invalidation
+from .conditional import queue_touch_class
 WAITLIST_CAPACITY = 15
 MAX_NUMBER_OF_WAITLISTS_PER_STUDENT = 3
 
+redis_conn = registry.redis
+
 registrar_router = APIRouter()
 
 @registrar_router.put("/auto-enrollment/")
-def set_auto_enrollment(enabled: Annotated[bool, Body(embed=True)], db: boto3.resource = Depends(get_db)):
+def set_auto_enrollment(enabled: Annotated[bool, Body(embed=True)]):
     """
     Endpoint for enabling/disabling automatic enrollment.
 
@@ -25,7 +29,7 @@ def set_auto_enrollment(enabled: Annotated[bool, Body(embed=True)], db: boto3.re
         dict: A dictionary containing a detail message confirming the status of auto enrollment.
     """
     try:
-        table = db.Table('configs_table')
+        table = registry.table('configs_table')
         table.put_item(
             Item={
                 'variable_name': 'automatic_enrollment',
@@ -63,7 +67,7 @@ def create_class(body_data: ClassCreate, db: boto3.resource = Depends(get_db)):
     - HTTPException (409): If a conflict occurs (e.g., duplicate course).
     """
     try:
-        class_table_instance = create_table_instance(Class, "class_table")
+        class_table_instance = registry.table("class_table")
 
         item_to_add = {
             "id": body_data.id,
@@ -78,9 +82,12 @@ def create_class(body_data: ClassCreate, db: boto3.resource = Depends(get_db)):
             "course_start_date": body_data.course_start_date,
             "enrollment_start": body_data.enrollment_start,
             "enrollment_end": body_data.enrollment_end,
+            "enrolled_count": 0,
         }
 
         class_table_instance.put_item(Item=item_to_add)
+        AvailabilityIndex(db, redis_conn).add_class(item_to_add)
+        publish_class_invalidation(redis_conn, item_to_add["id"])
 
         return {"added to class table": item_to_add}
 
@@ -89,8 +96,7 @@ def create_class(body_data: ClassCreate, db: boto3.resource = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error creating class: {str(e)}")
     
 @registrar_router.post("/courses/", status_code=status.HTTP_201_CREATED)
-def create_course(course: Course, db: boto3.resource = Depends(get_db)
-):
+def create_course(course: Course):
     """
     Creates a new course with the provided details.
 
@@ -107,7 +113,7 @@ def create_course(course: Course, db: boto3.resource = Depends(get_db)
     - HTTPException (409): If a conflict occurs (e.g., duplicate course).
     """
     try:
-        table = db.Table('course_table')
+        table = registry.table('course_table')
         table.put_item(
             Item={
                 'department_code': course.department_code,
@@ -140,15 +146,27 @@ def delete_class(id: int, db: boto3.resource = Depends(get_db)):
     # TO DO create a variable name is_deleted, set it to true when calling this api instead of actually deleting the record
     
     try:
-        table = db.Table('class_table')
-        table.delete_item(
+        table = registry.table('class_table')
+        response = table.delete_item(
             Key={
                 'id': str(id)
-            }
+            },
+            ReturnValues='ALL_OLD'
         )  
 
+        if 'Attributes' not in response:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Class not found")
+
+        AvailabilityIndex(db, redis_conn).remove_class(response['Attributes'])
+        pipe = redis_conn.pipeline()
+        queue_touch_class(pipe, id)
+        publish_class_invalidation(pipe, id)
+        pipe.execute()
+
         return {"message": "Item deleted successfully"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating course: {str(e)}")
 
@@ -175,19 +193,36 @@ def update_class(id: int, body_data: ClassPatch, db: boto3.resource = Depends(ge
     - HTTPException (404): If the class with the specified ID is not found.
     - HTTPException (409): If there is a conflict in the update operation (e.g., duplicate class details).
     """
+    updates = body_data.model_dump(exclude_none=True)
+    if not updates:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+
     try:
-        table = db.Table('class_table')
-        table.update_item(
+        table = registry.table('class_table')
+        response = table.update_item(
             Key={
                 'id': str(id),
             },
-            UpdateExpression='SET instuctor_id = :val1',
-            ExpressionAttributeValues={
-                ':val1': body_data.instructor_id
-            }
+            UpdateExpression='SET ' + ', '.join(f'#{field} = :{field}' for field in updates),
+            ConditionExpression='attribute_exists(id)',
+            ExpressionAttributeNames={f'#{field}': field for field in updates},
+            ExpressionAttributeValues={f':{field}': value for field, value in updates.items()},
+            ReturnValues='ALL_NEW'
         )       
 
+        # Capacity changes open or close seats
+        AvailabilityIndex(db, redis_conn).add_class(response['Attributes'])
+        # Bump the class' version and evict it from every worker's class cache
+        pipe = redis_conn.pipeline()
+        queue_touch_class(pipe, id)
+        publish_class_invalidation(pipe, id)
+        pipe.execute()
+
         return {"message": "Item updated successfully"}
     
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Class not found")
+        raise HTTPException(status_code=500, detail=f"Error updating item: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating item: {str(e)}")
\ No newline at end of file
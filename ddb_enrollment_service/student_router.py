@@ -1,21 +1,22 @@
-from typing import Annotated
-import boto3
+from typing import Annotated, Optional
 import botocore
-from fastapi import Depends, HTTPException, Header, Body, status, APIRouter, Response
+from fastapi import HTTPException, Header, Body, Query, status, APIRouter, Request, Response
 
 from fastapi.responses import JSONResponse
 
-import hashlib
-from notification_service.email_notification import emit_log
-from .db_connection import get_db
-from .ddb_enrollment_schema import *
-from boto3.dynamodb.conditions import Key
-from datetime import datetime
+from .db_connection import registry
+from .ddb_enrollment_schema import Class
 import redis
 from .ddb_enrollment_helper import DynamoDBRedisHelper
-
-dynamodb_resource = boto3.resource('dynamodb', region_name='local')
-redis_conn = redis.Redis(decode_responses=True)
+from .availability_index import class_id_sort_key
+from .pagination import page_after, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .conditional import (read_validators, class_state_keys, availability_state_keys, request_variant,
+                          is_not_modified, not_modified_response)
+from .redis_keys import waitlist_key
+from .waitlist_scripts import WAITLIST_FULL, WAITLIST_LIMIT_REACHED
+
+dynamodb_resource = registry.dynamodb
+redis_conn = registry.redis
 ddb_helper_instance = DynamoDBRedisHelper(dynamodb_resource, redis_conn)
 
 class_table_manager = Class(dynamodb_resource)
@@ -26,30 +27,40 @@ MAX_NUMBER_OF_WAITLISTS_PER_STUDENT = 3
 student_router = APIRouter()
 
 @student_router.get("/classes/available/")
-def get_available_classes(db: boto3.resource = Depends(get_db)):
-    try: 
-        available_classes = []
+def get_available_classes(request: Request, response: Response,
+                          semester: Optional[str] = None, dept_code: Optional[str] = None,
+                          limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                          cursor: Optional[str] = None):
+    """
+    Retreive classes with open seats, one page at a time.
 
-        class_table_instance = create_table_instance(Class, "class_table")
-        enrollment_table_instance = create_table_instance(Enrollment, "enrollment_table")
+    Parameters:
+    - semester (str, optional): Only return classes offered in this semester (SP, SU, FA, WI).
+    - dept_code (str, optional): Only return classes offered by this department.
+    - limit (int, optional): The maximum number of classes to return.
+    - cursor (str, optional): The `next_cursor` of the previous page.
 
-        response = class_table_instance.scan()
+    Returns:
+    - dict: A dictionary containing the details of the available classes and the
+      cursor of the next page (None on the last page)
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
+    """
+    try: 
+        validators = read_validators(redis_conn, availability_state_keys(), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        response.headers.update(validators)
 
-        items = response.get('Items', [])
+        # One Redis round trip for the IDs, one BatchGetItem for the details of the page
+        class_ids = ddb_helper_instance.availability_index.get_available_class_ids(semester, dept_code)
+        class_ids, next_cursor = page_after(class_ids, limit, cursor, class_id_sort_key)
+        available_classes = ddb_helper_instance.availability_index.batch_get_classes(class_ids)
 
-        for item in items:
-            class_id = item['id']
-            room_capacity = item['room_capacity']
-            enrollments = enrollment_table_instance.query(KeyConditionExpression=Key('class_id').eq(class_id))
-            num_of_enrollments = len(enrollments.get('Items', []))
-            if num_of_enrollments < room_capacity:
-                available_classes.append(item)
+        return {"available_classes" : available_classes, "next_cursor": next_cursor}
 
-        for item in available_classes:
-            print(item)
+    except HTTPException:
+        raise
 
-        return {"available_classes" : available_classes}
-    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving classes: {str(e)}")
     
@@ -78,79 +89,38 @@ def enroll(class_id: Annotated[int, Body(embed=True)],
 
     try:
         print(f"Enrolling student {student_id} in class {class_id}")
-        class_table_instance = create_table_instance(Class, "class_table")
-        print("Class table instance created")
-        
-        enrollment_table_instance = create_table_instance(Enrollment, "enrollment_table")
-        print("Enrollment table instance created")
 
         class_id = str(class_id)
-        #class_id = int(class_id)
-        
         student_id = str(student_id)
-        print(f"Querying class table for class_id: {class_id}")
-        
-        response = class_table_instance.query(KeyConditionExpression=Key('id').eq(class_id))
-        if not response.get('Items'):
-            raise HTTPException(status_code=404, detail="Class not found")
-        
-        class_item = response.get('Items', [])[0]
-        
-        room_capacity = class_item['room_capacity']
-        print(f"Room capacity for class {class_id}: {room_capacity}")
-        
-        print(f"Querying enrollment table for class_id: {class_id}")
-        enrollments = enrollment_table_instance.query(KeyConditionExpression=Key('class_id').eq(class_id))
-        
-        num_of_enrollments = len(enrollments.get('Items', []))
-        print(f"Number of enrollments in class {class_id}: {num_of_enrollments}")
-        
-        if num_of_enrollments < room_capacity:
-            enrollment_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            item_to_add = {
-                "class_id": class_id,
-                "enrollment_date": enrollment_date,
-                "student_id" : student_id
-            }
-
-            # Debugging statements
-            print(f"Class ID: {class_id}, Type: {type(class_id)}")
-            print(f"Enrollment Date: {enrollment_date}, Type: {type(enrollment_date)}")
-            print(f"Student ID: {student_id}, Type: {type(student_id)}")
-            
-            enrollment_table_instance.put_item(Item=item_to_add)
+
+        # Reserve a seat with a conditional update on the class' seat counter
+        if ddb_helper_instance.enroll_student(class_id, student_id):
             return {"message": "Enrollment successful"}
 
         else:
             print(f"Class {class_id} is full. Checking waitlist for student {student_id}")
             
-            # Check the number of waitlists the student is already on
-            waitlist_pattern = f"waitlist_*_{student_id}"
-            waitlists = redis_conn.keys(waitlist_pattern)
-            print(f"Student {student_id} is currently on {len(waitlists)} waitlists")
+            # Check the waitlist capacity and the student's waitlist limit, then add to the
+            # waitlist and the student's waitlist index, all in one server-side script
+            waitlist_position = ddb_helper_instance.add_to_waitlist(
+                class_id, student_id, WAITLIST_CAPACITY, MAX_NUMBER_OF_WAITLISTS_PER_STUDENT)
+
+            if waitlist_position == WAITLIST_FULL:
+                raise HTTPException(status_code=400, detail="Class and waitlist are full.")
 
-            if len(waitlists) >= MAX_NUMBER_OF_WAITLISTS_PER_STUDENT:
+            if waitlist_position == WAITLIST_LIMIT_REACHED:
                 print(f"Student {student_id} has reached the maximum waitlist limit")
 
                 raise HTTPException(status_code=400, detail="Maximum waitlist limit reached.")
             
-            
-            # Add to waitlist
-            #waitlist_key = f"waitlist_{class_id}_{student_id}"
-            waitlist_key = f"waitlist_{class_id}"
-            #waitlist_score = datetime.now().timestamp()  # Using current timestamp as score for FIFO
-            waitlist_score = datetime.now().timestamp()
-            #redis_conn.zadd(waitlist_key, {student_id: waitlist_score})
-            redis_conn.zadd(waitlist_key, {student_id: waitlist_score})
-            
-            # Update TimeStamp for caching
-            redis_conn.set(f"last-modified_{class_id}", datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT"))
-            
             print(f"Added student {student_id} to waitlist for class {class_id}")
-            return {"message": "Added to waitlist"}
+            return {"message": "Added to waitlist", "waitlist_position": waitlist_position}
             #raise HTTPException(status_code=200, detail="Added to waitlist")
             
            
+    except HTTPException:
+        raise
+
     except botocore.exceptions.ClientError as e:
         print(f"Botocore Client Error: {e}")
         raise HTTPException(status_code=500, detail=f"Botocore Client Error: {e}")
@@ -166,7 +136,6 @@ def drop_class(
     class_id: int,
     student_id: int = Header(
         alias="x-cwid", description="A unique ID for students, instructors, and registrars"),
-    db: boto3.resource = Depends(get_db)
 ):
     """
     Handles a DELETE request to drop a student (himself/herself) from a specific class.
@@ -183,57 +152,18 @@ def drop_class(
     - HTTPException (409): If a conflict occurs.
     """
     try:
-
-        enrollment_table_instance = create_table_instance(Enrollment, "enrollment_table")
         class_id = str(class_id)
         student_id = str(student_id)
 
-
-        print("Iam here 1")
-
-        # New code to check if table exists
-        #existing_tables = [table.name for table in dynamodb_resource.tables.all()]
-        #if "enrollment_table" not in existing_tables:
-        #    print("Error: 'enrollment_table' does not exist.")
-
-        #else:
-            # Check if the enrollment record exists
-        enrollment_response = enrollment_table_instance.query(
-            KeyConditionExpression=Key('class_id').eq(class_id) & Key('student_id').eq(str(student_id))
-        )
-        enrollment_items = enrollment_response.get('Items', [])
-
-        #print("Iam here 2")
-
-        if not enrollment_items:
+        # Delete the enrollment record, insert into Droplist and release the seat
+        if not ddb_helper_instance.drop_student(class_id, student_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found"
             )
 
-        # Delete the enrollment record
-        enrollment_table_instance.delete_item(
-            Key={
-                'class_id': class_id,
-                'student_id': str(student_id)
-            }
-        )
-
-        # Insert into Droplist
-        droplist_table_instance = create_table_instance(Droplist, "droplist_table")
-        droplist_table_instance.put_item(
-            Item={
-                "class_id": class_id,
-                "student_id": str(student_id),
-                "drop_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "administrative": False
-            }
-        )
-
         # Trigger auto enrollment using the instance
         if ddb_helper_instance.is_auto_enroll_enabled():        
             ddb_helper_instance.enroll_students_from_waitlist([class_id])
-            # Update TimeStamp for caching
-            redis_conn.set(f"last-modified_{class_id}", datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT"))
 
     except botocore.exceptions.ClientError as e:
         raise HTTPException(
@@ -246,42 +176,76 @@ def drop_class(
 
 
 
+@student_router.get("/waitlist/")
+def get_my_waitlists(
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retrieve every waitlist the student is on with the current position in each
+
+    Returns:
+    - dict: A dictionary containing the student's waitlists and positions
+
+    Raises:
+    - HTTPException: If error occurs in retrieving positions
+    """
+    try:
+        return {"waitlists": ddb_helper_instance.get_student_waitlists(student_id)}
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving waitlists: {str(e)}")
+
+
+@student_router.get("/students/me/schedule/")
+def get_my_schedule(
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Retrieve the student's schedule: enrollments, waitlists with the current position
+    in each, and drops, each with the details of the class
+
+    Returns:
+    - dict: A dictionary containing the student's enrollments, waitlists and drops
+    """
+    try:
+        return ddb_helper_instance.get_student_schedule(student_id)
+
+    except botocore.exceptions.ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Botocore Client Error: {e}")
+
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving schedule: {str(e)}")
+
 @student_router.get("/waitlist/{class_id}/position/")
 def get_current_waitlist_position(
     class_id: int,
+    request: Request,
     student_id: int = Header(
-        alias="x-cwid", description="A unique ID for students, instructors, and registrars"),
-    if_modified_since: str = Header(None)):
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
     """
     Retrieve waitlist position
 
     Returns:
     - dict: A dictionary containing the user's waitlist position info
+    - HTTP_304_NOT_MODIFIED if the If-None-Match / If-Modified-Since validators still match
 
     Raises:
     - HTTPException: If error occurs in retrieving position
     """
     try:
-        redis_conn = redis.Redis(decode_responses=True)
-        last_modified = redis_conn.get(f"last-modified_{class_id}")
-        # Use the last-modified value directly since it's a string
-        last_modified = last_modified if last_modified else datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
-        # Compare with If-Modified-Since header
-        print(last_modified, "First Time")
-        if last_modified <= if_modified_since:
-            return Response(status_code=status.HTTP_304_NOT_MODIFIED)
-
+        validators = read_validators(redis_conn, class_state_keys(class_id), request_variant(request))
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
 
-        waitlist_key = f"waitlist_{class_id}"
-        waitlist_position = redis_conn.zrank(waitlist_key, student_id)
+        waitlist_position = redis_conn.zrank(waitlist_key(class_id), str(student_id))
 
         if waitlist_position is not None:
             waitlist_position += 1  # Adjust for zero-based index
-            return JSONResponse(content={"class_id": class_id, "waitlist_position": waitlist_position}, headers={"Last-Modified": last_modified})
+            return JSONResponse(content={"class_id": class_id, "waitlist_position": waitlist_position}, headers=validators)
 
         else:
             message = f"You are not in the waitlist for class {class_id}"
-            return JSONResponse(content={"class_id": class_id, "message": message})
+            return JSONResponse(content={"class_id": class_id, "message": message}, headers=validators)
 
     except redis.exceptions.RedisError as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving waitlist position: {str(e)}")
@@ -303,17 +267,11 @@ def remove_from_waitlist(
     - HTTPException: If student is not found on the waitlist
     """
     try:
-        redis_conn = redis.Redis(decode_responses=True)
-        waitlist_key = f"waitlist_{class_id}"
-
-        if not redis_conn.zrem(waitlist_key, student_id):
+        if not ddb_helper_instance.remove_from_waitlist(class_id, student_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Record Not Found in Redis"
             )
 
-        # Update TimeStamp for caching
-        redis_conn.set(f"last-modified_{class_id}", datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT"))
-        
         return {"detail": "Item deleted successfully"}
 
     except redis.exceptions.RedisError as e:
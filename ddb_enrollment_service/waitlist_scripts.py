@@ -0,0 +1,118 @@
+from .conditional import http_date, queue_touch_class
+from .redis_keys import (waitlist_key, student_waitlists_key, last_modified_key, class_version_key,
+                         WAITLIST_SEQUENCE_KEY, CLASS_CHANGES_CHANNEL)
+
+# Return codes of ADMIT_TO_WAITLIST besides the (1-based) waitlist position
+WAITLIST_FULL = -1
+WAITLIST_LIMIT_REACHED = -2
+
+# Admits a student to a class' waitlist in one round trip.
+#
+# KEYS[1] waitlist, KEYS[2] student's waitlist index, KEYS[3] waitlist sequence,
+# KEYS[4] class version, KEYS[5] class last-modified date
+# ARGV[1] student_id, ARGV[2] class_id, ARGV[3] waitlist capacity,
+# ARGV[4] max waitlists per student, ARGV[5] HTTP date of the change, ARGV[6] class changes channel
+#
+# Returns the student's position, WAITLIST_FULL or WAITLIST_LIMIT_REACHED.
+# A student who is already on the waitlist gets the current position back.
+ADMIT_TO_WAITLIST = """
+local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+if rank then
+    return rank + 1
+end
+local size = redis.call('ZCARD', KEYS[1])
+if size >= tonumber(ARGV[3]) then
+    return -1
+end
+if redis.call('SCARD', KEYS[2]) >= tonumber(ARGV[4]) then
+    return -2
+end
+
+-- FIFO score from a server-side sequence; skip past entries scored before the sequence existed
+local score = redis.call('INCR', KEYS[3])
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+if last[2] and tonumber(last[2]) >= score then
+    score = math.floor(tonumber(last[2])) + 1
+    redis.call('SET', KEYS[3], score)
+end
+
+redis.call('ZADD', KEYS[1], score, ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('INCR', KEYS[4])
+redis.call('SET', KEYS[5], ARGV[5])
+redis.call('PUBLISH', ARGV[6], ARGV[2])
+return size + 1
+"""
+
+
+def admit_to_waitlist_params(class_id, student_id, waitlist_capacity, max_waitlists_per_student):
+    """Returns the `keys` and `args` to call the ADMIT_TO_WAITLIST script with."""
+    keys = [
+        waitlist_key(class_id),
+        student_waitlists_key(student_id),
+        WAITLIST_SEQUENCE_KEY,
+        class_version_key(class_id),
+        last_modified_key(class_id),
+    ]
+    args = [
+        str(student_id),
+        str(class_id),
+        waitlist_capacity,
+        max_waitlists_per_student,
+        http_date(),
+        CLASS_CHANGES_CHANNEL,
+    ]
+    return keys, args
+
+
+# Pops the first N members of a class' waitlist in one round trip and removes the
+# class from each popped student's waitlist index.
+#
+# KEYS[1] waitlist, KEYS[2] class version, KEYS[3] class last-modified date
+# ARGV[1] number of members to pop, ARGV[2] key prefix of the student waitlist indexes,
+# ARGV[3] class_id, ARGV[4] HTTP date of the change, ARGV[5] class changes channel
+#
+# Returns a flat list [student_id, score, student_id, score, ...] in waitlist order.
+# The index keys are derived inside the script, so it expects a single Redis node.
+POP_WAITLIST = """
+local popped = redis.call('ZPOPMIN', KEYS[1], ARGV[1])
+if #popped == 0 then
+    return popped
+end
+for i = 1, #popped, 2 do
+    redis.call('SREM', ARGV[2] .. popped[i], ARGV[3])
+end
+redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[3], ARGV[4])
+redis.call('PUBLISH', ARGV[5], ARGV[3])
+return popped
+"""
+
+
+def pop_waitlist_params(class_id, count):
+    """Returns the `keys` and `args` to call the POP_WAITLIST script with."""
+    keys = [waitlist_key(class_id), class_version_key(class_id), last_modified_key(class_id)]
+    args = [
+        count,
+        student_waitlists_key(""),
+        str(class_id),
+        http_date(),
+        CLASS_CHANGES_CHANNEL,
+    ]
+    return keys, args
+
+
+def parse_popped(popped):
+    """Turns the reply of POP_WAITLIST into a list of (student_id, score) tuples."""
+    return [(popped[i], float(popped[i + 1])) for i in range(0, len(popped), 2)]
+
+
+def queue_restore_waitlist(pipe, class_id, members):
+    """
+    Queues the commands that put popped (student_id, score) members back on the
+    waitlist with their original scores, e.g. when the class filled up meanwhile.
+    """
+    pipe.zadd(waitlist_key(class_id), {student_id: score for student_id, score in members})
+    for student_id, _ in members:
+        pipe.sadd(student_waitlists_key(student_id), str(class_id))
+    queue_touch_class(pipe, class_id)
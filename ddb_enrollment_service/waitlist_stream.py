@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+import redis.asyncio
+from fastapi import Header, APIRouter
+from fastapi.responses import StreamingResponse
+
+from .db_connection import settings
+from .redis_keys import waitlist_key, CLASS_CHANGES_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class WaitlistEventHub:
+    """
+    Pushes waitlist positions to the SSE streams of one worker.
+
+    A single pub/sub connection listens on CLASS_CHANGES_CHANNEL, which every roster and
+    waitlist change publishes the class ID on (enroll, drop, waitlist admit/removal,
+    promotion). When a class with open streams changes, the whole waitlist is read with
+    one ZRANGE and every stream's position is computed locally, so the Redis cost per
+    change does not grow with the number of students watching.
+
+    An idle stream is only a coroutine waiting on a one-slot queue, which keeps tens of
+    thousands of them per worker cheap. A slow stream only ever sees the latest position.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._redis = None
+        self._listener = None
+        self._streams = defaultdict(dict)  # class_id -> {queue: student_id}
+        self._pending = set()              # class_ids with a refresh already scheduled
+        self._tasks = set()                # Running refreshes (the loop only keeps weak references)
+
+    async def start(self):
+        self._redis = redis.asyncio.Redis(
+            host=self.settings.REDIS_HOST,
+            port=self.settings.REDIS_PORT,
+            max_connections=self.settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+        )
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._listener = self._redis = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CLASS_CHANGES_CHANNEL)
+                # Changes may have been missed while (re)connecting
+                for class_id in list(self._streams):
+                    self._schedule_refresh(class_id)
+                async for message in pubsub.listen():
+                    if message["type"] == "message" and message["data"] in self._streams:
+                        self._schedule_refresh(message["data"])
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Waitlist event listener disconnected: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def _schedule_refresh(self, class_id):
+        # A burst of changes to one class costs one ZRANGE, not one per change
+        if class_id not in self._pending:
+            self._pending.add(class_id)
+            task = asyncio.create_task(self._refresh(class_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, class_id):
+        self._pending.discard(class_id)
+        try:
+            members = await self._redis.zrange(waitlist_key(class_id), 0, -1)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not refresh waitlist {class_id}: {e}")
+            return
+        positions = {student_id: rank for rank, student_id in enumerate(members, start=1)}
+        for queue, student_id in list(self._streams.get(class_id, {}).items()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(positions.get(student_id))
+
+    async def position(self, class_id, student_id):
+        rank = await self._redis.zrank(waitlist_key(class_id), student_id)
+        return None if rank is None else rank + 1
+
+    def subscribe(self, class_id, student_id):
+        queue = asyncio.Queue(maxsize=1)
+        self._streams[class_id][queue] = student_id
+        return queue
+
+    def unsubscribe(self, class_id, queue):
+        streams = self._streams.get(class_id)
+        if streams is not None:
+            streams.pop(queue, None)
+            if not streams:
+                del self._streams[class_id]
+
+    def stats(self):
+        return {
+            "classes": len(self._streams),
+            "streams": sum(len(streams) for streams in self._streams.values()),
+        }
+
+
+# One hub per worker, started and stopped by the application lifespan
+waitlist_event_hub = WaitlistEventHub(settings)
+
+stream_router = APIRouter()
+
+
+def position_event(class_id, position):
+    if position is None:
+        data = {"class_id": class_id, "message": f"You are not in the waitlist for class {class_id}"}
+    else:
+        data = {"class_id": class_id, "waitlist_position": position}
+    return f"event: position\ndata: {json.dumps(data)}\n\n"
+
+async def position_events(class_id, student_id, hub=waitlist_event_hub):
+    queue = hub.subscribe(class_id, student_id)
+    try:
+        # Subscribe first, then read, so no change between the two is lost
+        position = await hub.position(class_id, student_id)
+        yield position_event(class_id, position)
+
+        while position is not None:
+            try:
+                new_position = await asyncio.wait_for(queue.get(), timeout=settings.WAITLIST_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            if new_position != position:
+                position = new_position
+                yield position_event(class_id, position)
+    finally:
+        hub.unsubscribe(class_id, queue)
+
+@stream_router.get("/waitlist/{class_id}/position/stream/")
+async def stream_waitlist_position(
+    class_id: int,
+    student_id: int = Header(
+        alias="x-cwid", description="A unique ID for students, instructors, and registrars")):
+    """
+    Stream the student's waitlist position as Server-Sent Events
+
+    Sends a `position` event right away and then one whenever the position changes.
+    The stream ends after the student leaves the waitlist (enrolled, dropped or removed).
+
+    Returns:
+    - text/event-stream: `position` events with the user's waitlist position info
+    """
+    return StreamingResponse(
+        position_events(str(class_id), str(student_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from .instructor_router import instructor_router
 from .student_router import student_router
 from .registrar_router import registrar_router
+from .db_connection import db_pool
 
 # Create the main FastAPI application instance
 app = FastAPI()
@@ -9,4 +10,8 @@ app = FastAPI()
 # Attach the routers to the main application
 app.include_router(instructor_router)
 app.include_router(student_router)
-app.include_router(registrar_router)
\ No newline at end of file
+app.include_router(registrar_router)
+
+@app.get("/stats/db/", description="SQLite connection pool metrics")
+def get_db_stats():
+    return db_pool.stats()
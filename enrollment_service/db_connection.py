@@ -1,19 +1,18 @@
-import sqlite3
-import contextlib
 # import logging
 from pydantic_settings import BaseSettings
+from common.sqlite_pool import SQLitePool, POOL_SIZE
 
 class Settings(BaseSettings, env_file=".env", extra="ignore"):
     ENROLLMENT_SERVICE_DB_PATH: str
+    SQLITE_POOL_SIZE: int = POOL_SIZE   # SQLite connections per worker
     #logging_config: str #= "./etc/logging.ini"
 
 # logging.basicConfig(filename=f'{__name__}.log', format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.DEBUG)
 
 settings = Settings()
 
+# Same pool as the user service: WAL, tuned pragmas and cached statements
+db_pool = SQLitePool(settings.ENROLLMENT_SERVICE_DB_PATH, settings.SQLITE_POOL_SIZE)
+
 def get_db():
-    with contextlib.closing(sqlite3.connect(settings.ENROLLMENT_SERVICE_DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        db.execute("PRAGMA foreign_keys=ON")
-        #db.set_trace_callback(logging.debug)
-        yield db
\ No newline at end of file
+    yield from db_pool.get_db()
@@ -1,8 +1,16 @@
 from fastapi import FastAPI
+from .known_ids import subscription_validator
 from .notification_main import notification_router
 
 # Create the main FastAPI application instance
 app = FastAPI()
 
 # Attach the routers to the main application
-app.include_router(notification_router)
\ No newline at end of file
+app.include_router(notification_router)
+
+@app.get("/stats/known-ids/", tags=["Internal"])
+def get_known_ids_stats():
+    """
+    Sizes and hit counters of this worker's class and student ID sets.
+    """
+    return subscription_validator.stats()
@@ -1,22 +1,19 @@
 from email.mime.text import MIMEText
+import argparse
+import functools
+import os
 import pika
-import sys
-import threading
-import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
+from .publisher import declare_topology, RABBITMQ_HOST, EMAIL_QUEUE
+from .smtp_pool import SMTPPool, POOL_SIZE
 
-# Function to emit logs
-def emit_log(student_email: str, class_id: int):
-    connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
-    channel = connection.channel()
-
-    channel.exchange_declare(exchange='logs', exchange_type='fanout')
-
-    message = student_email + ';' + str(class_id)
-    channel.basic_publish(exchange='logs', routing_key='', body=message)
-    print(f" [x] Sent {message}")
+# Shared by the sender workers; main() sizes it to their number
+smtp_pool = SMTPPool()
 
-    connection.close()
+# Body of an email notification on the work queue (published by the outbox relay)
+def email_message(student_email: str, class_id) -> str:
+    return student_email + ';' + str(class_id)
 
 def send_email(student_email: str, message : str):
     # Create the email message
@@ -26,52 +23,84 @@ def send_email(student_email: str, message : str):
     msg['Subject'] = 'Class Enrollment Notification'
     msg.attach(MIMEText(message, 'plain'))
 
-    # Send the email
-    with smtplib.SMTP('localhost', 8025) as server:
-        server.sendmail(msg['From'], msg['To'], msg.as_string())
-    
-
-# Callback function for received logs
-def callback(ch, method, properties, body):
-    student_email, class_id = body.decode('utf-8').split(';')
-    message = f'You are now enrolled in class {class_id}!'
-    send_email(student_email, message)
-    print(f" [x] {body.decode()}")
-
-
-
-# Function to receive logs
-def receive_logs():
-    connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
+    # Send the email on a pooled keep-alive session
+    smtp_pool.send(msg['From'], msg['To'], msg.as_string())
+
+PREFETCH_COUNT = 32   # Unacknowledged messages the broker hands to one consumer at a time
+SENDER_WORKERS = POOL_SIZE  # Concurrent SMTP sends per consumer process
+
+def ack(channel, delivery_tag):
+    if channel.is_open:
+        channel.basic_ack(delivery_tag=delivery_tag)
+
+def reject(channel, delivery_tag, requeue):
+    if channel.is_open:
+        channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+# Sends one notification on a worker thread and acks it (on the connection's thread) once delivered
+def handle_message(connection, channel, method, body):
+    try:
+        student_email, class_id = body.decode('utf-8').split(';')
+        message = f'You are now enrolled in class {class_id}!'
+        send_email(student_email, message)
+    except ValueError:
+        # Malformed, retrying cannot help
+        print(f" [!] Discarding malformed message {body!r}")
+        connection.add_callback_threadsafe(functools.partial(reject, channel, method.delivery_tag, False))
+    except Exception as e:
+        # Requeue once; a message that fails again after redelivery is dropped instead of looping forever
+        print(f" [!] Could not send {body.decode()}: {e}")
+        connection.add_callback_threadsafe(
+            functools.partial(reject, channel, method.delivery_tag, not method.redelivered))
+    else:
+        print(f" [x] {body.decode()}")
+        connection.add_callback_threadsafe(functools.partial(ack, channel, method.delivery_tag))
+
+
+# Consumes the durable email queue. Every consumer process competes for the same queue, so
+# each message is sent once and throughput scales with the number of processes. Messages are
+# acked only after a successful send, so the ones held by a crashed consumer are redelivered.
+def receive_logs(prefetch_count=PREFETCH_COUNT, workers=SENDER_WORKERS):
+    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
     channel = connection.channel()
+    declare_topology(channel)
 
-    channel.exchange_declare(exchange='logs', exchange_type='fanout')
+    # Bounds the messages buffered in this process (and in the worker pool's queue)
+    channel.basic_qos(prefetch_count=prefetch_count)
 
-    result = channel.queue_declare(queue='', exclusive=True)
-    queue_name = result.method.queue
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-sender")
 
-    channel.queue_bind(exchange='logs', queue=queue_name)
+    def on_message(ch, method, properties, body):
+        executor.submit(handle_message, connection, ch, method, body)
 
-    print(' [*] Waiting for logs. To exit press CTRL+C')
+    channel.basic_consume(queue=EMAIL_QUEUE, on_message_callback=on_message, auto_ack=False)
 
-    channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=True)
+    print(f' [*] Waiting for notifications (prefetch {prefetch_count}, {workers} senders). To exit press CTRL+C')
 
-    channel.start_consuming()
+    try:
+        channel.start_consuming()
+    finally:
+        # Unacked messages go back to the queue when the connection closes
+        executor.shutdown(wait=False, cancel_futures=True)
+        if connection.is_open:
+            connection.close()
 
-# Main function to run both publisher and consumer
 def main():
-    # Run the consumer in a separate thread
-    consumer_thread = threading.Thread(target=receive_logs)
-    consumer_thread.start()
-
-    # Wait for a brief moment to ensure the consumer is ready
-    import time
-    time.sleep(1)
-
-    # Run the publisher
-
-    # Wait for the consumer thread to finish
-    consumer_thread.join()
+    parser = argparse.ArgumentParser(description="Send enrollment notification emails from the work queue.")
+    parser.add_argument("--prefetch", type=int, default=int(os.environ.get("NOTIFICATION_PREFETCH", PREFETCH_COUNT)),
+                        help="Unacknowledged messages per consumer (basic_qos prefetch_count)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("NOTIFICATION_WORKERS", SENDER_WORKERS)),
+                        help="Concurrent SMTP senders per consumer")
+    args = parser.parse_args()
+
+    global smtp_pool
+    smtp_pool = SMTPPool(size=args.workers)
+    try:
+        receive_logs(args.prefetch, args.workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        smtp_pool.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,255 @@
+import logging
+import threading
+import time
+import redis
+
+from ddb_enrollment_service.class_cache import CLASS_INVALIDATION_CHANNEL
+from ddb_enrollment_service.db_connection import registry, settings
+from ddb_enrollment_service.parallel_scan import parallel_scan
+
+logger = logging.getLogger(__name__)
+
+BATCH_GET_LIMIT = 100         # Keys per BatchGetItem call
+NEGATIVE_CACHE_MAXSIZE = 10000  # Known-bad IDs remembered per table
+
+
+class KnownIds:
+    """
+    Warm in-memory set of the IDs of one table, plus a negative cache of IDs that
+    were looked up and do not exist.
+
+    The set is loaded with a parallel scan of the `id` attribute and reloaded in a
+    background thread every `refresh_interval` seconds, so a request never waits for
+    a scan. IDs that are in neither (new items, or before the first load) have to be
+    confirmed with BatchGetItem; see `SubscriptionValidator`.
+
+    With an `invalidation_channel` (the registrar endpoints publish every created,
+    updated or deleted class ID on CLASS_INVALIDATION_CHANNEL), a listener thread
+    forgets each published ID, so it is looked up again: a deleted class is rejected
+    right away and a new one accepted. Without one, a deleted item stays known until
+    the next reload. Every forgotten ID bumps a generation, and results read before
+    it (a reload or a lookup in flight) do not bring the ID back.
+    """
+
+    def __init__(self, registry, table_name, refresh_interval, negative_ttl, invalidation_channel=None):
+        self.registry = registry
+        self.table_name = table_name
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+        self.invalidation_channel = invalidation_channel
+        self._ids = set()
+        self._negative = {}  # id -> expires_at, oldest first
+        self._forgotten = set()  # IDs forgotten while a reload is running
+        self._reload_again = False  # Set by forget_all while a reload is running
+        self._generation = 0
+        self._next_refresh = 0
+        self._refreshing = False
+        self._listener = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.lookups = 0
+        self.invalidations = 0
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshing or now < self._next_refresh:
+                return
+            self._refreshing = True
+            self._forgotten = set()
+            self._reload_again = False
+        threading.Thread(target=self._refresh, name=f"known-ids-{self.table_name}", daemon=True).start()
+
+    def _refresh(self):
+        # The next attempt is scheduled whatever happens, so a failing scan is retried
+        # after negative_ttl instead of on every request
+        next_refresh = self.negative_ttl
+        try:
+            items = parallel_scan(self.registry.table(self.table_name), ProjectionExpression="id")
+            ids = {str(item["id"]) for item in items}
+            with self._lock:
+                # IDs forgotten while scanning may have been read before they changed
+                self._ids = ids - self._forgotten
+            next_refresh = self.refresh_interval
+        except Exception as e:
+            logger.warning(f"Could not load the IDs of {self.table_name}: {e}")
+        finally:
+            with self._lock:
+                self._next_refresh = 0 if self._reload_again else time.monotonic() + next_refresh
+                self._refreshing = False
+
+    def _start_listener(self):
+        if self.invalidation_channel is None or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name=f"known-ids-{self.table_name}-invalidation",
+                                                  daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self.registry.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.invalidation_channel)
+                # Changes may have been missed while disconnected
+                self.forget_all()
+                for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    if message["data"] == "*":
+                        self.forget_all()
+                    else:
+                        self.forget(message["data"])
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Known {self.table_name} IDs invalidation listener disconnected: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def forget(self, id):
+        """Drops an ID from both sets, so the next validation looks it up."""
+        id = str(id)
+        with self._lock:
+            self._ids.discard(id)
+            self._negative.pop(id, None)
+            self._generation += 1
+            if self._refreshing:
+                self._forgotten.add(id)
+            self.invalidations += 1
+
+    def forget_all(self):
+        """Drops every ID and reloads the set."""
+        with self._lock:
+            self._ids = set()
+            self._negative.clear()
+            self._generation += 1
+            # A reload in flight may predate the change, so another follows it
+            self._reload_again = self._refreshing
+            self._next_refresh = 0
+            self.invalidations += 1
+        self._maybe_refresh()
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def partition(self, ids):
+        """
+        Splits `ids` without a network call.
+
+        Returns:
+        - (known, known_bad, unknown) sets of string IDs.
+        """
+        self._start_listener()
+        self._maybe_refresh()
+        now = time.monotonic()
+        known, known_bad, unknown = set(), set(), set()
+        with self._lock:
+            for id in map(str, ids):
+                if id in self._ids:
+                    known.add(id)
+                elif self._negative.get(id, 0) > now:
+                    known_bad.add(id)
+                else:
+                    unknown.add(id)
+            self.hits += len(known)
+            self.negative_hits += len(known_bad)
+            self.lookups += len(unknown)
+        return known, known_bad, unknown
+
+    def record(self, found, missing, generation):
+        """
+        Remembers the outcome of a lookup of unknown IDs.
+
+        :param generation: `generation` taken before the lookup; nothing is remembered
+            if an ID was forgotten since, as the lookup may predate the change.
+        """
+        expires_at = time.monotonic() + self.negative_ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._ids |= set(found)
+            for id in missing:
+                self._negative.pop(id, None)
+                self._negative[id] = expires_at
+            while len(self._negative) > NEGATIVE_CACHE_MAXSIZE:
+                del self._negative[next(iter(self._negative))]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ids": len(self._ids),
+                "negative": len(self._negative),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "lookups": self.lookups,
+                "invalidations": self.invalidations,
+            }
+
+
+def batch_get_ids(dynamodb_resource, ids_by_table):
+    """
+    Looks up the IDs of several tables with as few BatchGetItem calls as possible
+    (one for up to 100 IDs in total).
+
+    Returns:
+    - {table_name: set of the IDs that exist}
+    """
+    keys = [(table_name, id) for table_name, ids in ids_by_table.items() for id in sorted(ids)]
+    found = {table_name: set() for table_name in ids_by_table}
+    for i in range(0, len(keys), BATCH_GET_LIMIT):
+        request_items = {}
+        for table_name, id in keys[i:i + BATCH_GET_LIMIT]:
+            request = request_items.setdefault(table_name, {"Keys": [], "ProjectionExpression": "id"})
+            request["Keys"].append({"id": id})
+        while request_items:
+            response = dynamodb_resource.batch_get_item(RequestItems=request_items)
+            for table_name, items in response.get("Responses", {}).items():
+                found[table_name].update(str(item["id"]) for item in items)
+            request_items = response.get("UnprocessedKeys")
+    return found
+
+
+class SubscriptionValidator:
+    """Validates the class and student IDs of subscriptions against the warm ID sets."""
+
+    def __init__(self, registry, settings):
+        self.registry = registry
+        self.classes = KnownIds(registry, "class_table",
+                                settings.KNOWN_IDS_REFRESH_INTERVAL, settings.KNOWN_IDS_NEGATIVE_TTL,
+                                invalidation_channel=CLASS_INVALIDATION_CHANNEL)
+        self.students = KnownIds(registry, "student_table",
+                                 settings.KNOWN_IDS_REFRESH_INTERVAL, settings.KNOWN_IDS_NEGATIVE_TTL)
+
+    def validate(self, class_ids=(), student_ids=()):
+        """
+        Returns:
+        - (valid class IDs, valid student IDs) as sets of strings. Only IDs that are
+          neither known nor known-bad are looked up, all in one BatchGetItem.
+        """
+        known = {}
+        unknown = {}
+        generations = {table: table.generation for table in (self.classes, self.students)}
+        for table, ids in ((self.classes, class_ids), (self.students, student_ids)):
+            known[table], _, unknown[table] = table.partition(ids)
+
+        lookups = {table.table_name: ids for table, ids in unknown.items() if ids}
+        if lookups:
+            found = batch_get_ids(self.registry.dynamodb, lookups)
+            for table, ids in unknown.items():
+                if ids:
+                    table_found = found[table.table_name]
+                    table.record(table_found, ids - table_found, generations[table])
+                    known[table] |= table_found
+
+        return known[self.classes], known[self.students]
+
+    def stats(self):
+        return {"classes": self.classes.stats(), "students": self.students.stats()}
+
+
+# One validator per worker
+subscription_validator = SubscriptionValidator(registry, settings)
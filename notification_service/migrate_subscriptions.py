@@ -0,0 +1,68 @@
+"""
+One-shot migration of the subscription string keys
+(notification_{class_id}_{student_id}_email / _proxy) to the per-student hashes
+of notification_service/subscriptions.py:
+
+    python -m notification_service.migrate_subscriptions
+
+Each batch is copied and its old keys are deleted in one transaction, so the script
+can be interrupted and run again.
+"""
+import argparse
+
+from ddb_enrollment_service.db_connection import registry
+from .subscriptions import queue_subscribe, EMAIL, WEBHOOK
+
+LEGACY_KEY_PATTERN = "notification_*_*_*"
+LEGACY_TYPES = {"email": EMAIL, "proxy": WEBHOOK}
+BATCH_SIZE = 500
+
+
+def parse_legacy_key(key):
+    """Returns (class_id, student_id, subscription type) of a legacy key, None for any other key."""
+    parts = key.split("_")
+    if len(parts) != 4 or parts[0] != "notification" or parts[3] not in LEGACY_TYPES:
+        return None
+    return parts[1], parts[2], LEGACY_TYPES[parts[3]]
+
+
+def migrate_batch(redis_conn, keys):
+    values = redis_conn.mget(keys)
+    pipe = redis_conn.pipeline()
+    for key, value in zip(keys, values):
+        class_id, student_id, subscription_type = parse_legacy_key(key)
+        if value is not None:
+            queue_subscribe(pipe, student_id, class_id, **{
+                "email" if subscription_type == EMAIL else "webhook_url": value})
+        pipe.delete(key)
+    pipe.execute()
+
+
+def migrate(redis_conn, batch_size=BATCH_SIZE):
+    migrated = 0
+    batch = []
+    for key in redis_conn.scan_iter(match=LEGACY_KEY_PATTERN, count=batch_size):
+        if parse_legacy_key(key) is None:
+            continue
+        batch.append(key)
+        if len(batch) >= batch_size:
+            migrate_batch(redis_conn, batch)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        migrate_batch(redis_conn, batch)
+        migrated += len(batch)
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move subscription string keys to per-student hashes.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    migrated = migrate(registry.redis, args.batch_size)
+    print(f"Migrated {migrated} subscription keys")
+
+
+if __name__ == "__main__":
+    main()
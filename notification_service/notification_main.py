@@ -1,23 +1,27 @@
-from typing import Annotated, Optional
-import boto3
+from typing import Annotated, List, Optional
 import redis
 from fastapi import Depends, HTTPException, Header, Body, status, APIRouter
-from ddb_enrollment_service.db_connection import get_db
+from ddb_enrollment_service.db_connection import get_db, registry
 from ddb_enrollment_service.ddb_enrollment_schema import Class
 from ddb_enrollment_service.ddb_enrollment_helper import DynamoDBRedisHelper
+from ddb_enrollment_service.redis_keys import subscriptions_key
 from boto3.dynamodb.conditions import Key
 from datetime import datetime
 import re
 import logging
 from botocore.exceptions import ClientError
+from pydantic import BaseModel, Field
+from .known_ids import subscription_validator
+from .subscriptions import queue_subscribe, queue_unsubscribe, parse_subscriptions
+from .webhook_urls import resolve_webhook_url, UnsafeWebhookURL
 #import validators
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize DynamoDB and Redis clients
-dynamodb_resource = boto3.resource('dynamodb', region_name='local')
-redis_conn = redis.Redis(decode_responses=True)
+dynamodb_resource = registry.dynamodb
+redis_conn = registry.redis
 
 # Create an instance of the helper class
 ddb_helper_instance = DynamoDBRedisHelper(dynamodb_resource, redis_conn)
@@ -37,12 +41,27 @@ def get_redis_client():
     return redis_conn
 
 
+# Upper bound on the classes of one bulk subscribe request
+MAX_BULK_SUBSCRIPTIONS = 100
+
+
+def validate_ids(class_ids, student_ids):
+    """
+    Returns the valid class and student IDs (as strings). Known and known-bad IDs are
+    answered from the worker's warm ID sets, the rest with one BatchGetItem.
+    """
+    try:
+        return subscription_validator.validate(class_ids, student_ids)
+    except ClientError as err:
+        logger.error(f"Error accessing DynamoDB: {err}")
+        return set(), set()
+
+
 def is_valid_class_id(class_id: int) -> bool:
     #dynamodb_resource = boto3.resource('dynamodb', region_name='local', endpoint_url='http://localhost:8000')
     try:
-        class_table = dynamodb_resource.Table("class_table") 
-        response = class_table.get_item(Key={"id": str(class_id)})  # Convert to string
-        return "Item" in response
+        valid_class_ids, _ = subscription_validator.validate(class_ids=[class_id])
+        return str(class_id) in valid_class_ids
     except ClientError as err:
         logger.error(f"Error accessing DynamoDB: {err}")
         return False
@@ -58,17 +77,25 @@ def is_valid_email(email: str) -> bool:
 def is_valid_student_id(student_id: int) -> bool:
     #dynamodb_resource = boto3.resource('dynamodb', region_name='local', endpoint_url='http://localhost:8000')
     try:
-        student_table = dynamodb_resource.Table("student_table")  
-        response = student_table.get_item(Key={"id": str(student_id)})
-        return "Item" in response
+        _, valid_student_ids = subscription_validator.validate(student_ids=[student_id])
+        return str(student_id) in valid_student_ids
     except ClientError as err:
         logger.error(f"Error accessing DynamoDB: {err}")
         return False
 
 
 
-#def is_valid_url(url: str) -> bool:
-#    return validators.url(url)
+def webhook_url_error(url: str) -> Optional[str]:
+    """
+    Returns why a webhook URL cannot be subscribed, or None. Only http(s) URLs whose
+    host resolves to public addresses, on a port none of our services use, are accepted,
+    so notifications cannot be aimed at the internal services.
+    """
+    try:
+        resolve_webhook_url(url)
+    except UnsafeWebhookURL as e:
+        return str(e)
+    return None
 
 
 # Endpoint to subscribe to notifications
@@ -88,58 +115,89 @@ def subscribe_to_notifications(
             detail="At least one of email or webhook URL must be provided"
         )
     
-    # Input Validation
-    if not is_valid_class_id(class_id):
+    # Input Validation (both IDs in one lookup at most)
+    valid_class_ids, valid_student_ids = validate_ids([class_id], [student_id])
+    if str(class_id) not in valid_class_ids:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid class ID")
 
-    if not is_valid_student_id(student_id):
+    if str(student_id) not in valid_student_ids:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid student ID")
 
     if email and not is_valid_email(email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid email format")
 
-    #if webhook_url and not is_valid_url(webhook_url):
-    #    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook URL format")
+    if webhook_url and (detail := webhook_url_error(webhook_url)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+    # One hash per student; existing subscriptions are overwritten
+    pipe = redis_client.pipeline()
+    queue_subscribe(pipe, student_id, class_id, email, webhook_url)
+    pipe.execute()
 
-    # Redis Key Generation
-    email_key = f'notification_{class_id}_{student_id}_email'
-    webhook_key = f'notification_{class_id}_{student_id}_proxy'
+    return {"message": "Subscribed successfully to class notifications"}
 
-    # Handle Duplicate Subscriptions
-    existing_email = redis_client.get(email_key)
-    existing_webhook = redis_client.get(webhook_key)
 
-    if existing_email or existing_webhook:
-        # how to handle duplicates. For now overwrites them.
-        pass
+class ClassSubscription(BaseModel):
+    class_id: int
+    email: Optional[str] = None
+    webhook_url: Optional[str] = None
 
-    # Storing Subscription in Redis
-    if email:
-        redis_client.set(email_key, email)
-    if webhook_url:
-        redis_client.set(webhook_key, webhook_url)
 
-    return {"message": "Subscribed successfully to class notifications"}
+class BulkSubscription(BaseModel):
+    student_id: int
+    subscriptions: List[ClassSubscription] = Field(min_length=1, max_length=MAX_BULK_SUBSCRIPTIONS)
+
+
+# Endpoint to subscribe to the notifications of many classes at once
+@notification_router.post("/students/subscribe/bulk/", status_code=status.HTTP_201_CREATED, tags=["Student"])
+def bulk_subscribe_to_notifications(
+    body: BulkSubscription,
+    redis_client: redis.Redis = Depends(get_redis_client)
+):
+    """
+    Subscribe a student to the notifications of up to 100 classes
+
+    All class IDs and the student ID are validated at once: IDs the worker already
+    knows (or knows to be invalid) cost nothing, the rest one BatchGetItem. The valid
+    subscriptions are stored in one transaction.
+
+    Returns:
+    - dict: The subscribed class IDs and the rejected subscriptions with the reason
+
+    Raises:
+    - HTTPException (400): If the student ID is invalid.
+    """
+    valid_class_ids, valid_student_ids = validate_ids(
+        [subscription.class_id for subscription in body.subscriptions], [body.student_id])
+    if str(body.student_id) not in valid_student_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid student ID")
+
+    subscribed, rejected = [], []
+    pipe = redis_client.pipeline()
+    for subscription in body.subscriptions:
+        if not subscription.email and not subscription.webhook_url:
+            detail = "At least one of email or webhook URL must be provided"
+        elif str(subscription.class_id) not in valid_class_ids:
+            detail = "Invalid class ID"
+        elif subscription.email and not is_valid_email(subscription.email):
+            detail = "Invalid email format"
+        elif subscription.webhook_url and (detail := webhook_url_error(subscription.webhook_url)):
+            pass
+        else:
+            queue_subscribe(pipe, body.student_id, subscription.class_id, subscription.email, subscription.webhook_url)
+            subscribed.append(subscription.class_id)
+            continue
+        rejected.append({"class_id": subscription.class_id, "detail": detail})
+    if subscribed:
+        pipe.execute()
+
+    return {"subscribed": subscribed, "rejected": rejected}
 
 
 @notification_router.get("/students/subscriptions/", status_code=status.HTTP_200_OK, tags=["Student"])
 def list_subscriptions(student_id: int, redis_client: redis.Redis = Depends(get_redis_client)):
-    # Pattern for matching student's subscriptions
-    pattern = f'notification_*_{student_id}_*'
-
-    # Fetch all keys matching the pattern
-    subscription_keys = redis_client.keys(pattern)
-
-    subscriptions = []
-    for key in subscription_keys:
-        # Split the key to extract course_id and subscription type
-        _, course_id, _, subscription_type = key.split('_')
-        subscription_value = redis_client.get(key)
-        subscriptions.append({
-            "course_id": course_id,
-            "type": "email" if subscription_type == "email" else "webhook",
-            "value": subscription_value
-        })
+    # Every subscription of the student is in one hash
+    subscriptions = parse_subscriptions(redis_client.hgetall(subscriptions_key(student_id)))
 
     if not subscriptions:
         return {"message": "No subscriptions found for the student."}
@@ -152,54 +210,16 @@ def list_subscriptions(student_id: int, redis_client: redis.Redis = Depends(get_
 def unsubscribe_from_course(
     student_id: int, course_id: int, redis_client: redis.Redis = Depends(get_redis_client)
 ):
-    # Redis Key Generation
-    email_key = f'notification_{course_id}_{student_id}_email'
-    webhook_key = f'notification_{course_id}_{student_id}_proxy'
-
-    # Check if the subscription exists
-    existing_email = redis_client.get(email_key)
-    existing_webhook = redis_client.get(webhook_key)
+    # Removes the email and the webhook subscription with one HDEL
+    pipe = redis_client.pipeline()
+    queue_unsubscribe(pipe, student_id, course_id)
+    removed, = pipe.execute()
 
-    if not existing_email and not existing_webhook:
+    if not removed:
         # No subscription found for the student in the course
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No subscription found for the specified course and student."
         )
 
-    # Deleting subscriptions from Redis
-    if existing_email:
-        redis_client.delete(email_key)
-    if existing_webhook:
-        redis_client.delete(webhook_key)
-
     return {"message": "Unsubscribed successfully from course"}
-
-
-@notification_router.delete("/students/unsubscribe/", status_code=status.HTTP_200_OK, tags=["Student"])
-def notification(
-    student_id: int, course_id: int, redis_client: redis.Redis = Depends(get_redis_client)
-):
-    # Redis Key Generation
-    email_key = f'notification_{course_id}_{student_id}_email'
-    webhook_key = f'notification_{course_id}_{student_id}_proxy'
-
-    # Check if the subscription exists
-    existing_email = redis_client.get(email_key)
-    existing_webhook = redis_client.get(webhook_key)
-
-    if not existing_email and not existing_webhook:
-        # No subscription found for the student in the course
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No subscription found for the specified course and student."
-        )
-
-    # Deleting subscriptions from Redis
-    if existing_email:
-        redis_client.delete(email_key)
-    if existing_webhook:
-        redis_client.delete(webhook_key)
-
-    return {"message": "Unsubscribed successfully from course"}
-
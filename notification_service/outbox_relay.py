@@ -0,0 +1,124 @@
+import argparse
+import logging
+import pika
+import redis
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from ddb_enrollment_service.db_connection import registry
+from ddb_enrollment_service.outbox import OUTBOX_TABLE, OUTBOX_SHARDS
+from .email_notification import email_message
+from .publisher import (connect_publisher, close_connection, RABBITMQ_HOST, EXCHANGE, EMAIL_ROUTING_KEY,
+                        WEBHOOK_ROUTING_KEY, PERSISTENT)
+from .subscriptions import lookup_subscriptions
+from .webhook_dispatcher import webhook_message
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100     # Outbox entries read, published and deleted at once per shard
+POLL_INTERVAL = 0.2  # Seconds between polls while the outbox is empty
+
+
+class OutboxRelay:
+    """
+    Moves the notifications that waitlist promotions wrote to the outbox table onto RabbitMQ.
+
+    Each shard is read oldest entry first, up to `batch_size` entries at a time. The
+    subscribed emails and webhooks of a batch are looked up with one pipeline, published in
+    one channel transaction, and the entries are deleted only after the broker committed
+    them. A crash in between publishes the batch again, so delivery is at-least-once.
+    """
+
+    def __init__(self, registry, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        self.registry = registry
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.relayed = 0
+        self.published = 0
+
+    def _pending(self, table, shard):
+        response = table.query(KeyConditionExpression=Key("shard").eq(shard), Limit=self.batch_size,
+                               ConsistentRead=True)
+        return response.get("Items", [])
+
+    def _messages(self, entries):
+        """Returns the (routing_key, body) messages of the entries' subscriptions."""
+        subscriptions = lookup_subscriptions(
+            self.registry.redis, [(entry["class_id"], entry["student_id"]) for entry in entries])
+
+        messages = []
+        for entry, (email, webhook_url) in zip(entries, subscriptions):
+            if email is not None:
+                messages.append((EMAIL_ROUTING_KEY, email_message(email, entry["class_id"])))
+            if webhook_url is not None:
+                messages.append((WEBHOOK_ROUTING_KEY,
+                                 webhook_message(webhook_url, entry["class_id"], entry["student_id"])))
+        return messages
+
+    def relay_once(self, channel):
+        """
+        Relays one batch of every shard.
+
+        Returns:
+        - The number of outbox entries relayed.
+        """
+        table = self.registry.table(OUTBOX_TABLE)
+        relayed = 0
+        for shard in range(OUTBOX_SHARDS):
+            entries = self._pending(table, shard)
+            if not entries:
+                continue
+
+            messages = self._messages(entries)
+            for routing_key, body in messages:
+                channel.basic_publish(exchange=EXCHANGE, routing_key=routing_key, body=body, properties=PERSISTENT)
+            channel.tx_commit()
+
+            with table.batch_writer() as batch:
+                for entry in entries:
+                    batch.delete_item(Key={"shard": entry["shard"], "id": entry["id"]})
+
+            relayed += len(entries)
+            self.published += len(messages)
+        self.relayed += relayed
+        return relayed
+
+    def run(self):
+        while True:
+            connection, channel = connect_publisher(RABBITMQ_HOST)
+            try:
+                while True:
+                    try:
+                        relayed = self.relay_once(channel)
+                    except (ClientError, redis.exceptions.RedisError) as e:
+                        # Nothing was deleted, the batch is relayed again on the next poll
+                        logger.warning(f"Outbox relay failed, retrying: {e}")
+                        channel.tx_rollback()
+                        relayed = 0
+                    if relayed:
+                        print(f" [x] Relayed {relayed} notifications ({self.relayed} total)")
+                    else:
+                        # Keeps the heartbeats going while the outbox is empty
+                        connection.process_data_events(time_limit=self.poll_interval)
+            except pika.exceptions.AMQPError as e:
+                logger.warning(f"RabbitMQ connection lost, reconnecting: {e}")
+            finally:
+                close_connection(connection)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Publish the notifications of the outbox table to RabbitMQ.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    print(' [*] Relaying the notification outbox. To exit press CTRL+C')
+    try:
+        OutboxRelay(registry, args.batch_size, args.poll_interval).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import logging
+import time
+import pika
+
+logger = logging.getLogger(__name__)
+
+RABBITMQ_HOST = 'localhost'
+
+# Work-queue topology: every email notification is routed to one durable queue
+# that any number of consumer processes compete on
+EXCHANGE = 'notifications'
+EMAIL_QUEUE = 'email_notifications'
+EMAIL_ROUTING_KEY = 'email'
+WEBHOOK_QUEUE = 'webhook_notifications'
+WEBHOOK_ROUTING_KEY = 'webhook'
+
+RECONNECT_DELAY = 1     # Seconds between reconnection attempts (doubles up to MAX_RECONNECT_DELAY)
+MAX_RECONNECT_DELAY = 30
+
+PERSISTENT = pika.BasicProperties(delivery_mode=pika.DeliveryMode.Persistent)
+
+
+def declare_topology(channel):
+    """Declares the durable exchange and queues (idempotent; used by publishers and consumers)."""
+    channel.exchange_declare(exchange=EXCHANGE, exchange_type='direct', durable=True)
+    # Separate queues, so slow webhook destinations never hold up the emails
+    for queue_name, routing_key in ((EMAIL_QUEUE, EMAIL_ROUTING_KEY), (WEBHOOK_QUEUE, WEBHOOK_ROUTING_KEY)):
+        channel.queue_declare(queue=queue_name, durable=True)
+        channel.queue_bind(exchange=EXCHANGE, queue=queue_name, routing_key=routing_key)
+
+
+def connect_publisher(host=RABBITMQ_HOST):
+    """
+    Opens a connection for publishing, retrying with exponential backoff until the
+    broker is reachable. The channel is in transaction mode: messages published on it
+    are only delivered (and persisted) once `channel.tx_commit()` returns.
+
+    Returns:
+    - (connection, channel)
+    """
+    delay = RECONNECT_DELAY
+    while True:
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host))
+            channel = connection.channel()
+            # Declaring the queues too keeps messages published before any consumer started
+            declare_topology(channel)
+            channel.tx_select()
+            return connection, channel
+        except pika.exceptions.AMQPError as e:
+            logger.warning(f"Could not connect to RabbitMQ, retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+def close_connection(connection):
+    if connection.is_open:
+        try:
+            connection.close()
+        except pika.exceptions.AMQPError:
+            pass
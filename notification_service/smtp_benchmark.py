@@ -0,0 +1,79 @@
+"""
+Measures email throughput against an SMTP server, by default the local aiosmtpd
+server of the Procfile (port 8025):
+
+    python -m notification_service.smtp_benchmark --messages 2000 --concurrency 8
+
+Sends the same messages once with a new session per message (the old send_email)
+and once through SMTPPool, and prints the messages per second of each.
+Use --embedded to start a silent aiosmtpd server in-process instead.
+"""
+import argparse
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+from .smtp_pool import SMTPPool, SMTP_HOST, SMTP_PORT, MAX_MESSAGES_PER_SESSION
+
+FROM_ADDR = "notif@test.com"
+
+
+def build_message(i):
+    msg = MIMEText(f'You are now enrolled in class {i}!', 'plain')
+    msg['From'] = FROM_ADDR
+    msg['To'] = f"student{i}@test.com"
+    msg['Subject'] = 'Class Enrollment Notification'
+    return msg['To'], msg.as_string()
+
+
+def run(send, messages, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        # list() surfaces the first failed send
+        list(executor.map(lambda message: send(*message), messages))
+        return len(messages) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-message vs pooled SMTP sending.")
+    parser.add_argument("--host", default=SMTP_HOST)
+    parser.add_argument("--port", type=int, default=SMTP_PORT)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-messages-per-session", type=int, default=MAX_MESSAGES_PER_SESSION)
+    parser.add_argument("--embedded", action="store_true",
+                        help="Start an aiosmtpd server that discards messages on --port")
+    args = parser.parse_args()
+
+    controller = None
+    if args.embedded:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+        controller = Controller(Sink(), hostname=args.host, port=args.port)
+        controller.start()
+
+    messages = [build_message(i) for i in range(args.messages)]
+
+    def send_unpooled(to_addr, msg):
+        with smtplib.SMTP(args.host, args.port) as server:
+            server.sendmail(FROM_ADDR, to_addr, msg)
+
+    pool = SMTPPool(args.host, args.port, size=args.concurrency, max_messages=args.max_messages_per_session)
+
+    try:
+        unpooled = run(send_unpooled, messages, args.concurrency)
+        pooled = run(lambda to_addr, msg: pool.send(FROM_ADDR, to_addr, msg), messages, args.concurrency)
+    finally:
+        pool.close()
+        if controller is not None:
+            controller.stop()
+
+    print(f"{args.messages} messages, concurrency {args.concurrency}")
+    print(f"  session per message: {unpooled:8.1f} msgs/sec")
+    print(f"  pooled sessions:     {pooled:8.1f} msgs/sec ({pooled / unpooled:.1f}x)")
+    print(f"  pool: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
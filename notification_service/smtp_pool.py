@@ -0,0 +1,109 @@
+import logging
+import queue
+import smtplib
+import threading
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = 'localhost'
+SMTP_PORT = 8025
+POOL_SIZE = 8                 # Concurrent SMTP sessions (and therefore sends) per process
+MAX_MESSAGES_PER_SESSION = 100  # A session is closed and replaced after this many messages
+SMTP_TIMEOUT = 10             # Seconds to wait on the server before giving up on a session
+
+
+class SMTPPool:
+    """
+    Keep-alive SMTP sessions shared by the sender threads of one process.
+
+    A send borrows an idle session (or opens one when none is idle and fewer than
+    `size` exist), so at most `size` messages are in flight at once and consecutive
+    messages skip the TCP handshake and EHLO. A session is recycled after
+    `max_messages` messages, and discarded after any error; a send that failed on a
+    reused session is retried once on a fresh one, since the server may simply have
+    closed it while it was idle.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, size=POOL_SIZE,
+                 max_messages=MAX_MESSAGES_PER_SESSION, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()  # (session, messages sent); most recently used first
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.sent = 0
+        self.errors = 0
+
+    def _open(self):
+        session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        session.ehlo_or_helo_if_needed()
+        with self._lock:
+            self.opened += 1
+        return session
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.quit()
+        except (smtplib.SMTPException, OSError):
+            session.close()
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open(), 0
+
+    def _checkin(self, session, count):
+        if count >= self.max_messages:
+            self._close(session)
+        else:
+            self._idle.put((session, count))
+
+    def send(self, from_addr, to_addrs, msg):
+        """Sends one message, blocking while `size` sends are already in flight."""
+        with self._slots:
+            session, count = self._checkout()
+            try:
+                session.sendmail(from_addr, to_addrs, msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                self._close(session)
+                with self._lock:
+                    self.errors += 1
+                if count == 0:
+                    raise
+                # A reused session may have been dropped by the server while idle
+                logger.info(f"Retrying on a new SMTP session after: {e}")
+                session, count = self._open(), 0
+                try:
+                    session.sendmail(from_addr, to_addrs, msg)
+                except Exception:
+                    self._close(session)
+                    raise
+            except Exception:
+                self._close(session)
+                raise
+            self._checkin(session, count + 1)
+            with self._lock:
+                self.sent += 1
+
+    def close(self):
+        """Closes the idle sessions."""
+        while True:
+            try:
+                session, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(session)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "idle": self._idle.qsize(),
+                "opened": self.opened,
+                "sent": self.sent,
+                "errors": self.errors,
+            }
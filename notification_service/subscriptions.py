@@ -0,0 +1,50 @@
+from ddb_enrollment_service.redis_keys import subscriptions_key
+
+# Subscription types and the field suffix each one is stored under in a student's hash
+EMAIL = "email"
+WEBHOOK = "webhook"
+SUBSCRIPTION_TYPES = (EMAIL, WEBHOOK)
+
+
+def subscription_field(class_id, subscription_type):
+    return f"{class_id}:{subscription_type}"
+
+
+def queue_subscribe(pipe, student_id, class_id, email=None, webhook_url=None):
+    """Queues the commands that store (or overwrite) a student's subscriptions to a class."""
+    mapping = {}
+    if email:
+        mapping[subscription_field(class_id, EMAIL)] = email
+    if webhook_url:
+        mapping[subscription_field(class_id, WEBHOOK)] = webhook_url
+    pipe.hset(subscriptions_key(student_id), mapping=mapping)
+
+
+def queue_unsubscribe(pipe, student_id, class_id):
+    """
+    Queues the command that removes every subscription of a student to a class.
+    Its reply is the number of subscriptions removed.
+    """
+    fields = [subscription_field(class_id, subscription_type) for subscription_type in SUBSCRIPTION_TYPES]
+    pipe.hdel(subscriptions_key(student_id), *fields)
+
+
+def parse_subscriptions(subscriptions):
+    """Turns the HGETALL reply of a student's hash into the list returned by the API."""
+    result = []
+    for field, value in sorted(subscriptions.items()):
+        class_id, _, subscription_type = field.rpartition(":")
+        result.append({"course_id": class_id, "type": subscription_type, "value": value})
+    return result
+
+
+def lookup_subscriptions(redis_conn, class_student_ids):
+    """
+    Returns the (email, webhook_url) subscribed by each (class_id, student_id) pair,
+    None where there is no subscription, with one pipelined round trip.
+    """
+    pipe = redis_conn.pipeline(transaction=False)
+    for class_id, student_id in class_student_ids:
+        pipe.hmget(subscriptions_key(student_id),
+                   [subscription_field(class_id, subscription_type) for subscription_type in SUBSCRIPTION_TYPES])
+    return [tuple(reply) for reply in pipe.execute()]
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import httpx
+import pika
+import redis.asyncio
+
+from ddb_enrollment_service.db_connection import settings
+from ddb_enrollment_service.redis_keys import WEBHOOK_DEAD_LETTERS_KEY
+from .publisher import declare_topology, RABBITMQ_HOST, WEBHOOK_QUEUE
+from .webhook_urls import async_resolve_webhook_url, is_public_address, UnsafeWebhookURL
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 100      # Connections of the HTTP pool shared by every destination
+MAX_PER_HOST = 4           # Concurrent deliveries to one host
+MAX_ATTEMPTS = 5           # Attempts before a delivery is dead-lettered
+BASE_DELAY = 0.5           # Seconds; the backoff cap doubles with every attempt...
+MAX_DELAY = 30             # ...up to this many seconds
+REQUEST_TIMEOUT = 5        # Seconds per attempt
+PREFETCH_COUNT = 200       # Deliveries in flight per dispatcher process
+DEAD_LETTER_LIMIT = 10000  # Entries kept in the dead-letter list
+
+# Failed attempts with these statuses are retried, any other 4xx is final
+RETRYABLE_STATUSES = {408, 425, 429}
+
+
+# Body of a webhook notification on the work queue (published by the outbox relay)
+def webhook_message(url, class_id, student_id):
+    return json.dumps({"url": url, "class_id": str(class_id), "student_id": str(student_id)})
+
+
+def webhook_payload(class_id, student_id):
+    return {
+        "event": "enrolled",
+        "class_id": class_id,
+        "student_id": student_id,
+        "message": f"You are now enrolled in class {class_id}!",
+    }
+
+
+def backoff_delay(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Full jitter: a random delay up to base_delay * 2**attempt, so retries of many deliveries spread out."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class RedisDeadLetters:
+    """Appends failed deliveries to the WEBHOOK_DEAD_LETTERS_KEY list, newest first."""
+
+    def __init__(self, redis_conn, limit=DEAD_LETTER_LIMIT):
+        self.redis_conn = redis_conn
+        self.limit = limit
+
+    async def __call__(self, url, payload, error):
+        entry = json.dumps({"url": url, "payload": payload, "error": error, "failed_at": time.time()})
+        pipe = self.redis_conn.pipeline()
+        pipe.lpush(WEBHOOK_DEAD_LETTERS_KEY, entry)
+        pipe.ltrim(WEBHOOK_DEAD_LETTERS_KEY, 0, self.limit - 1)
+        await pipe.execute()
+
+
+class WebhookDispatcher:
+    """
+    Delivers webhook notifications with one shared HTTP connection pool.
+
+    Each delivery POSTs the JSON payload and is retried with exponential backoff and
+    full jitter on connection errors, 5xx and RETRYABLE_STATUSES, up to `max_attempts`
+    attempts; then it is handed to `dead_letter(url, payload, error)`. A per-host
+    semaphore keeps one slow or failing destination from taking the whole pool, and
+    retries wait outside of it.
+
+    Every attempt resolves the host and is refused unless all its addresses pass
+    `address_filter` (public addresses only by default) and the port is not one of the
+    internal services'. The request then connects to the checked address, so a DNS
+    answer that changes in between cannot redirect it into the network.
+    """
+
+    def __init__(self, dead_letter, client=None, max_per_host=MAX_PER_HOST, max_attempts=MAX_ATTEMPTS,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, address_filter=is_public_address):
+        self.dead_letter = dead_letter
+        self.address_filter = address_filter
+        self.client = client or httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+        self.max_per_host = max_per_host
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._hosts = {}  # netloc -> asyncio.Semaphore
+        self.delivered = 0
+        self.retries = 0
+        self.dead_lettered = 0
+
+    def _host_slots(self, url):
+        netloc = urlsplit(url).netloc
+        slots = self._hosts.get(netloc)
+        if slots is None:
+            slots = self._hosts[netloc] = asyncio.Semaphore(self.max_per_host)
+        return slots
+
+    async def _attempt(self, url, payload):
+        """Returns (delivered, retryable, error) for one POST."""
+        try:
+            address, port = await async_resolve_webhook_url(url, self.address_filter)
+        except UnsafeWebhookURL as e:
+            return False, False, str(e)
+        except OSError as e:
+            return False, True, f"DNS lookup failed: {e}"
+
+        # Connect to the checked address; Host header and TLS (SNI, certificate) use the name
+        parts = urlsplit(url)
+        pinned_url = parts._replace(netloc=f"[{address}]:{port}" if ":" in address else f"{address}:{port}").geturl()
+        extensions = {"sni_hostname": parts.hostname} if parts.scheme == "https" else {}
+        async with self._host_slots(url):
+            try:
+                response = await self.client.post(pinned_url, json=payload, headers={"Host": parts.netloc},
+                                                  extensions=extensions)
+            except httpx.HTTPError as e:
+                return False, True, f"{type(e).__name__}: {e}"
+        if response.is_success:
+            return True, False, None
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+        return False, retryable, f"HTTP {response.status_code}"
+
+    async def deliver(self, url, payload):
+        """
+        Delivers one notification.
+
+        Returns:
+        - True if the destination accepted it, False if it was dead-lettered.
+        """
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt - 1, self.base_delay, self.max_delay))
+            delivered, retryable, error = await self._attempt(url, payload)
+            if delivered:
+                self.delivered += 1
+                return True
+            if not retryable:
+                break
+
+        logger.warning(f"Dead-lettering webhook to {url}: {error}")
+        await self.dead_letter(url, payload, error)
+        self.dead_lettered += 1
+        return False
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self):
+        return {
+            "delivered": self.delivered,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "hosts": len(self._hosts),
+        }
+
+
+def consume(dispatcher, loop, prefetch_count=PREFETCH_COUNT):
+    """
+    Feeds the webhook queue to `dispatcher` running on `loop` (in another thread).
+    A message is acked once it was delivered or dead-lettered, so the ones held by a
+    crashed dispatcher are redelivered.
+    """
+    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+    channel = connection.channel()
+    declare_topology(channel)
+    channel.basic_qos(prefetch_count=prefetch_count)
+
+    def settle(delivery_tag, future):
+        if future.exception() is None:
+            callback = functools.partial(channel.basic_ack, delivery_tag=delivery_tag)
+        else:
+            # Only the dead-letter write can fail here; try again later
+            logger.error(f"Webhook delivery failed: {future.exception()}")
+            callback = functools.partial(channel.basic_nack, delivery_tag=delivery_tag, requeue=True)
+        connection.add_callback_threadsafe(callback)
+
+    def on_message(ch, method, properties, body):
+        try:
+            message = json.loads(body)
+            url, class_id, student_id = message["url"], message["class_id"], message["student_id"]
+        except (ValueError, KeyError):
+            logger.warning(f"Discarding malformed webhook message {body!r}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            dispatcher.deliver(url, webhook_payload(class_id, student_id)), loop)
+        future.add_done_callback(functools.partial(settle, method.delivery_tag))
+
+    channel.basic_consume(queue=WEBHOOK_QUEUE, on_message_callback=on_message, auto_ack=False)
+    print(f' [*] Waiting for webhooks (prefetch {prefetch_count}). To exit press CTRL+C')
+    try:
+        channel.start_consuming()
+    finally:
+        if connection.is_open:
+            connection.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Deliver enrollment notifications to subscribed webhooks.")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_COUNT,
+                        help="Deliveries in flight (basic_qos prefetch_count)")
+    parser.add_argument("--max-per-host", type=int, default=MAX_PER_HOST)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    # The HTTP pool lives on an event loop of its own; the blocking pika consumer feeds it
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="webhook-dispatcher", daemon=True).start()
+
+    redis_conn = redis.asyncio.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+
+    async def create_dispatcher():
+        # httpx and asyncio primitives bind to the loop they are created on
+        return WebhookDispatcher(RedisDeadLetters(redis_conn), max_per_host=args.max_per_host,
+                                 max_attempts=args.max_attempts)
+
+    dispatcher = asyncio.run_coroutine_threadsafe(create_dispatcher(), loop).result()
+    try:
+        consume(dispatcher, loop, args.prefetch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        asyncio.run_coroutine_threadsafe(dispatcher.aclose(), loop).result()
+        print(f" [*] {dispatcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
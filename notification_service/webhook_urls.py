@@ -0,0 +1,101 @@
+import asyncio
+import ipaddress
+import socket
+from urllib.parse import urlsplit
+
+# Ports of this deployment: foreman gives every process type 5000 + 100 * n (gateway,
+# enrollment, user and notification services, RabbitMQ on 5672), plus Redis, DynamoDB
+# Local, the SMTP server, the RabbitMQ console and the LiteFS nodes
+INTERNAL_PORTS = frozenset(range(5000, 6000)) | {6379, 8000, 8025, 15672, 20202, 20203, 20204}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class UnsafeWebhookURL(ValueError):
+    """A webhook URL that is malformed or points inside the network."""
+
+
+def is_public_address(address):
+    """True for a globally routable unicast address (not loopback, private, link-local, ...)."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def parse_webhook_url(url):
+    """
+    Checks the parts of a webhook URL that need no DNS lookup.
+
+    Returns:
+    - (host, port)
+
+    Raises:
+    - UnsafeWebhookURL: If it is not an http(s) URL with a host, or uses an internal port.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except (ValueError, TypeError):
+        raise UnsafeWebhookURL("Invalid webhook URL")
+    if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+        raise UnsafeWebhookURL("Webhook URL must be an http or https URL with a host")
+    if parts.username is not None or parts.password is not None:
+        raise UnsafeWebhookURL("Webhook URL must not contain credentials")
+    port = port or DEFAULT_PORTS[parts.scheme]
+    if port in INTERNAL_PORTS:
+        raise UnsafeWebhookURL(f"Webhook port {port} is not allowed")
+    return parts.hostname, port
+
+
+def check_addresses(addresses, address_filter=is_public_address):
+    """
+    Returns the first address, if every address the host resolved to passes `address_filter`.
+
+    Raises:
+    - UnsafeWebhookURL: Otherwise; one internal address is enough, since any could be used.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        raise UnsafeWebhookURL("Webhook host does not resolve")
+    for address in addresses:
+        if not address_filter(address):
+            raise UnsafeWebhookURL("Webhook host resolves to an internal address")
+    return addresses[0]
+
+
+def _addresses(addrinfo):
+    return [sockaddr[0] for _, _, _, _, sockaddr in addrinfo]
+
+
+def resolve_webhook_url(url, address_filter=is_public_address):
+    """
+    Validates a webhook URL and its DNS records (blocking, for the subscribe endpoints).
+
+    Returns:
+    - (address to connect to, port)
+
+    Raises:
+    - UnsafeWebhookURL: If the URL is invalid, does not resolve or points inside the network.
+    """
+    host, port = parse_webhook_url(url)
+    try:
+        addrinfo = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise UnsafeWebhookURL("Webhook host does not resolve")
+    return check_addresses(_addresses(addrinfo), address_filter), port
+
+
+async def async_resolve_webhook_url(url, address_filter=is_public_address):
+    """
+    `resolve_webhook_url` for the dispatcher.
+
+    Raises:
+    - UnsafeWebhookURL: If the URL is invalid or points inside the network.
+    - OSError: If the lookup failed (worth retrying).
+    """
+    host, port = parse_webhook_url(url)
+    try:
+        addrinfo = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except UnicodeError:
+        raise UnsafeWebhookURL("Invalid webhook host")
+    return check_addresses(_addresses(addrinfo), address_filter), port
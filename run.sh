@@ -8,4 +8,4 @@ sh ./bin/create-dotenv.sh
 sh ./bin/create-user-db.sh
 
 # Start the services
-foreman start -m gateway=1,enrollment_service=3,user_service=1,dynamodb=1,redis=1,notification_service=1,aiosmtpd_server=1,email_notification_service=1
+foreman start -m gateway=1,enrollment_service=3,user_service=1,dynamodb=1,redis=1,notification_service=1,aiosmtpd_server=1,email_notification_service=1,webhook_dispatcher=1,outbox_relay=1
@@ -60,6 +60,32 @@ def user_login(username, password):
     
     return None
 
+def user_login_tokens(username, password):
+    url = f'{BASE_URL}/api/login'
+    myobj = {
+        "username": username,
+        "password": password
+    }
+    response = requests.post(url, json = myobj)
+    if response.status_code == 200:
+        return response.json()
+
+    return None
+
+def refresh_tokens(refresh_token):
+    url = f'{BASE_URL}/api/refresh/'
+    myobj = {
+        "refresh_token": refresh_token
+    }
+    return requests.post(url, json = myobj)
+
+def user_logout(refresh_token):
+    url = f'{BASE_URL}/api/logout/'
+    myobj = {
+        "refresh_token": refresh_token
+    }
+    return requests.post(url, json = myobj)
+
 def create_class(dept_code, course_num, section_no, academic_year, semester,
                 instructor_id, room_capacity, 
                 course_start_date, enrollment_start, enrollment_end, access_token):
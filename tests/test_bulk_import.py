@@ -0,0 +1,140 @@
+import io
+import sqlite3
+import unittest
+
+from user_service.bulk_import import CSV, NDJSON, validate, find_conflicts, import_users
+
+SCHEMA_PATH = "./share/user_schema.sql"
+HASHED_PASSWORD = "pbkdf2_sha256$260000$salt$aGFzaA=="
+
+
+def user_db():
+    db = sqlite3.connect(":memory:")
+    with open(SCHEMA_PATH) as f:
+        db.executescript(f.read())
+    db.execute("INSERT INTO user(id, username, hashed_password, first_name, last_name) VALUES (?, ?, ?, ?, ?)",
+               [1, "existing", HASHED_PASSWORD, "ex", "isting"])
+    db.commit()
+    return db
+
+
+def record(**fields):
+    return {"id": "2", "username": "nathan", "password": "1234", "first_name": "nathan", "last_name": "nguyen",
+            "roles": "Student", **fields}
+
+
+class ValidateTest(unittest.TestCase):
+    def test_valid_rows(self):
+        row, detail = validate(2, record(roles="Student; Instructor;"))
+        self.assertIsNone(detail)
+        self.assertEqual(row["id"], 2)
+        self.assertEqual(row["roles"], ["Instructor", "Student"])
+
+        row, detail = validate(3, record(id=3, password=None, hashed_password=HASHED_PASSWORD, roles=["Student"]))
+        self.assertIsNone(detail)
+        self.assertEqual((row["password"], row["hashed_password"]), (None, HASHED_PASSWORD))
+
+    def test_missing_fields(self):
+        self.assertEqual(validate(1, None), (None, "Not a JSON object"))
+        self.assertEqual(validate(1, record(username="", password=None)),
+                         (None, "Missing field(s): username, password"))
+
+    def test_wrong_types(self):
+        cases = [
+            (record(id="2x"), "id must be an integer"),
+            (record(id=2.5), "id must be an integer"),
+            (record(id=True), "id must be an integer"),
+            (record(username=["nathan"]), "username must be a string"),
+            (record(password=1234), "password must be a string"),
+            (record(hashed_password=7), "hashed_password must be a string"),
+            (record(first_name={"a": 1}), "first_name must be a string"),
+            (record(roles=[1]), "roles must be a list of strings"),
+            (record(roles={"Student": True}), "roles must be a list of strings"),
+            (record(password=None, hashed_password="plain"), "hashed_password must be a pbkdf2_sha256 hash"),
+        ]
+        for case, expected in cases:
+            self.assertEqual(validate(1, case), (None, expected))
+
+
+class FindConflictsTest(unittest.TestCase):
+    def setUp(self):
+        self.db = user_db()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_conflicts(self):
+        rows = [validate(line, fields)[0] for line, fields in enumerate([
+            record(id="1", username="new"),
+            record(id="2", username="existing"),
+            record(id="3", username="nathan"),
+            record(id="3", username="other"),
+            record(id="4", username="nathan"),
+            record(id="5", username="admin", roles="Admin"),
+        ], start=2)]
+        role_ids = {role_name: role_id for role_id, role_name in self.db.execute("SELECT id, role_name FROM roles")}
+
+        self.assertEqual(find_conflicts(self.db, rows, role_ids), {
+            2: "User id 1 already exists",
+            3: "Username existing already exists",
+            5: "User id 3 already exists",
+            6: "Username nathan already exists",
+            7: "Unknown role(s): Admin",
+        })
+
+
+class ImportUsersTest(unittest.TestCase):
+    def setUp(self):
+        self.db = user_db()
+
+    def tearDown(self):
+        self.db.close()
+
+    def run_write(self, function, *args):
+        return function(self.db, *args)
+
+    @staticmethod
+    def hash_many(passwords):
+        return [HASHED_PASSWORD for _ in passwords]
+
+    def test_csv(self):
+        lines = io.StringIO(
+            "id,username,password,first_name,last_name,roles\n"
+            "2,nathan,1234,nathan,nguyen,Student;Instructor\n"
+            "1,someone,1234,some,one,Student\n"
+            "x,bad,1234,b,ad,Student\n"
+            "3,anna,1234,anna,le,\n"
+        )
+        report = import_users(lines, CSV, self.hash_many, self.run_write, chunk_size=2)
+
+        self.assertEqual(report, {"imported": 2, "rejected": [
+            {"line": 3, "username": "someone", "detail": "User id 1 already exists"},
+            {"line": 4, "username": "bad", "detail": "id must be an integer"},
+        ]})
+        self.assertEqual(self.db.execute("SELECT COUNT(*) FROM user").fetchone()[0], 3)
+        roles = self.db.execute("SELECT role_name FROM user_role JOIN roles ON roles.id = role_id "
+                                "WHERE user_id = 2 ORDER BY role_name").fetchall()
+        self.assertEqual(roles, [("Instructor",), ("Student",)])
+
+    def test_ndjson(self):
+        lines = io.StringIO(
+            '{"id": 2, "username": "nathan", "password": "1234", "first_name": "n", "last_name": "n"}\n'
+            '\n'
+            'not json\n'
+            '{"id": 3, "username": 3, "password": "1234", "first_name": "n", "last_name": "n"}\n'
+            '{"id": 4, "username": "anna", "hashed_password": "' + HASHED_PASSWORD + '", '
+            '"first_name": "a", "last_name": "l", "roles": ["Student"]}\n'
+        )
+        hashed = []
+        report = import_users(lines, NDJSON, lambda passwords: hashed.extend(passwords) or self.hash_many(passwords),
+                              self.run_write)
+
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual([(rejection["line"], rejection["detail"]) for rejection in report["rejected"]],
+                         [(3, "Not a JSON object"), (4, "username must be a string")])
+        # Given hashes are stored as is
+        self.assertEqual(hashed, ["1234"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from decimal import Decimal
+
+import boto3
+from botocore.stub import Stubber
+from fastapi import HTTPException
+from ddb_enrollment_service.pagination import (encode_cursor, decode_cursor, query_page, query_all, page_after,
+                                               waitlist_page_args, waitlist_page)
+from ddb_enrollment_service.parallel_scan import parallel_scan
+
+
+def class_table():
+    resource = boto3.resource("dynamodb", region_name="local", endpoint_url="http://localhost:8000",
+                              aws_access_key_id="test", aws_secret_access_key="test")
+    return resource.Table("class_table")
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        position = {"id": Decimal(7), "name": "CPSC"}
+        self.assertEqual(decode_cursor(encode_cursor(position)), {"id": 7, "name": "CPSC"})
+
+    def test_no_next_page(self):
+        self.assertIsNone(encode_cursor(None))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_invalid_cursor(self):
+        for cursor in ("not base64!", encode_cursor([1, 2])[:-1], "WzFd"):
+            with self.assertRaises(HTTPException) as context:
+                decode_cursor(cursor)
+            self.assertEqual(context.exception.status_code, 400)
+
+    def test_page_after(self):
+        ids = ["1", "2", "10", "11", "12"]
+        page, cursor = page_after(ids, 2, None, int)
+        self.assertEqual(page, ["1", "2"])
+        page, cursor = page_after(ids, 2, cursor, int)
+        self.assertEqual(page, ["10", "11"])
+        page, cursor = page_after(ids, 2, cursor, int)
+        self.assertEqual((page, cursor), (["12"], None))
+
+    def test_waitlist_page(self):
+        self.assertEqual(waitlist_page_args(2, None)["min"], "-inf")
+        members, cursor = waitlist_page([("5", 1.0), ("6", 2.0), ("7", 3.0)], 2)
+        self.assertEqual(members, ["5", "6"])
+        self.assertEqual(waitlist_page_args(2, cursor)["min"], "(2.0")
+
+
+class DynamoDBPagingTest(unittest.TestCase):
+    """Runs against a stubbed client, so the values go through boto3's conversions."""
+
+    def setUp(self):
+        self.table = class_table()
+        self.stubber = Stubber(self.table.meta.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_query_page_and_query_all(self):
+        self.stubber.add_response("query", {"Items": [{"id": {"S": "1"}}],
+                                            "LastEvaluatedKey": {"id": {"S": "1"}}})
+        self.stubber.add_response("query", {"Items": [{"id": {"S": "2"}}]})
+        self.stubber.add_response("query", {"Items": [{"id": {"S": "3"}}]})
+
+        items, cursor = query_page(self.table, 1, None)
+        self.assertEqual(items, [{"id": "1"}])
+        items, cursor = query_page(self.table, 1, cursor)
+        self.assertEqual((items, cursor), ([{"id": "2"}], None))
+        self.assertEqual(query_all(self.table), [{"id": "3"}])
+        self.stubber.assert_no_pending_responses()
+
+    def test_parallel_scan_follows_pages(self):
+        self.stubber.add_response(
+            "scan",
+            {"Items": [{"id": {"S": "1"}, "room_capacity": {"N": "30"}}], "LastEvaluatedKey": {"id": {"S": "1"}}},
+            {"TableName": "class_table", "Segment": 0, "TotalSegments": 1, "ProjectionExpression": "id, room_capacity"},
+        )
+        self.stubber.add_response(
+            "scan",
+            {"Items": [{"id": {"S": "2"}, "room_capacity": {"N": "25"}}]},
+            {"TableName": "class_table", "Segment": 0, "TotalSegments": 1, "ProjectionExpression": "id, room_capacity",
+             "ExclusiveStartKey": {"id": "1"}},
+        )
+
+        items = parallel_scan(self.table, segments=1, ProjectionExpression="id, room_capacity")
+        self.assertEqual(items, [{"id": "1", "room_capacity": Decimal(30)},
+                                 {"id": "2", "room_capacity": Decimal(25)}])
+        self.stubber.assert_no_pending_responses()
+
+    def test_parallel_scan_covers_every_segment(self):
+        for _ in range(3):
+            self.stubber.add_response("scan", {"Items": [{"id": {"S": "x"}}]})
+
+        items = parallel_scan(self.table, segments=3)
+        self.assertEqual(items, [{"id": "x"}] * 3)
+        self.stubber.assert_no_pending_responses()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import json
+import unittest
+from unittest import mock
+
+import aioboto3
+import boto3
+from aiobotocore.awsrequest import AioAWSResponse
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from ddb_enrollment_service.async_ddb_enrollment_helper import AsyncDynamoDBRedisHelper
+from ddb_enrollment_service.ddb_enrollment_helper import (DynamoDBRedisHelper, enroll_transact_items,
+                                                          drop_transact_items, promotion_transact_items)
+from ddb_enrollment_service.outbox import OUTBOX_TABLE, outbox_shard
+
+ENDPOINT = dict(region_name="local", endpoint_url="http://localhost:8000",
+                aws_access_key_id="test", aws_secret_access_key="test")
+
+
+class RawBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class AsyncRawBody(RawBody):
+    async def read(self):
+        return self.body
+
+
+def capture_requests(client, operation, responses=()):
+    """
+    Records the JSON bodies of `operation` as sent on the wire (after boto3's
+    serialization) and answers them with `responses` (status, body), then 200 {}.
+    """
+    sent = []
+    responses = list(responses)
+
+    def respond(request):
+        sent.append(json.loads(request.body))
+        status_code, body = responses.pop(0) if responses else (200, {})
+        return status_code, json.dumps(body).encode()
+
+    def before_send(request, **kwargs):
+        status_code, body = respond(request)
+        return AWSResponse(request.url, status_code, {}, RawBody(body))
+
+    async def async_before_send(request, **kwargs):
+        status_code, body = respond(request)
+        return AioAWSResponse(request.url, status_code, {}, AsyncRawBody(body))
+
+    is_async = type(client).__module__.startswith("aiobotocore")
+    client.meta.events.register(f"before-send.dynamodb.{operation}", async_before_send if is_async else before_send)
+    return sent
+
+
+class TransactItemsWireTest(unittest.TestCase):
+    """The builders go through the resource's client, which serializes the values once."""
+
+    def setUp(self):
+        self.client = boto3.resource("dynamodb", **ENDPOINT).meta.client
+        self.sent = capture_requests(self.client, "TransactWriteItems")
+
+    def send(self, transact_items):
+        self.client.transact_write_items(TransactItems=transact_items)
+        return self.sent[-1]["TransactItems"]
+
+    def test_enroll(self):
+        self.assertEqual(self.send(enroll_transact_items(1, 42)), [
+            {"Update": {
+                "TableName": "class_table",
+                "Key": {"id": {"S": "1"}},
+                "UpdateExpression": "SET enrolled_count = if_not_exists(enrolled_count, :zero) + :one",
+                "ConditionExpression": "attribute_exists(id) AND "
+                                       "(attribute_not_exists(enrolled_count) OR enrolled_count < room_capacity)",
+                "ExpressionAttributeValues": {":zero": {"N": "0"}, ":one": {"N": "1"}},
+                "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+            }},
+            {"Put": {
+                "TableName": "enrollment_table",
+                "Item": {"class_id": {"S": "1"}, "student_id": {"S": "42"}, "enrollment_date": {"S": mock.ANY}},
+                "ConditionExpression": "attribute_not_exists(student_id)",
+            }},
+        ])
+
+    def test_drop(self):
+        self.assertEqual(self.send(drop_transact_items(1, 42, administrative=True)), [
+            {"Delete": {
+                "TableName": "enrollment_table",
+                "Key": {"class_id": {"S": "1"}, "student_id": {"S": "42"}},
+                "ConditionExpression": "attribute_exists(student_id)",
+            }},
+            {"Put": {
+                "TableName": "droplist_table",
+                "Item": {"class_id": {"S": "1"}, "student_id": {"S": "42"}, "drop_date": {"S": mock.ANY},
+                         "administrative": {"BOOL": True}},
+            }},
+            {"Update": {
+                "TableName": "class_table",
+                "Key": {"id": {"S": "1"}},
+                "UpdateExpression": "SET enrolled_count = if_not_exists(enrolled_count, :one) - :one",
+                "ConditionExpression": "attribute_exists(id)",
+                "ExpressionAttributeValues": {":one": {"N": "1"}},
+            }},
+        ])
+
+    def test_promotion(self):
+        transact_items = self.send(promotion_transact_items(1, ["42", "43"], 30))
+        self.assertEqual(transact_items[0], {"Update": {
+            "TableName": "class_table",
+            "Key": {"id": {"S": "1"}},
+            "UpdateExpression": "SET enrolled_count = if_not_exists(enrolled_count, :zero) + :count",
+            "ConditionExpression": "attribute_exists(id) AND room_capacity = :capacity AND "
+                                   "(attribute_not_exists(enrolled_count) OR enrolled_count <= :max_before)",
+            "ExpressionAttributeValues": {":zero": {"N": "0"}, ":count": {"N": "2"}, ":capacity": {"N": "30"},
+                                          ":max_before": {"N": "28"}},
+        }})
+        self.assertEqual(len(transact_items), 5)
+        self.assertEqual(transact_items[3], {"Put": {
+            "TableName": "enrollment_table",
+            "Item": {"class_id": {"S": "1"}, "student_id": {"S": "43"}, "enrollment_date": {"S": mock.ANY}},
+            "ConditionExpression": "attribute_not_exists(student_id)",
+        }})
+
+    def test_outbox(self):
+        outbox_put = {"Put": {
+            "TableName": OUTBOX_TABLE,
+            "Item": {"shard": {"N": str(outbox_shard("42"))}, "id": {"S": mock.ANY}, "event": {"S": "enrolled"},
+                     "class_id": {"S": "1"}, "student_id": {"S": "42"}},
+        }}
+        self.assertEqual(self.send(enroll_transact_items(1, 42, notify=True))[2], outbox_put)
+        self.assertEqual(self.send(promotion_transact_items(1, ["42"], 30))[2], outbox_put)
+
+
+
+class DropCountWireTest(unittest.TestCase):
+    def test_count_drops_follows_pages(self):
+        resource = boto3.resource("dynamodb", **ENDPOINT)
+        last_key = {"class_id": {"S": "1"}, "student_id": {"S": "42"}}
+        sent = capture_requests(resource.meta.client, "Query",
+                                [(200, {"Count": 2, "LastEvaluatedKey": last_key}), (200, {"Count": 1})])
+
+        self.assertEqual(DynamoDBRedisHelper(resource, mock.Mock()).count_drops(1), 3)
+        self.assertEqual(sent[0], {"TableName": "droplist_table", "KeyConditionExpression": "class_id = :class_id",
+                                   "ExpressionAttributeValues": {":class_id": {"S": "1"}}, "Select": "COUNT"})
+        self.assertEqual(sent[1]["ExclusiveStartKey"], last_key)
+
+
+
+class PromotionFailureTest(unittest.TestCase):
+    def test_restores_only_students_without_a_seat(self):
+        resource = boto3.resource("dynamodb", **ENDPOINT)
+        capture_requests(resource.meta.client, "GetItem", [
+            (200, {"Item": {"id": {"S": "1"}, "room_capacity": {"N": "30"}, "enrolled_count": {"N": "27"}}})])
+        sent = capture_requests(resource.meta.client, "TransactWriteItems", [
+            # The batch is cancelled, then the fallback enrolls 42 and fails on 43
+            (400, {"__type": "com.amazonaws.dynamodb.v20120810#TransactionCanceledException", "message": "Cancelled",
+                   "CancellationReasons": [{"Code": "None"}, {"Code": "ConditionalCheckFailed"}]}),
+            (200, {}),
+            (400, {"__type": "com.amazon.coral.validate#ValidationException", "message": "Invalid"}),
+        ])
+        helper = DynamoDBRedisHelper(resource, mock.Mock())
+        helper.pop_waitlist = mock.Mock(return_value=[("42", 1.0), ("43", 2.0), ("44", 3.0)])
+        helper.restore_waitlist = mock.Mock()
+        helper._record_seat_change = mock.Mock()
+
+        with self.assertRaises(ClientError):
+            helper.enroll_students_from_waitlist([1])
+        self.assertEqual(len(sent), 3)
+        helper._record_seat_change.assert_called_once_with("1", -1)
+        helper.restore_waitlist.assert_called_once_with("1", [("43", 2.0), ("44", 3.0)])
+
+
+class AsyncWireTest(unittest.IsolatedAsyncioTestCase):
+    """The async helper sends the same builders through the aioboto3 resource's client."""
+
+    async def asyncSetUp(self):
+        self.resource = await self.enterAsyncContext(aioboto3.Session().resource("dynamodb", **ENDPOINT))
+        redis_conn = mock.MagicMock()
+        redis_conn.pipeline.return_value.execute = mock.AsyncMock()
+        self.helper = AsyncDynamoDBRedisHelper(mock.Mock(dynamodb=self.resource, redis=redis_conn))
+
+    async def test_enroll_drop_and_promotion(self):
+        sent = capture_requests(self.resource.meta.client, "TransactWriteItems")
+
+        self.assertTrue(await self.helper.enroll_student(1, 42, notify=True))
+        self.assertTrue(await self.helper.drop_student(1, 42))
+        self.assertEqual(await self.helper._enroll_chunk(1, [("42", 1.0)], 30, set()), (["42"], []))
+
+        enroll, drop, promotion = (request["TransactItems"] for request in sent)
+        self.assertEqual(enroll[0]["Update"]["Key"], {"id": {"S": "1"}})
+        self.assertEqual(enroll[1]["Put"]["Item"]["student_id"], {"S": "42"})
+        self.assertEqual(enroll[2]["Put"]["Item"]["event"], {"S": "enrolled"})
+        self.assertEqual(drop[0]["Delete"]["Key"], {"class_id": {"S": "1"}, "student_id": {"S": "42"}})
+        self.assertEqual(drop[1]["Put"]["Item"]["administrative"], {"BOOL": False})
+        self.assertEqual(promotion[0]["Update"]["ExpressionAttributeValues"][":capacity"], {"N": "30"})
+        self.assertEqual(promotion[1]["Put"]["Item"]["class_id"], {"S": "1"})
+
+    async def test_count_drops(self):
+        sent = capture_requests(self.resource.meta.client, "Query", [(200, {"Count": 2})])
+
+        self.assertEqual(await self.helper.count_drops(1), 2)
+        self.assertEqual(sent[0]["ExpressionAttributeValues"], {":class_id": {"S": "1"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
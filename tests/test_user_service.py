@@ -1,6 +1,7 @@
 import unittest
 import requests
-from tests.helpers import user_register, user_login, unittest_setUp, unittest_tearDown
+from tests.helpers import (user_register, user_login, user_login_tokens, refresh_tokens, user_logout,
+                           unittest_setUp, unittest_tearDown)
 from tests.settings import BASE_URL, USER_DB_PATH
 
 class UserServiceTest(unittest.TestCase):
@@ -35,5 +36,34 @@ class UserServiceTest(unittest.TestCase):
         access_token = user_login(username="username_does_not_exists", password="1234")
         self.assertIsNone(access_token)   
 
+    # ------------- REFRESH TESTS -------------
+    def test_refresh(self):
+        user_register(2, "nathan", "1234", "nathan", "nguyen", ["Student"])
+        tokens = user_login_tokens(username="nathan", password="1234")
+        response = refresh_tokens(tokens["refresh_token"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", response.json())
+        self.assertNotEqual(response.json()["refresh_token"], tokens["refresh_token"])
+
+    def test_refresh_token_reuse_revokes_family(self):
+        user_register(2, "nathan", "1234", "nathan", "nguyen", ["Student"])
+        tokens = user_login_tokens(username="nathan", password="1234")
+        refreshed = refresh_tokens(tokens["refresh_token"]).json()
+
+        # Presenting a spent token again fails...
+        response = refresh_tokens(tokens["refresh_token"])
+        self.assertEqual(response.status_code, 401)
+        # ...and revokes the token issued from it
+        response = refresh_tokens(refreshed["refresh_token"])
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_revokes_refresh_tokens(self):
+        user_register(2, "nathan", "1234", "nathan", "nguyen", ["Student"])
+        tokens = user_login_tokens(username="nathan", password="1234")
+        response = user_logout(tokens["refresh_token"])
+        self.assertEqual(response.status_code, 200)
+        response = refresh_tokens(tokens["refresh_token"])
+        self.assertEqual(response.status_code, 401)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,140 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from notification_service.webhook_dispatcher import WebhookDispatcher, webhook_payload
+from notification_service.webhook_urls import (resolve_webhook_url, parse_webhook_url, check_addresses,
+                                               is_public_address, UnsafeWebhookURL)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, json.loads(body)))
+            server.hosts.append(self.headers["Host"])
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookDispatcherTest(unittest.IsolatedAsyncioTestCase):
+    """Delivers to a local stub server that answers with the queued `statuses`, then 200."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.hosts = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        self.dead_letters = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def asyncSetUp(self):
+        async def dead_letter(url, payload, error):
+            self.dead_letters.append((url, payload, error))
+
+        # The stub server listens on loopback, which real deliveries refuse
+        self.dispatcher = WebhookDispatcher(dead_letter, max_attempts=3, base_delay=0.01,
+                                            address_filter=lambda address: True)
+
+    async def asyncTearDown(self):
+        await self.dispatcher.aclose()
+
+    async def test_delivers_payload(self):
+        payload = webhook_payload("1", "2")
+
+        self.assertTrue(await self.dispatcher.deliver(self.url, payload))
+
+        self.assertEqual(self.server.requests, [("/hook", payload)])
+        self.assertEqual(self.server.hosts, [f"127.0.0.1:{self.server.server_port}"])
+        self.assertEqual(self.dead_letters, [])
+
+    async def test_retries_server_errors(self):
+        self.server.statuses = [500, 503]
+
+        self.assertTrue(await self.dispatcher.deliver(self.url, webhook_payload("1", "2")))
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.dispatcher.stats()["retries"], 2)
+
+    async def test_dead_letters_after_max_attempts(self):
+        self.server.statuses = [500, 500, 500]
+
+        self.assertFalse(await self.dispatcher.deliver(self.url, webhook_payload("1", "2")))
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.dead_letters, [(self.url, webhook_payload("1", "2"), "HTTP 500")])
+
+    async def test_does_not_retry_client_errors(self):
+        self.server.statuses = [404]
+
+        self.assertFalse(await self.dispatcher.deliver(self.url, webhook_payload("1", "2")))
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(self.dead_letters), 1)
+
+    async def test_dead_letters_unreachable_destination(self):
+        url = "http://127.0.0.1:1/hook"  # Nothing listens on port 1
+
+        self.assertFalse(await self.dispatcher.deliver(url, webhook_payload("1", "2")))
+
+        self.assertEqual(len(self.dead_letters), 1)
+
+    async def test_refuses_internal_destinations(self):
+        async def dead_letter(url, payload, error):
+            self.dead_letters.append((url, payload, error))
+
+        dispatcher = WebhookDispatcher(dead_letter, max_attempts=3, base_delay=0.01)
+        try:
+            self.assertFalse(await dispatcher.deliver(self.url, webhook_payload("1", "2")))
+            self.assertFalse(await dispatcher.deliver("http://localhost:5100/enrollment/", webhook_payload("1", "2")))
+        finally:
+            await dispatcher.aclose()
+
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual([error for _, _, error in self.dead_letters],
+                         ["Webhook host resolves to an internal address", "Webhook port 5100 is not allowed"])
+        self.assertEqual(dispatcher.stats()["retries"], 0)
+
+
+class WebhookURLTest(unittest.TestCase):
+    def test_public_addresses(self):
+        self.assertTrue(is_public_address("93.184.216.34"))
+        self.assertTrue(is_public_address("2606:2800:220:1:248:1893:25c8:1946"))
+        for address in ("127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "169.254.169.254",
+                        "100.64.0.1", "0.0.0.0", "::1", "fe80::1", "fc00::1", "::ffff:127.0.0.1", "224.0.0.1"):
+            self.assertFalse(is_public_address(address), address)
+
+    def test_parse(self):
+        self.assertEqual(parse_webhook_url("https://example.com/hook"), ("example.com", 443))
+        self.assertEqual(parse_webhook_url("http://example.com:8080/hook"), ("example.com", 8080))
+        for url in ("ftp://example.com/", "http:///hook", "http://user:pw@example.com/",
+                    "http://example.com:5200/", "http://example.com:6379/", "http://example.com:99999/"):
+            with self.assertRaises(UnsafeWebhookURL, msg=url):
+                parse_webhook_url(url)
+
+    def test_every_address_must_be_public(self):
+        self.assertEqual(check_addresses(["93.184.216.34"]), "93.184.216.34")
+        with self.assertRaises(UnsafeWebhookURL):
+            check_addresses(["93.184.216.34", "10.0.0.1"])
+        with self.assertRaises(UnsafeWebhookURL):
+            check_addresses([])
+
+    def test_resolve_rejects_loopback(self):
+        for url in ("http://localhost/hook", "http://127.0.0.1:8080/hook", "http://[::1]/hook"):
+            with self.assertRaises(UnsafeWebhookURL, msg=url):
+                resolve_webhook_url(url)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,17 +8,23 @@ import logging.config
 import sqlite3
 import typing
 import logging
-import secrets
-import hashlib
-import base64
+import tempfile
+import io
 
-from fastapi import FastAPI, Depends, Response, HTTPException, status, Path
-from .db_connection import get_db
+import anyio.from_thread
+from fastapi import FastAPI, Request, Response, HTTPException, status, Path
+from fastapi.concurrency import run_in_threadpool
+import redis
+from .db_connection import (run_db, run_read, db_router, settings, redis_conn,
+                            pin_reads_to_primary, reads_pinned_to_primary)
+from .hashing import PasswordHasher
+from .bulk_import import import_users, detect_format, FORMATS
+from .tokens import (AUDIENCE, ISSUER, ACCESS_TOKEN_MINUTES, REFRESH_TOKEN_MINUTES, load_public_keys,
+                     verify_refresh_token, register_refresh_token, consume_refresh_token, revoke_family,
+                     cached_role_names)
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
-ALGORITHM = "pbkdf2_sha256"
-
 class UserRegisterModel(BaseModel):
     id: int
     username: str
@@ -31,28 +37,24 @@ class UserLoginModel(BaseModel):
     username: str
     password: str    
 
-app = FastAPI()    
- 
-def hash_password(password, salt=None, iterations=260000):
-    if salt is None:
-        salt = secrets.token_hex(16)
-    assert salt and isinstance(salt, str) and "$" not in salt
-    assert isinstance(password, str)
-    pw_hash = hashlib.pbkdf2_hmac(
-        "sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations
-    )
-    b64_hash = base64.b64encode(pw_hash).decode("ascii").strip()
-    return "{}${}${}${}".format(ALGORITHM, iterations, salt, b64_hash)
-
-
-def verify_password(password, password_hash):
-    if (password_hash or "").count("$") != 3:
-        return False
-    algorithm, iterations, salt, b64_hash = password_hash.split("$", 3)
-    iterations = int(iterations)
-    assert algorithm == ALGORITHM
-    compare_hash = hash_password(password, salt, iterations)
-    return secrets.compare_digest(password_hash, compare_hash)
+class RefreshModel(BaseModel):
+    refresh_token: str
+
+# PBKDF2 runs in a process pool sized to the cores, not in the request threads
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+# Public half of the key the gateway signs tokens with
+public_keys = load_public_keys(settings.JWK_PUBLIC_KEY_PATH)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    password_hasher.start()
+    yield
+    password_hasher.shutdown()
+    db_router.close()
+    await redis_conn.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 def expiration_in(minutes):
     creation = datetime.datetime.now(tz=datetime.timezone.utc)
@@ -60,12 +62,12 @@ def expiration_in(minutes):
     return creation, expiration
 
 
-def generate_claims(username, user_id, roles, first_name, last_name):
-    _, exp = expiration_in(20)
+def generate_claims(username, user_id, roles, first_name, last_name, refresh_id=None, family=None):
+    _, exp = expiration_in(ACCESS_TOKEN_MINUTES)
 
     claims = {
-        "aud": "krakend.local.gd",
-        "iss": "auth.local.gd",
+        "aud": AUDIENCE,
+        "iss": ISSUER,
         "sub": username,
         "jti": str(user_id),
         "roles": roles,
@@ -75,71 +77,211 @@ def generate_claims(username, user_id, roles, first_name, last_name):
     }
     token = {
         "access_token": claims,
-        "refresh_token": claims,
         "exp": int(exp.timestamp()),
     }
+    if refresh_id is not None:
+        # No roles, so the gateway's role checks reject it as an access token
+        _, refresh_exp = expiration_in(REFRESH_TOKEN_MINUTES)
+        token["refresh_token"] = {
+            "aud": AUDIENCE,
+            "iss": ISSUER,
+            "sub": username,
+            "jti": str(user_id),
+            "exp": int(refresh_exp.timestamp()),
+            "first_name": first_name,
+            "last_name": last_name,
+            "token_use": "refresh",
+            "rid": refresh_id,
+            "fam": family,
+        }
     return token
  
     
+def insert_user(db, usermodel, hashed_password):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO user(id, username, hashed_password, first_name, last_name) VALUES (?, ?, ?, ?, ?)",
+                   [usermodel.id, usermodel.username, hashed_password, usermodel.first_name, usermodel.last_name])
+    # data = []
+    # for i in range(len(usermodel.roles)):
+    #     data.append((usermodel.id, usermodel.roles[i]))
+    
+    # cursor.executemany("INSERT INTO user_role(user_id, role_id) VALUES (?, ?)", data)
+    
+    placeholder_string = ','.join(['?'] * len(usermodel.roles))
+    data = [usermodel.id] + usermodel.roles
+    
+    cursor.execute(
+        f"""
+        INSERT INTO user_role(user_id, role_id) 
+            SELECT ? AS user_id, id AS role_id
+            FROM roles
+            WHERE role_name IN ({placeholder_string})
+        """, data)
+    
+    db.commit()
+
+def find_user(db, username):
+    cursor = db.cursor()
+    cursor.execute("SELECT id, hashed_password, first_name, last_name FROM user WHERE username=? LIMIT 1", [username])
+    return cursor.fetchone()
+
+def get_role_names(db, user_id):
+    cursor = db.cursor()
+    cursor.execute('''SELECT roles.role_name
+                      FROM roles INNER JOIN user_role ON roles.id = user_role.role_id
+                      WHERE user_role.user_id = ? ''', [user_id])
+    return [row[0] for row in cursor.fetchall()]
+
 # Operation/Resource 13
 @app.post("/register/", description="Register a new user")
-def register_new_user(usermodel: UserRegisterModel, db: sqlite3.Connection = Depends(get_db)):
+async def register_new_user(usermodel: UserRegisterModel):
     try:
         # Generate a random salt for each user 
-        hashed_password = hash_password(usermodel.password)
-        cursor = db.cursor()
-        cursor.execute("INSERT INTO user(id, username, hashed_password, first_name, last_name) VALUES (?, ?, ?, ?, ?)",
-                       [usermodel.id, usermodel.username, hashed_password, usermodel.first_name, usermodel.last_name])
-        # data = []
-        # for i in range(len(usermodel.roles)):
-        #     data.append((usermodel.id, usermodel.roles[i]))
-        
-        # cursor.executemany("INSERT INTO user_role(user_id, role_id) VALUES (?, ?)", data)
-        
-        placeholder_string = ','.join(['?'] * len(usermodel.roles))
-        data = [usermodel.id] + usermodel.roles
-        
-        cursor.execute(
-            f"""
-            INSERT INTO user_role(user_id, role_id) 
-                SELECT ? AS user_id, id AS role_id
-                FROM roles
-                WHERE role_name IN ({placeholder_string})
-            """, data)
-        
-        db.commit()
+        hashed_password = await password_hasher.hash(usermodel.password)
+        await run_in_threadpool(run_db, insert_user, usermodel, hashed_password)
+        try:
+            await pin_reads_to_primary(usermodel.username)
+        except redis.exceptions.RedisError:
+            # The first login may then miss the user until the replicas catch up
+            pass
         return {"message": "User registration successful"}
 
-    except sqlite3.IntegrityError as e:
+    except HTTPException:
+        raise
+    except sqlite3.IntegrityError:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="Conflicts")
-    except Exception as e:
+    except Exception:
         #logger.exception("An error occurred during user registration")
         raise HTTPException(status_code=500, detail="User registration failed")
 
+# Bodies of bulk imports above this size are spooled to disk
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+@app.post("/users/import/", description="Import users from a CSV or NDJSON body")
+async def import_user_accounts(request: Request, format: typing.Optional[str] = None):
+    """
+    Registers many users at once. See user_service/bulk_import.py for the columns.
+
+    The body is streamed to a spool file, then imported in chunks: passwords are
+    hashed in the password hashing pool, each chunk is inserted in one transaction.
+
+    Parameters:
+    - format (str, optional): csv or ndjson; by default from the Content-Type header.
+
+    Returns:
+    - dict: The number of users imported and the rejected rows (line, username, detail).
+
+    Raises:
+    - HTTPException (400): If the format is unknown.
+    """
+    format = format or detect_format(request.headers.get("content-type"))
+    if format not in FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"format must be one of {', '.join(FORMATS)}")
+
+    def hash_many(passwords):
+        return anyio.from_thread.run(password_hasher.hash_many, passwords)
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as spool:
+            async for data in request.stream():
+                await run_in_threadpool(spool.write, data)
+            spool.seek(0)
+            lines = io.TextIOWrapper(spool, encoding="utf-8", errors="replace", newline="")
+            return await run_in_threadpool(import_users, lines, format, hash_many, run_db)
+
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="User import failed")
+
 # Operation/Resource 14
 @app.post("/login/", description="User Login")
-def login(logindata: UserLoginModel, db: sqlite3.Connection = Depends(get_db)):
+async def login(logindata: UserLoginModel):
     try:
-        cursor = db.cursor()
-        cursor.execute("SELECT id, hashed_password, first_name, last_name FROM user WHERE username=? LIMIT 1", [logindata.username])
-        result = cursor.fetchone()
+        try:
+            primary = await reads_pinned_to_primary(logindata.username)
+        except redis.exceptions.RedisError:
+            primary = False
+        result = await run_in_threadpool(run_read, find_user, logindata.username, primary=primary)
 
         if not result:
             raise HTTPException(status_code=401, detail="wrong username & password combination") 
 
-        if not verify_password(logindata.password, result["hashed_password"]):
+        if not await password_hasher.verify(logindata.password, result["hashed_password"]):
             raise HTTPException(status_code=404, detail="Password mismatch")
         else:
-            cursor.execute('''SELECT roles.role_name
-                              FROM roles INNER JOIN user_role ON roles.id = user_role.role_id
-                              WHERE user_role.user_id = ? ''', [result["id"]])
-            rows = cursor.fetchall()       
-            list_of_rolenames = [row[0] for row in rows]
-            return generate_claims(logindata.username, result["id"], list_of_rolenames, result["first_name"], result["last_name"])
+            list_of_rolenames = await run_in_threadpool(run_read, get_role_names, result["id"], primary=primary)
+            try:
+                refresh_id, family = await register_refresh_token(redis_conn, result["id"])
+            except redis.exceptions.RedisError:
+                # Without Redis the client just logs in again when the access token expires
+                refresh_id = family = None
+            return generate_claims(logindata.username, result["id"], list_of_rolenames, result["first_name"], result["last_name"],
+                                   refresh_id, family)
             
 
-    except Exception as e:
+    except HTTPException:
+        raise
+    except Exception:
         #logger.exception("An error occurred during password verification")    
         #raise HTTPException(status_code=e.status_code, detail=str(e.detail)) 
-        raise HTTPException(status_code=500, detail="User login failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="User login failed")
+
+@app.post("/refresh/", description="Exchange a refresh token for new tokens")
+async def refresh(refreshdata: RefreshModel):
+    """
+    Issues a new access token and a new refresh token without a password.
+
+    The presented refresh token is spent (rotation); presenting it again revokes
+    every token issued from the same login. Roles are read through a short-lived
+    Redis cache.
+
+    Raises:
+    - HTTPException (401): If the refresh token is invalid, expired, revoked or reused.
+    """
+    try:
+        claims = verify_refresh_token(refreshdata.refresh_token, public_keys)
+        await consume_refresh_token(redis_conn, claims)
+
+        user_id = int(claims["jti"])
+        list_of_rolenames = await cached_role_names(
+            redis_conn, user_id, lambda: run_in_threadpool(run_read, get_role_names, user_id))
+        refresh_id, family = await register_refresh_token(redis_conn, user_id, claims["fam"])
+        return generate_claims(claims["sub"], user_id, list_of_rolenames, claims["first_name"], claims["last_name"],
+                               refresh_id, family)
+
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Token refresh failed")
+
+@app.post("/logout/", description="Revoke a refresh token and every token refreshed from it")
+async def logout(refreshdata: RefreshModel):
+    try:
+        claims = verify_refresh_token(refreshdata.refresh_token, public_keys)
+        await revoke_family(redis_conn, claims["fam"])
+        return {"message": "Logged out"}
+
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Logout failed")
+
+@app.get("/stats/hashing/", description="Password hashing pool metrics")
+def get_hashing_stats():
+    """
+    Processes, in-flight and queued hashes (queue depth), rejections and average
+    wait/hash times of this worker's password hashing pool.
+    """
+    return password_hasher.stats()
+
+@app.get("/stats/db/", description="SQLite connection pool metrics")
+def get_db_stats():
+    """
+    Open and idle connections, checkouts, average/maximum checkout wait, checkout
+    timeouts and busy retries of this worker's SQLite pools (primary and replicas),
+    and the reads that failed over from a replica to the primary.
+    """
+    return db_router.stats()
@@ -0,0 +1,242 @@
+"""
+Bulk import of user accounts from CSV or NDJSON, used by POST /users/import/ and
+from the command line against the primary database:
+
+    python -m user_service.bulk_import users.csv
+    python -m user_service.bulk_import users.ndjson --chunk-size 1000
+
+A CSV file has a header row with the columns id, username, password, first_name,
+last_name and roles (separated by ";"); an NDJSON file has one object per line with
+the same fields (roles as a list). A `hashed_password` (pbkdf2_sha256$...) may be
+given instead of `password`, e.g. when moving accounts from another database, and
+is stored as is.
+
+Rows are read as a stream and handled in chunks: passwords are hashed in a process
+pool, then the chunk is inserted with executemany in one transaction. Rows that are
+invalid or conflict with an existing user (or an earlier row) are reported with
+their line number and skipped; the rest of the chunk is still imported.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .hashing import ALGORITHM, BULK_BATCH_SIZE, hash_passwords
+
+CHUNK_SIZE = 1000
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+REQUIRED_FIELDS = ("id", "username", "first_name", "last_name")
+STRING_FIELDS = ("username", "password", "hashed_password", "first_name", "last_name")
+
+
+def detect_format(name):
+    """Returns the format of a file name or content type (CSV unless it names (ND)JSON)."""
+    name = (name or "").lower()
+    return NDJSON if "json" in name else CSV
+
+
+def parse_rows(lines, format):
+    """
+    Yields (line number, record dict, or None if the line is not valid NDJSON).
+    Blank NDJSON lines are skipped.
+    """
+    if format == CSV:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def validate(line_number, record):
+    """
+    Returns:
+    - (row, None) with a row dict ready to be hashed and inserted, or (None, detail).
+    """
+    if record is None:
+        return None, "Not a JSON object"
+    missing = [field for field in REQUIRED_FIELDS if not record.get(field)]
+    if not record.get("password") and not record.get("hashed_password"):
+        missing.append("password")
+    if missing:
+        return None, f"Missing field(s): {', '.join(missing)}"
+
+    # NDJSON values can be of any JSON type; CSV values are always strings
+    user_id = record["id"]
+    if isinstance(user_id, str):
+        user_id = user_id.strip()
+        if not user_id.lstrip("-").isdigit():
+            return None, "id must be an integer"
+        user_id = int(user_id)
+    elif isinstance(user_id, bool) or not isinstance(user_id, int):
+        return None, "id must be an integer"
+
+    for field in STRING_FIELDS:
+        if record.get(field) and not isinstance(record[field], str):
+            return None, f"{field} must be a string"
+
+    hashed_password = record.get("hashed_password") or None
+    if hashed_password and (hashed_password.count("$") != 3 or not hashed_password.startswith(ALGORITHM + "$")):
+        return None, f"hashed_password must be a {ALGORITHM} hash"
+
+    roles = record.get("roles") or []
+    if isinstance(roles, str):
+        roles = roles.split(";")
+    elif not isinstance(roles, list) or not all(isinstance(role, str) for role in roles):
+        return None, "roles must be a list of strings"
+    roles = sorted({role.strip() for role in roles if role.strip()})
+
+    return {
+        "line": line_number,
+        "id": user_id,
+        "username": record["username"],
+        "password": None if hashed_password else record["password"],
+        "hashed_password": hashed_password,
+        "first_name": record["first_name"],
+        "last_name": record["last_name"],
+        "roles": roles,
+    }, None
+
+
+def find_conflicts(db, rows, role_ids=None):
+    """
+    Checks rows against the database and each other.
+
+    Returns:
+    - {line number: detail} of the rows that cannot be inserted.
+    """
+    existing_ids = {row[0] for row in db.execute(
+        "SELECT id FROM user WHERE id IN (SELECT value FROM json_each(?))",
+        [json.dumps([row["id"] for row in rows])])}
+    existing_usernames = {row[0] for row in db.execute(
+        "SELECT username FROM user WHERE username IN (SELECT value FROM json_each(?))",
+        [json.dumps([row["username"] for row in rows])])}
+
+    conflicts = {}
+    seen_ids, seen_usernames = set(), set()
+    for row in rows:
+        if row["id"] in existing_ids or row["id"] in seen_ids:
+            conflicts[row["line"]] = f"User id {row['id']} already exists"
+        elif row["username"] in existing_usernames or row["username"] in seen_usernames:
+            conflicts[row["line"]] = f"Username {row['username']} already exists"
+        elif role_ids is not None and not set(row["roles"]) <= role_ids.keys():
+            unknown = ", ".join(sorted(set(row["roles"]) - role_ids.keys()))
+            conflicts[row["line"]] = f"Unknown role(s): {unknown}"
+        else:
+            seen_ids.add(row["id"])
+            seen_usernames.add(row["username"])
+    return conflicts
+
+
+def insert_chunk(db, rows):
+    """
+    Inserts hashed rows and their roles in one write transaction, skipping conflicts.
+
+    Returns:
+    - (number of users inserted, {line number: detail} of the skipped rows)
+    """
+    # Take the write lock first, so no registration can slip in between check and insert
+    db.execute("BEGIN IMMEDIATE")
+    role_ids = {role_name: role_id for role_id, role_name in db.execute("SELECT id, role_name FROM roles")}
+    conflicts = find_conflicts(db, rows, role_ids)
+    rows = [row for row in rows if row["line"] not in conflicts]
+
+    db.executemany(
+        "INSERT INTO user(id, username, hashed_password, first_name, last_name) VALUES (?, ?, ?, ?, ?)",
+        [(row["id"], row["username"], row["hashed_password"], row["first_name"], row["last_name"]) for row in rows])
+    db.executemany(
+        "INSERT INTO user_role(user_id, role_id) VALUES (?, ?)",
+        [(row["id"], role_ids[role]) for row in rows for role in row["roles"]])
+    db.commit()
+    return len(rows), conflicts
+
+
+def import_users(lines, format, hash_many, run_write, chunk_size=CHUNK_SIZE):
+    """
+    Imports users from an iterable of text lines.
+
+    :param hash_many: Hashes a list of passwords, e.g. in a process pool.
+    :param run_write: Runs `function(db, *args)` on the primary, like db_connection.run_db.
+
+    Returns:
+    - {"imported": count, "rejected": [{"line", "username", "detail"}, ...]} in line order.
+    """
+    imported = 0
+    rejected = []
+    records = parse_rows(lines, format)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        rows = []
+        for line_number, record in chunk:
+            row, detail = validate(line_number, record)
+            if row is None:
+                rejected.append({"line": line_number, "username": (record or {}).get("username"), "detail": detail})
+            else:
+                rows.append(row)
+        if not rows:
+            continue
+
+        # Do not spend hashing time on rows that would be rejected anyway
+        usernames = {row["line"]: row["username"] for row in rows}
+        conflicts = run_write(find_conflicts, rows)
+        rows = [row for row in rows if row["line"] not in conflicts]
+        to_hash = [row for row in rows if row["hashed_password"] is None]
+        for row, password_hash in zip(to_hash, hash_many([row["password"] for row in to_hash])):
+            row["hashed_password"] = password_hash
+
+        if rows:
+            count, insert_conflicts = run_write(insert_chunk, rows)
+            imported += count
+            conflicts.update(insert_conflicts)
+        rejected.extend({"line": line_number, "username": usernames[line_number], "detail": detail}
+                        for line_number, detail in conflicts.items())
+
+    rejected.sort(key=lambda rejection: rejection["line"])
+    return {"imported": imported, "rejected": rejected}
+
+
+def main():
+    from .db_connection import db_pool
+
+    parser = argparse.ArgumentParser(description="Import user accounts from a CSV or NDJSON file.")
+    parser.add_argument("file", help="CSV or NDJSON file, - for standard input")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Users per transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Hashing processes")
+    args = parser.parse_args()
+
+    def run_write(function, *function_args):
+        with db_pool.connection() as db:
+            return db_pool.retry_busy(function, db, *function_args)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        def hash_many(passwords):
+            batches = [passwords[i:i + BULK_BATCH_SIZE] for i in range(0, len(passwords), BULK_BATCH_SIZE)]
+            return [password_hash for batch in executor.map(hash_passwords, batches) for password_hash in batch]
+
+        if args.file == "-":
+            report = import_users(sys.stdin, args.format or CSV, hash_many, run_write, args.chunk_size)
+        else:
+            with open(args.file, newline="", encoding="utf-8") as f:
+                report = import_users(f, args.format or detect_format(args.file), hash_many, run_write,
+                                      args.chunk_size)
+
+    for rejection in report["rejected"]:
+        print(f"line {rejection['line']}: {rejection['username']}: {rejection['detail']}", file=sys.stderr)
+    print(f"Imported {report['imported']} users, rejected {len(report['rejected'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,66 @@
-import sqlite3
-import contextlib
+import redis.asyncio
 # import logging
 from pydantic_settings import BaseSettings
+from common.sqlite_pool import SQLitePool, ReadRouter, POOL_SIZE
 
 class Settings(BaseSettings, env_file=".env", extra="ignore"):
     USER_SERVICE_PRIMARY_DB_PATH: str
+    USER_SERVICE_SECONDARY_DB_PATH: str = ""  # LiteFS replicas serving reads; empty to skip
+    USER_SERVICE_TERTIARY_DB_PATH: str = ""
+    READ_YOUR_WRITES_SECONDS: int = 10  # Logins of a just-registered user read the primary (0 to disable)
+    PASSWORD_HASH_WORKERS: int = 0      # Password hashing processes (0 for one per core)
+    PASSWORD_HASH_MAX_QUEUE: int = 256  # Logins/registrations waiting for a hashing process before 503s
+    REDIS_HOST: str = "localhost"
+    REDIS_PORT: int = 6379
+    JWK_PUBLIC_KEY_PATH: str = "./etc/public_key.json"  # Verifies the refresh tokens signed by the gateway
+    SQLITE_POOL_SIZE: int = POOL_SIZE   # SQLite connections per worker
     #logging_config: str #= "./etc/logging.ini"
 
 # logging.basicConfig(filename=f'{__name__}.log', format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.DEBUG)
 
 settings = Settings()
 
+# Refresh tokens and cached roles; one pool per worker
+redis_conn = redis.asyncio.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+
+# Connections are kept open (WAL, tuned pragmas, cached statements) instead of opened per request
+db_pool = SQLitePool(settings.USER_SERVICE_PRIMARY_DB_PATH, settings.SQLITE_POOL_SIZE)
+
+# Reads are spread over the replicas, writes go to the primary
+db_router = ReadRouter(db_pool, [
+    SQLitePool(path, settings.SQLITE_POOL_SIZE, readonly=True)
+    for path in (settings.USER_SERVICE_SECONDARY_DB_PATH, settings.USER_SERVICE_TERTIARY_DB_PATH) if path
+])
+
+# A replica may lag the primary; set after a write by `username` so its reads see it
+READ_PRIMARY_KEY = "read_primary:{username}"
+
+def read_primary_key(username):
+    return READ_PRIMARY_KEY.format(username=username)
+
 def get_db():
-    with contextlib.closing(sqlite3.connect(settings.USER_SERVICE_PRIMARY_DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        db.execute("PRAGMA foreign_keys=ON")
-        #db.set_trace_callback(logging.debug)
-        yield db
\ No newline at end of file
+    # The async endpoints run their queries in the threadpool, which may be another thread
+    # than the one that opened the connection; it is still only used by one request at a time
+    yield from db_pool.get_db()
+
+def run_db(function, *args):
+    """
+    Runs `function(db, *args)` on a pooled primary connection, retrying it while the
+    database is locked. Blocking: call it with run_in_threadpool, so the connection is
+    only held for the queries and not while the request waits for password hashing.
+    """
+    return db_router.write(function, *args)
+
+def run_read(function, *args, primary=False):
+    """Like `run_db`, for read-only queries: runs on the next replica unless `primary`."""
+    return db_router.read(function, *args, primary=primary)
+
+async def pin_reads_to_primary(username):
+    """Sends the reads for `username` to the primary for READ_YOUR_WRITES_SECONDS."""
+    if settings.READ_YOUR_WRITES_SECONDS > 0 and db_router.replicas:
+        await redis_conn.set(read_primary_key(username), 1, ex=settings.READ_YOUR_WRITES_SECONDS)
+
+async def reads_pinned_to_primary(username):
+    if settings.READ_YOUR_WRITES_SECONDS <= 0 or not db_router.replicas:
+        return False
+    return bool(await redis_conn.exists(read_primary_key(username)))
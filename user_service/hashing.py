@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import hashlib
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
+
+ALGORITHM = "pbkdf2_sha256"
+BULK_BATCH_SIZE = 16  # Passwords hashed per process call by hash_many
+
+
+def hash_password(password, salt=None, iterations=260000):
+    if salt is None:
+        salt = secrets.token_hex(16)
+    assert salt and isinstance(salt, str) and "$" not in salt
+    assert isinstance(password, str)
+    pw_hash = hashlib.pbkdf2_hmac(
+        "sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations
+    )
+    b64_hash = base64.b64encode(pw_hash).decode("ascii").strip()
+    return "{}${}${}${}".format(ALGORITHM, iterations, salt, b64_hash)
+
+
+def verify_password(password, password_hash):
+    if (password_hash or "").count("$") != 3:
+        return False
+    algorithm, iterations, salt, b64_hash = password_hash.split("$", 3)
+    iterations = int(iterations)
+    assert algorithm == ALGORITHM
+    compare_hash = hash_password(password, salt, iterations)
+    return secrets.compare_digest(password_hash, compare_hash)
+
+
+def hash_passwords(passwords):
+    """Hashes a batch of passwords in one call (one round trip to a pool process)."""
+    return [hash_password(password) for password in passwords]
+
+
+class PasswordHasher:
+    """
+    Runs PBKDF2 hashing and verification in a process pool, off the event loop.
+
+    At most `workers` hashes run at once, one per process, so a burst of logins uses
+    every core instead of one. Further requests wait for a slot; once `max_queue`
+    requests are waiting, new ones are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers=0, max_queue=256):
+        """
+        :param workers: The number of hashing processes (0 for one per core).
+        :param max_queue: The maximum number of requests waiting for a process.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor = None
+        self._slots = None
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._slots = asyncio.Semaphore(self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._slots = None
+
+    async def _run(self, function, *args, reject_when_full=True):
+        self.start()
+        if reject_when_full and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many concurrent logins, try again", headers={"Retry-After": "1"})
+
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        self.wait_seconds += started_at - queued_at
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.hash_seconds += time.perf_counter() - started_at
+            self._slots.release()
+
+    async def hash(self, password):
+        return await self._run(hash_password, password)
+
+    async def verify(self, password, password_hash):
+        return await self._run(verify_password, password, password_hash)
+
+    async def hash_many(self, passwords):
+        """
+        Hashes a bulk import's passwords in batches of BULK_BATCH_SIZE. Each batch takes
+        a slot like a single hash, and at most `workers - 1` batches wait for one at a
+        time, so logins are not queued behind a whole import. As that bounds the
+        queue already, a batch is never rejected when it is full: a 503 partway
+        through would lose the report of the rows already imported.
+        """
+        bulk_slots = asyncio.Semaphore(max(1, self.workers - 1))
+
+        async def run_batch(batch):
+            async with bulk_slots:
+                return await self._run(hash_passwords, batch, reject_when_full=False)
+
+        batches = [passwords[i:i + BULK_BATCH_SIZE] for i in range(0, len(passwords), BULK_BATCH_SIZE)]
+        results = await asyncio.gather(*map(run_batch, batches))
+        return [password_hash for batch in results for password_hash in batch]
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.wait_seconds / self.completed, 2) if self.completed else 0,
+            "avg_hash_ms": round(1000 * self.hash_seconds / self.completed, 2) if self.completed else 0,
+        }
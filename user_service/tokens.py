@@ -0,0 +1,119 @@
+import json
+import secrets
+from fastapi import HTTPException, status
+from jwcrypto import jwk, jwt
+from jwcrypto.common import JWException
+
+AUDIENCE = "krakend.local.gd"
+ISSUER = "auth.local.gd"
+ACCESS_TOKEN_MINUTES = 20
+REFRESH_TOKEN_MINUTES = 7 * 24 * 60
+ROLE_CACHE_SECONDS = 300
+
+# Redis keys: a refresh token is valid while both its own key and its family's key exist.
+# Every refresh deletes the presented token and issues the next one of the same family;
+# presenting a token that was already used revokes the whole family.
+REFRESH_TOKEN_KEY = "refresh_token:{token_id}"    # -> family
+REFRESH_FAMILY_KEY = "refresh_family:{family}"    # -> user_id
+USED_REFRESH_TOKEN_KEY = "refresh_token_used:{token_id}"  # -> family, to detect reuse
+USER_ROLES_KEY = "user_roles:{user_id}"            # JSON list of role names
+
+
+def refresh_token_key(token_id):
+    return REFRESH_TOKEN_KEY.format(token_id=token_id)
+
+def refresh_family_key(family):
+    return REFRESH_FAMILY_KEY.format(family=family)
+
+def used_refresh_token_key(token_id):
+    return USED_REFRESH_TOKEN_KEY.format(token_id=token_id)
+
+def user_roles_key(user_id):
+    return USER_ROLES_KEY.format(user_id=user_id)
+
+
+def load_public_keys(path):
+    with open(path) as f:
+        return jwk.JWKSet.from_json(f.read())
+
+
+def invalid_refresh_token(detail="Invalid refresh token"):
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def verify_refresh_token(token, keys):
+    """
+    Checks the signature (added by the gateway with the private key), expiry and
+    audience of a refresh token.
+
+    Returns:
+    - The claims of the token.
+
+    Raises:
+    - HTTPException (401): If the token is invalid, expired or not a refresh token.
+    """
+    try:
+        claims = json.loads(jwt.JWT(jwt=token, key=keys, check_claims={"exp": None, "aud": AUDIENCE}).claims)
+    except (JWException, ValueError):
+        raise invalid_refresh_token()
+    if claims.get("token_use") != "refresh" or not claims.get("rid") or not claims.get("fam"):
+        raise invalid_refresh_token()
+    return claims
+
+
+async def register_refresh_token(redis_conn, user_id, family=None):
+    """
+    Records a new refresh token (and with no `family`, a new family).
+
+    Returns:
+    - (token_id, family)
+    """
+    token_id = secrets.token_urlsafe(16)
+    family = family or secrets.token_urlsafe(16)
+    ttl = REFRESH_TOKEN_MINUTES * 60
+    pipe = redis_conn.pipeline()
+    pipe.set(refresh_token_key(token_id), family, ex=ttl)
+    pipe.set(refresh_family_key(family), str(user_id), ex=ttl)
+    await pipe.execute()
+    return token_id, family
+
+
+async def consume_refresh_token(redis_conn, claims):
+    """
+    Spends a refresh token so it cannot be used again (rotation).
+
+    Raises:
+    - HTTPException (401): If the token was revoked or already used. A reused token
+      revokes every token of its family, since it may have been stolen.
+    """
+    token_id, family = claims["rid"], claims["fam"]
+    # One transaction, so concurrent refreshes with the same token cannot both succeed
+    pipe = redis_conn.pipeline()
+    pipe.getdel(refresh_token_key(token_id))
+    pipe.exists(refresh_family_key(family))
+    pipe.exists(used_refresh_token_key(token_id))
+    pipe.set(used_refresh_token_key(token_id), family, ex=REFRESH_TOKEN_MINUTES * 60)
+    stored_family, family_exists, already_used, _ = await pipe.execute()
+
+    if stored_family is None and already_used:
+        await revoke_family(redis_conn, family)
+        raise invalid_refresh_token("Refresh token reused, please log in again")
+    if stored_family != family or not family_exists:
+        raise invalid_refresh_token("Refresh token revoked")
+
+
+async def revoke_family(redis_conn, family):
+    await redis_conn.delete(refresh_family_key(family))
+
+
+async def cached_role_names(redis_conn, user_id, load):
+    """
+    Returns the role names of a user from the Redis cache, calling `load()` (a
+    coroutine function reading the database) on a miss.
+    """
+    cached = await redis_conn.get(user_roles_key(user_id))
+    if cached is not None:
+        return json.loads(cached)
+    roles = await load()
+    await redis_conn.set(user_roles_key(user_id), json.dumps(roles), ex=ROLE_CACHE_SECONDS)
+    return roles
@@ -20,13 +20,14 @@ for entry in waitlist_data:
 
     waitlist_key = f"waitlist_{class_id}"
 
-    # Construct the member using class_id and student_id
-    member = f"{class_id}_{student_id}"
-
     # Convert waitlist_date to a float
     waitlist_date = datetime.strptime(waitlist_date, '%Y-%m-%d %H:%M:%S')
     score = waitlist_date.timestamp()
 
-    # Add the member and score to the sorted set for the specific class
-    redis_conn.zadd(waitlist_key, {member: score})
+    # Add the student to the sorted set for the specific class
+    # and the class to the student's waitlist index
+    pipe = redis_conn.pipeline()
+    pipe.zadd(waitlist_key, {str(student_id): score})
+    pipe.sadd(f"student_waitlists:{student_id}", str(class_id))
+    pipe.execute()
 